@@ -4,75 +4,902 @@ import folium
 from streamlit_folium import st_folium
 import plotly.express as px
 import numpy as np
+from datetime import date
+from uuid import uuid4
+
+from predial import analisis
+from predial.agregacion_espacial import nivel_para_zoom
+from predial.almacen import RUTA_ALMACEN, Almacen
+from predial.exportacion import FORMATOS, Exportador
+from predial import focos
+from predial.formato import decimal, moneda
+from predial.ingesta import ColumnasFaltantesError, cargar_dataset, huella_contenido
+from predial.mapas import capa_celdas, capa_focos, capa_puntos, crear_mapa, tiene_coordenadas
+from predial.perfilado import etapa, perfilador
+from predial.precomputo import ESTADOS, Precomputo
+from predial.rankings import IndiceRankings
+from predial.registro import registro
+from predial.riesgo import ConfigRiesgo, MotorRiesgo
+from predial.simulacion import ConfigSimulacion, simular_recaudo
+from predial.tablas import TAMANOS_PAGINA, pagina, posiciones_pagina, total_paginas
 
 st.set_page_config(layout="wide", page_title="Plataforma Predial Municipal")
 st.title("📊 Plataforma de Análisis Predial Municipal")
 
-# Función para cargar y preprocesar los datos, ahora con caché
-@st.cache_data(ttl=3600) # Cacha los datos por 1 hora (3600 segundos)
-def load_and_preprocess_data(uploaded_file_buffer):
+# Las mediciones de rendimiento se etiquetan con la sesión y la ejecución del script
+st.session_state.setdefault("id_sesion", uuid4().hex[:8])
+st.session_state["ejecucion"] = st.session_state.get("ejecucion", 0) + 1
+id_ejecucion = f"{st.session_state['id_sesion']}-{st.session_state['ejecucion']}"
+# La medición de memoria pico es una opción de cada sesión (casilla del panel de diagnóstico)
+perfilador.contexto(
+    memoria=st.session_state.get("diagnostico_memoria"), sesion=st.session_state["id_sesion"], ejecucion=id_ejecucion
+)
+
+def reservar_dataset(clave, cargar, nombre=None):
     """
-    Carga el archivo Excel, normaliza columnas y convierte tipos.
+    Dataset de `clave` desde el registro compartido por todas las sesiones
+    (ver `predial.registro`). La reserva queda en la sesión: el dataset no se
+    expulsa mientras la sesión lo use y se libera al cambiar de dataset.
     """
-    if uploaded_file_buffer is None:
-        return pd.DataFrame() # Devuelve un DataFrame vacío si no hay archivo
+    reserva = st.session_state.get("reserva_dataset")
+    if reserva is None or reserva.clave != clave:
+        reserva = registro.reservar(clave, cargar, nombre)
+        st.session_state["reserva_dataset"] = reserva
+    return reserva.df
 
-    df = pd.read_excel(uploaded_file_buffer)
+def huella_archivo(archivo):
+    """
+    Huella del contenido de un archivo subido. Se calcula una vez por archivo
+    (`file_id`) y queda en la sesión: las reejecuciones no vuelven a leer
+    todo el contenido.
+    """
+    guardada = st.session_state.get("huella_archivo")
+    if guardada is None or guardada[0] != archivo.file_id:
+        guardada = (archivo.file_id, huella_contenido(archivo.getvalue()))
+        st.session_state["huella_archivo"] = guardada
+    return guardada[1]
+
+# Función para cargar y preprocesar los datos desde el registro compartido
+def load_and_preprocess_data(archivo):
+    """
+    Carga el archivo Excel subido, normaliza columnas y convierte tipos.
 
-    # Normalización de nombres de columnas
-    df.columns = (
-        df.columns.str.strip().str.lower()
-        .str.replace(" ", "_")
-        .str.replace("á", "a").str.replace("é", "e")
-        .str.replace("í", "i").str.replace("ó", "o").str.replace("ú", "u")
-        .str.replace("ñ", "n")
-    )
+    El parseo del Excel ocurre una sola vez por contenido: el resultado queda
+    en una copia Parquet (ver `predial.ingesta`). Las sesiones que cargan el
+    mismo archivo comparten un único DataFrame, mapeado desde disco.
+    """
+    if archivo is None:
+        return pd.DataFrame() # Devuelve un DataFrame vacío si no hay archivo
 
-    # Validar que las columnas necesarias existan
-    required_columns = [
-        "valor_impuesto_a_pagar", "recaudo_predial", "pago_impuesto_predial",
-        "avaluo_catastral", "descuentos_impuesto_predial", "sector",
-        "sector_urbano", "vereda", "destino_economico_predio",
-        "propiedad_horizontal", "latitud", "longitud", "codigo_igac",
-        "area_construida", "financiacion_impuesto_predial"
-    ]
-
-    missing_columns = [col for col in required_columns if col not in df.columns]
-    if missing_columns:
-        st.error(f"El archivo Excel cargado no contiene las siguientes columnas requeridas: {', '.join(missing_columns)}. Por favor, asegúrese de que el archivo sea correcto.")
+    try:
+        with etapa("ingesta") as medicion:
+            df = reservar_dataset(huella_archivo(archivo), lambda: cargar_dataset(archivo.getvalue()), archivo.name)
+            medicion.filas = len(df)
+        return df
+    except ColumnasFaltantesError as e:
+        st.error(f"El archivo Excel cargado no contiene las siguientes columnas requeridas: {', '.join(e.faltantes)}. Por favor, asegúrese de que el archivo sea correcto.")
         st.stop() # Detener la ejecución si faltan columnas
         return pd.DataFrame() # En caso de que st.stop() no detenga completamente el flujo
 
-    # Conversión de tipos y creación de nuevas columnas
-    for col in ["valor_impuesto_a_pagar", "recaudo_predial", "avaluo_catastral",
-                "descuentos_impuesto_predial", "latitud", "longitud", "area_construida"]:
-        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+@st.cache_resource
+def obtener_precomputo():
+    """
+    Artefactos de cada dataset calculados en segundo plano, compartidos por todas las sesiones (ver `predial.precomputo`).
+    """
+    return Precomputo()
 
-    df['saldo'] = df['valor_impuesto_a_pagar'] - df['recaudo_predial']
-    df['cumplimiento'] = df['pago_impuesto_predial'].astype(str).str.lower().isin(['si', 'sí'])
+@st.cache_resource(max_entries=8)
+def obtener_indice_focos(huella, tamano_celda, _df):
+    """
+    Rejilla métrica para focos de mora y consultas por radio (una por huella y tamaño de celda).
+    """
+    with etapa("indice_focos", filas=len(_df)):
+        return focos.IndiceFocos(_df, tamano_celda)
 
+@st.cache_resource
+def obtener_exportador():
+    """
+    Exportaciones en segundo plano, compartidas por todas las sesiones (ver `predial.exportacion`).
+    """
+    return Exportador()
+
+@st.cache_resource
+def obtener_almacen():
+    """
+    Almacén histórico de predios por vigencia (ver `predial.almacen`).
+    """
+    return Almacen()
+
+def cargar_vigencia(vigencia, version, seleccion):
+    """
+    Predios de una vigencia del almacén que cumplen `seleccion` (filtros
+    resueltos en SQL), desde el registro compartido; `version` (última carga)
+    y la selección forman parte de la clave.
+    """
+    almacen = obtener_almacen()
+    activos = {col: valor for col, valor in seleccion.items() if valor is not None}
+    nombre = f"Vigencia {vigencia}" + (f" ({', '.join(map(str, activos.values()))})" if activos else "")
+    with etapa("consulta_almacen") as medicion:
+        df = reservar_dataset(
+            ("vigencia", str(almacen.ruta.resolve()), vigencia, version, tuple(sorted(activos.items()))),
+            lambda: almacen.consultar(vigencia, activos), nombre
+        )
+        medicion.filas = len(df)
     return df
 
-uploaded_file = st.file_uploader("Cargar archivo Excel con datos prediales", type=["xlsx"])
+@st.cache_data(max_entries=32)
+def opciones_vigencia(vigencia, version):
+    """
+    Valores de cada filtro global en una vigencia del almacén.
+    """
+    return obtener_almacen().opciones(vigencia)
 
-df = pd.DataFrame() # Inicializa df como DataFrame vacío
-if uploaded_file:
-    # Pasa el buffer del archivo a la función cacheada
-    df = load_and_preprocess_data(uploaded_file)
-else:
-    st.info("Por favor, cargue un archivo Excel para comenzar el análisis.")
+# Morosos recurrentes que se traen del almacén para la tabla (los de mayor mora acumulada)
+MAXIMO_RECURRENTES = 5000
 
-# A partir de aquí, el resto de tu código usaría `df` para el filtrado y visualización.
-# Asegúrate de que toda la lógica de filtrado y visualización se realice *después* de que df se haya cargado.
+@st.cache_data(max_entries=32)
+def mora_multianual(clave_filtros, version):
+    """
+    Mora por vigencia y morosos recurrentes, agregados en el almacén con los filtros globales.
+    """
+    almacen = obtener_almacen()
+    seleccion = dict(clave_filtros)
+    return almacen.mora_por_vigencia(seleccion), almacen.morosos_recurrentes(2, seleccion, limite=MAXIMO_RECURRENTES)
 
-if not df.empty: # Solo procede si el DataFrame no está vacío
+# Máximo de predios visibles que se dibujan uno a uno; por encima se agregan por celdas
+MAXIMO_PUNTOS_MAPA = 2000
+
+@st.experimental_fragment
+def mapa_adaptativo(clave, indice, df_centro, capas):
+    """
+    Muestra un mapa cuyo contenido depende del zoom y de la zona visible.
+
+    Cada capa es un dict con `df` (subconjunto del dataset), `popup` (función
+    que recibe las filas a dibujar y devuelve sus textos), `color` y, de forma
+    opcional, `nombre`, `radio`, `opacidad` y `medias` (dict `{etiqueta: columna}`
+    que se promedia por celda). Si los predios visibles superan
+    `MAXIMO_PUNTOS_MAPA`, se muestran celdas agregadas con número de predios,
+    saldo y las medias pedidas.
+
+    Es un fragmento: al mover o acercar el mapa solo se vuelve a ejecutar
+    esta función (nuevas capas para la zona visible), no el script completo.
+    """
+    if indice is None:
+        # Sin índice espacial (su precálculo falló y el error ya se mostró) no hay mapa
+        return
+
+    # El componente guarda en session_state el último zoom y límites del mapa
+    vista = st.session_state.get(clave) or {}
+    zoom = vista.get("zoom") or 13
+    limites = None
+    if vista.get("bounds") and vista["bounds"].get("_southWest", {}).get("lat") is not None:
+        so, ne = vista["bounds"]["_southWest"], vista["bounds"]["_northEast"]
+        limites = ((so["lat"], so["lng"]), (ne["lat"], ne["lng"]))
+
+    # Por capa: posiciones en el dataset del índice y posiciones de fila en `capa["df"]`
+    visibles = []
+    for capa in capas:
+        posiciones = indice.posiciones_de(capa["df"])
+        filas = np.arange(len(posiciones))
+        if limites is not None:
+            filas = filas[indice.dentro_de(posiciones, limites)]
+            posiciones = posiciones[filas]
+        visibles.append((posiciones, filas))
+
+    grupo = folium.FeatureGroup(name="predios")
+    with etapa("mapa:capas", filas=sum(len(p) for p, _ in visibles)):
+        _dibujar_capas(grupo, indice, capas, visibles, zoom)
+
+    with etapa("mapa:st_folium"):
+        st_folium(
+            crear_mapa(df_centro), key=clave, width=1000, height=500,
+            returned_objects=["zoom", "bounds"], feature_group_to_add=grupo
+        )
+
+def _dibujar_capas(grupo, indice, capas, visibles, zoom):
+    # Predios uno a uno o celdas agregadas, según cuántos predios son visibles
+    if sum(len(p) for p, _ in visibles) <= MAXIMO_PUNTOS_MAPA:
+        for capa, (_, filas) in zip(capas, visibles):
+            filas = capa["df"].iloc[filas]
+            capa_puntos(
+                filas, capa["popup"](filas), color=capa["color"], radio=capa.get("radio", 5),
+                opacidad=capa.get("opacidad", 0.6), nombre=capa.get("nombre")
+            ).add_to(grupo)
+    else:
+        nivel = nivel_para_zoom(zoom)
+        for capa, (posiciones, filas) in zip(capas, visibles):
+            filas = capa["df"].iloc[filas]
+            medias = {etiqueta: filas[col].to_numpy() for etiqueta, col in capa.get("medias", {}).items()}
+            celdas = indice.agregar(posiciones, nivel, sumas={"saldo": filas["saldo"].to_numpy()}, medias=medias)
+            popups = "Predios: " + celdas["predios"].map("{:,}".format) + "<br>Saldo: " + moneda(celdas["saldo"])
+            for etiqueta in medias:
+                popups = popups + f"<br>{etiqueta}: " + decimal(celdas[etiqueta])
+            capa_celdas(celdas, popups, color=capa["color"], nombre=capa.get("nombre")).add_to(grupo)
+
+# Los resultados por filtros se comparten entre sesiones y cada uno guarda filas
+# del dataset (p. ej. pagados y no pagados): se limitan en número y en tiempo de vida.
+MAXIMO_RESULTADOS = 8
+TTL_RESULTADOS = "15m"
+
+@st.cache_resource(max_entries=MAXIMO_RESULTADOS, ttl=TTL_RESULTADOS)
+def _analisis_memoizado(nombre, huella, clave_filtros, _df):
+    with etapa(f"calculo:{nombre}", filas=len(_df)):
+        return getattr(analisis, nombre)(_df)
+
+def precalculado(nombre, df_filtrado):
+    """
+    Artefacto `nombre` del precómputo si `df_filtrado` es el dataset completo
+    (sin filtros) y el artefacto existe; si no, `None`. Si el artefacto aún
+    se está calculando, espera a que termine en lugar de repetir el cálculo.
+    """
+    if df_filtrado is not artefactos.df or nombre not in artefactos:
+        return None
+    if artefactos.listo(nombre) and artefactos.error(nombre) is not None:
+        # Si el precálculo falló, la vista lo calcula por su cuenta
+        return None
+    return artefactos.resultado(nombre)
+
+def artefacto_opcional(nombre, descripcion):
+    """
+    Artefacto `nombre` del precómputo si ya terminó bien; si falló se muestra
+    su error y, como mientras no termina, se devuelve `None` (la vista sigue
+    sin él).
+    """
+    if not artefactos.listo(nombre):
+        return None
+    error = artefactos.error(nombre)
+    if error is not None:
+        st.error(f"No se pudo preparar {descripcion}: {error}")
+        return None
+    return artefactos.resultado(nombre)
+
+def calcular(nombre, df_filtrado, clave_filtros):
+    """
+    Resultado de `predial.analisis.<nombre>` sobre los datos filtrados,
+    memoizado por (huella del dataset, filtros). Los resultados se comparten
+    entre ejecuciones y sesiones: no deben modificarse.
+    """
+    resultado = precalculado(f"analisis:{nombre}", df_filtrado)
+    if resultado is not None:
+        return resultado
+    return _analisis_memoizado(nombre, df_filtrado.attrs.get("huella"), clave_filtros, df_filtrado)
+
+def vista_informacion_general(df_filtrado, clave_filtros, indice_espacial):
+    st.subheader("📊 Información General")
+
+    # Sale del cubo de agregación: no recorre las filas del dataset
+    resumen_df = cubo.resumen(dict(clave_filtros))
+
+    format_mapping = {
+        "Avalúo total": "${:,.0f}",
+        "Impuesto total": "${:,.0f}",
+        "Recaudo total": "${:,.0f}",
+        "Descuento total": "${:,.0f}",
+        "Saldo por pagar": "${:,.0f}"
+    }
+
+    try:
+        st.dataframe(
+            resumen_df.style.format(format_mapping)
+        )
+    except Exception as e:
+        st.warning(f"No se pudo aplicar formato de estilo a la tabla: {e}. Mostrando tabla sin formato.")
+        st.dataframe(resumen_df)
+
+def vista_cumplimiento_tributario(df_filtrado, clave_filtros, indice_espacial):
+    st.subheader("📌 Cumplimiento Tributario")
+
+    resultado = calcular("cumplimiento_tributario", df_filtrado, clave_filtros)
+    pagados = resultado["pagados"]
+    no_pagados = resultado["no_pagados"]
+
+    # KPIs (desde el cubo de agregación)
+    kpis = cubo.kpis(dict(clave_filtros))
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        tasa = kpis["tasa_cumplimiento"]
+        st.metric("Tasa de Cumplimiento", f"{tasa:.2f}%" if tasa is not None else "0%")
+    with col2:
+        recaudo = kpis["recaudo_facturado"]
+        st.metric("Recaudo / Facturado", f"{recaudo:.2f}%" if recaudo is not None else "0%")
+    with col3:
+        st.metric("Predios Pagados", f"{kpis['pagados']:,}")
+
+    # Mapa: Asegurar que hay datos de latitud y longitud válidos para centrar el mapa
+    if tiene_coordenadas(df_filtrado):
+        mapa_adaptativo("mapa_cumplimiento", indice_espacial, df_filtrado, [
+            dict(df=pagados, color='green', nombre="Pagados",
+                 popup=lambda d: "IGAC: " + d['codigo_igac'].astype(str) + "<br>Pagado: " + moneda(d['recaudo_predial'])),
+            dict(df=no_pagados, color='red', nombre="No pagados",
+                 popup=lambda d: "IGAC: " + d['codigo_igac'].astype(str) + "<br>Pendiente: " + moneda(d['valor_impuesto_a_pagar'])),
+        ])
+    else:
+        st.warning("No hay datos de latitud/longitud para mostrar en el mapa de Cumplimiento Tributario o los datos filtrados están vacíos.")
+
+
+    st.markdown("### Tabla de Predios que Pagaron")
+    if not pagados.empty:
+        tabla_paginada(
+            pagados, ["codigo_igac", "vereda", "sector", "valor_impuesto_a_pagar", "recaudo_predial"],
+            {"valor_impuesto_a_pagar": "${:,.0f}", "recaudo_predial": "${:,.0f}"},
+            clave="tabla_pagados", orden="recaudo_predial", ascendente=False, rankings=[rankings]
+        )
+    else:
+        st.info("No hay predios pagados para mostrar con los filtros actuales.")
+
+def vista_cartera_morosa(df_filtrado, clave_filtros, indice_espacial):
+    st.subheader("📉 Segmentación de Cartera Morosa")
+
+    kpis = cubo.kpis(dict(clave_filtros))
+    st.markdown(f"**Número total de predios morosos:** {kpis['morosos']:,}")
+    st.markdown(f"**Valor total en mora:** ${kpis['valor_mora']:,.0f}")
+
+    morosos = calcular("cartera_morosa", df_filtrado, clave_filtros)["morosos"]
+
+    # Mapa de morosos
+    if tiene_coordenadas(morosos):
+        mapa_adaptativo("mapa_morosos", indice_espacial, morosos, [
+            dict(df=morosos, color='red',
+                 popup=lambda d: "IGAC: " + d['codigo_igac'].astype(str) + "<br>Impuesto: " + moneda(d['valor_impuesto_a_pagar'])),
+        ])
+    else:
+        st.warning("No hay datos de latitud/longitud para mostrar en el mapa de Cartera Morosa o no hay predios morosos con los filtros actuales.")
+
+
+    st.markdown("### Tabla de Predios Morosos")
+    if not morosos.empty:
+        tabla_paginada(
+            morosos, ["codigo_igac", "vereda", "sector", "destino_economico_predio", "avaluo_catastral", "valor_impuesto_a_pagar", "area_construida"],
+            {"avaluo_catastral": "${:,.0f}", "valor_impuesto_a_pagar": "${:,.0f}"},
+            clave="tabla_morosos", rankings=[rankings]
+        )
+    else:
+        st.info("No hay predios morosos para mostrar con los filtros actuales.")
+
+def vista_oportunidades_catastrales(df_filtrado, clave_filtros, indice_espacial):
+    st.subheader("🏗️ Oportunidades de Actualización Catastral")
+
+    oportunidades = calcular("oportunidades_catastrales", df_filtrado, clave_filtros)
+
+    st.markdown(f"**Total de predios con posibles oportunidades catastrales:** {len(oportunidades):,}")
+
+    if tiene_coordenadas(oportunidades):
+        mapa_adaptativo("mapa_oportunidades", indice_espacial, oportunidades, [
+            dict(df=oportunidades, color='orange',
+                 popup=lambda d: "IGAC: " + d['codigo_igac'].astype(str)
+                 + "<br>Área: " + d['area_construida'].astype(str)
+                 + "<br>Avalúo: " + moneda(d['avaluo_catastral'])
+                 + "<br>Impuesto: " + moneda(d['valor_impuesto_a_pagar'])),
+        ])
+    else:
+        st.warning("No hay datos de latitud/longitud para mostrar en el mapa de Oportunidades Catastrales o no hay oportunidades con los filtros actuales.")
+
+    st.markdown("### Tabla de Predios con Oportunidades Catastrales")
+    if not oportunidades.empty:
+        tabla_paginada(
+            oportunidades, ["codigo_igac", "vereda", "sector", "avaluo_catastral", "valor_impuesto_a_pagar", "area_construida"],
+            {"avaluo_catastral": "${:,.0f}", "valor_impuesto_a_pagar": "${:,.0f}"},
+            clave="tabla_oportunidades", rankings=[rankings]
+        )
+    else:
+        st.info("No hay predios con oportunidades catastrales para mostrar con los filtros actuales.")
+
+@st.cache_resource(max_entries=MAXIMO_RESULTADOS, ttl=TTL_RESULTADOS)
+def _cobro_memoizado(huella, clave_filtros, criterio, valor, _df, _rankings):
+    with etapa("calculo:estrategias_cobro", filas=len(_df)):
+        if criterio == "percentil":
+            return analisis.morosos_sobre_percentil(_df, valor, rankings=_rankings)
+        return analisis.estrategias_cobro(_df, valor, _rankings)
+
+def vista_estrategias_cobro(df_filtrado, clave_filtros, indice_espacial):
+    st.subheader("💼 Estrategias de Cobro")
+
+    # Salen del ranking precalculado del impuesto: cambiar N o el percentil no reordena
+    col1, col2 = st.columns(2)
+    with col1:
+        criterio = st.radio("Focalizar", ["Top N", "Sobre un percentil"], horizontal=True, key="cobro_criterio")
+    with col2:
+        if criterio == "Top N":
+            valor = st.number_input("Número de predios", 1, 10_000, analisis.TOP_COBRO, key="cobro_n")
+        else:
+            valor = st.slider("Percentil del impuesto entre los morosos", 50, 99, 90, key="cobro_percentil")
+
+    predios_focalizables = _cobro_memoizado(
+        df_filtrado.attrs.get("huella"), clave_filtros,
+        "top" if criterio == "Top N" else "percentil", valor, df_filtrado, rankings
+    )
+
+    if criterio == "Top N":
+        st.markdown(f"**Top {valor:,} predios con mayor valor de impuesto en mora:**")
+    else:
+        st.markdown(f"**{len(predios_focalizables):,} predios morosos con impuesto en o sobre el percentil {valor}:**")
+
+    if tiene_coordenadas(predios_focalizables):
+        mapa_adaptativo("mapa_cobro", indice_espacial, predios_focalizables, [
+            dict(df=predios_focalizables, color='blue', radio=6,
+                 popup=lambda d: "IGAC: " + d['codigo_igac'].astype(str) + "<br>Mora: " + moneda(d['valor_impuesto_a_pagar'])),
+        ])
+    else:
+        st.warning("No hay datos de latitud/longitud para mostrar en el mapa de Estrategias de Cobro o no hay predios focalizables con los filtros actuales.")
+
+    st.markdown("### Tabla de Predios Focalizados para Cobro")
+    if not predios_focalizables.empty:
+        tabla_paginada(
+            predios_focalizables, ["codigo_igac", "vereda", "sector", "avaluo_catastral", "valor_impuesto_a_pagar", "area_construida"],
+            {"avaluo_catastral": "${:,.0f}", "valor_impuesto_a_pagar": "${:,.0f}"},
+            clave="tabla_cobro", orden="valor_impuesto_a_pagar", ascendente=False, rankings=[rankings]
+        )
+    else:
+        st.info("No hay predios focalizados para cobro con los filtros actuales.")
+
+
+    st.markdown("### 📌 Recomendaciones Estratégicas")
+    st.markdown("""
+- Iniciar acuerdos de pago con predios con mora mayor a $10 millones en sectores urbanos con alta valorización.
+- Priorizar visitas de notificación en veredas con concentración de predios morosos (ver 🔥 Focos de Mora).
+- Enviar comunicaciones formales a predios con más de 2 años consecutivos de mora.
+- Implementar campañas de condonación parcial de intereses para predios pequeños rurales.
+- Generar alertas automáticas para predios con alta mora y sin pago ni financiación.
+""")
+
+def vista_simulacion_escenarios(df_filtrado, clave_filtros, indice_espacial):
+    st.subheader("🔮 Simulación de Escenarios de Recaudo")
+
+    total_morosidad = cubo.kpis(dict(clave_filtros))["valor_mora"]
+
+    st.markdown(f"**Valor total en mora:** ${total_morosidad:,.0f}")
+
+    for e, valor in analisis.escenarios_cobertura(total_morosidad):
+        st.markdown(f"**→ {e}% cobertura:** ${valor:,.0f}")
+
+    st.markdown("### Simulación Monte Carlo del Recaudo")
+    st.caption(
+        "Cada predio moroso paga o no según una probabilidad estimada con un modelo logístico "
+        "(componentes de riesgo, financiación, sector y monto); se simulan miles de escenarios."
+    )
+    with st.expander("⚙️ Parámetros de la simulación"):
+        base = ConfigSimulacion()
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            simulaciones = st.select_slider("Escenarios simulados", [5_000, 10_000, 20_000, 50_000], base.simulaciones)
+            semilla = st.number_input("Semilla", 0, 10_000, base.semilla)
+        with col2:
+            intercepto = st.slider("Intercepto (propensión base a pagar)", -3.0, 3.0, base.intercepto, 0.1)
+            coef_financiacion = st.slider("Efecto de la financiación", 0.0, 2.0, base.coef_financiacion, 0.1)
+        with col3:
+            coef_comportamental = st.slider("Efecto del riesgo comportamental", -1.0, 0.0, base.coef_comportamental, 0.05)
+            coef_monto = st.slider("Efecto del monto en mora", -1.0, 0.5, base.coef_monto, 0.05)
+
+    config = ConfigSimulacion(
+        intercepto=intercepto, coef_financiacion=coef_financiacion, coef_comportamental=coef_comportamental,
+        coef_monto=coef_monto, simulaciones=simulaciones, semilla=semilla,
+    )
+    resultado = precalculado("simulacion", df_filtrado) if config == ConfigSimulacion() else None
+    if resultado is None:
+        resultado = _simulacion_memoizada(df_filtrado.attrs.get("huella"), clave_filtros, config, df_filtrado)
+    simulacion, ranking_aporte = resultado
+    total = simulacion["total"]
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Recaudo esperado", f"${total['esperado']:,.0f}")
+    col2.metric("P10", f"${total['p10']:,.0f}")
+    col3.metric("P50", f"${total['p50']:,.0f}")
+    col4.metric("P90", f"${total['p90']:,.0f}")
+
+    if len(simulacion["escenarios_total"]):
+        fig = px.histogram(x=simulacion["escenarios_total"], nbins=60, labels={"x": "Recaudo simulado"},
+                           title="Distribución del recaudo simulado")
+        fig.update_layout(yaxis_title="Escenarios", showlegend=False)
+        st.plotly_chart(fig, use_container_width=True)
+
+    formatos_grupo = {"predios": "{:,.0f}", "mora": "${:,.0f}", "esperado": "${:,.0f}", "p10": "${:,.0f}", "p50": "${:,.0f}", "p90": "${:,.0f}"}
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**Por sector**")
+        st.dataframe(simulacion["por_sector"].style.format(formatos_grupo), use_container_width=True)
+    with col2:
+        st.markdown("**Por vereda**")
+        st.dataframe(
+            simulacion["por_vereda"].sort_values("esperado", ascending=False).style.format(formatos_grupo),
+            use_container_width=True
+        )
+
+    st.markdown("### Mapa y Tabla de Predios Simulados (100%)")
+    predios_simulados = simulacion["predios"]
+
+    if tiene_coordenadas(predios_simulados):
+        mapa_adaptativo("mapa_simulacion", indice_espacial, predios_simulados, [
+            dict(df=predios_simulados, color='blue', opacidad=0.4,
+                 popup=lambda d: "IGAC: " + d['codigo_igac'].astype(str) + "<br>Impuesto: " + moneda(d['valor_impuesto_a_pagar'])
+                 + "<br>Probabilidad de pago: " + decimal(d['probabilidad_pago'])),
+        ])
+    else:
+        st.warning("No hay datos de latitud/longitud para mostrar en el mapa de Simulación de Escenarios o no hay predios para simular con los filtros actuales.")
+
+    st.markdown("### Tabla de Predios Involucrados en Simulación")
+    st.caption("Ordenados por aporte esperado (probabilidad de pago × impuesto): los que más pesan en el recaudo probable.")
+    if not predios_simulados.empty:
+        tabla_paginada(
+            predios_simulados, ["codigo_igac", "vereda", "sector", "valor_impuesto_a_pagar", "probabilidad_pago", "aporte_esperado"],
+            {"valor_impuesto_a_pagar": "${:,.0f}", "probabilidad_pago": "{:.1%}", "aporte_esperado": "${:,.0f}"},
+            clave="tabla_simulacion", orden="aporte_esperado", ascendente=False, rankings=[ranking_aporte, rankings]
+        )
+    else:
+        st.info("No hay predios para simular con los filtros actuales.")
+
+@st.cache_resource(max_entries=MAXIMO_RESULTADOS // 2, ttl=TTL_RESULTADOS)
+def _simulacion_memoizada(huella, clave_filtros, config, _df):
+    """
+    Simulación Monte Carlo de los datos filtrados y ranking de los morosos por aporte esperado.
+    """
+    componentes = obtener_motor_riesgo(huella, clave_filtros, _df).componentes(ConfigRiesgo())
+    with etapa("calculo:simulacion_recaudo", filas=len(_df)):
+        simulacion = simular_recaudo(_df, config, componentes)
+        return simulacion, IndiceRankings(simulacion["predios"], ["aporte_esperado", "probabilidad_pago"])
+
+@st.cache_resource(max_entries=MAXIMO_RESULTADOS // 2, ttl=TTL_RESULTADOS)
+def obtener_motor_riesgo(huella, clave_filtros, _df):
+    """
+    Motor de riesgo de los datos filtrados; guarda los componentes por umbrales.
+    """
+    motor = precalculado("motor_riesgo", _df)
+    return motor if motor is not None else MotorRiesgo(_df)
+
+@st.cache_resource(max_entries=MAXIMO_RESULTADOS // 2, ttl=TTL_RESULTADOS)
+def _riesgo_memoizado(huella, clave_filtros, config, _df):
+    """
+    Puntajes de riesgo de los datos filtrados y su ranking por `riesgo_total`.
+    """
+    motor = obtener_motor_riesgo(huella, clave_filtros, _df)
+    with etapa("calculo:riesgo_geoespacial", filas=len(_df)):
+        df_riesgo = analisis.riesgo_geoespacial(_df, config, motor)
+        return df_riesgo, IndiceRankings(df_riesgo, ["riesgo_total"])
+
+def vista_riesgo_geoespacial(df_filtrado, clave_filtros, indice_espacial):
+    st.subheader("🗺️ Mapa de Riesgo Tributario Geoespacial")
+
+    with st.expander("⚙️ Parámetros del modelo de riesgo"):
+        base = ConfigRiesgo()
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            peso_fiscal = st.slider("Peso riesgo fiscal", 0.0, 1.0, base.peso_fiscal, 0.05)
+            grupos_fiscales = st.slider("Grupos de impuesto (riesgo fiscal)", 2, 10, base.grupos_fiscales)
+        with col2:
+            peso_catastral = st.slider("Peso riesgo catastral", 0.0, 1.0, base.peso_catastral, 0.05)
+            cuantil_area_baja = st.slider("Cuantil de área construida baja", 0.05, 0.5, base.cuantil_area_baja, 0.05)
+        with col3:
+            peso_comportamental = st.slider("Peso riesgo comportamental", 0.0, 1.0, base.peso_comportamental, 0.05)
+            cuantil_avaluo_alto = st.slider("Cuantil de avalúo alto", 0.5, 0.95, base.cuantil_avaluo_alto, 0.05)
+
+    config = ConfigRiesgo(
+        peso_fiscal=peso_fiscal, peso_catastral=peso_catastral, peso_comportamental=peso_comportamental,
+        grupos_fiscales=grupos_fiscales, cuantil_area_baja=cuantil_area_baja, cuantil_avaluo_alto=cuantil_avaluo_alto,
+    )
+    resultado = precalculado("riesgo", df_filtrado) if config == ConfigRiesgo() else None
+    if resultado is None:
+        resultado = _riesgo_memoizado(df_filtrado.attrs.get("huella"), clave_filtros, config, df_filtrado)
+    df_riesgo, ranking_riesgo = resultado
+
+    if tiene_coordenadas(df_riesgo):
+        mapa_adaptativo("mapa_riesgo", indice_espacial, df_riesgo, [
+            dict(df=df_riesgo, color='darkred', opacidad=0.5, medias={"Riesgo medio": "riesgo_total"},
+                 popup=lambda d: "IGAC: " + d['codigo_igac'].astype(str) + "<br>Riesgo Total: " + decimal(d['riesgo_total'])),
+        ])
+    else:
+        st.warning("No hay datos de latitud/longitud para mostrar en el mapa de Riesgo Tributario o los datos filtrados están vacíos.")
+
+    st.markdown("### Tabla de Predios con Mayor Riesgo")
+    if not df_riesgo.empty:
+        tabla_paginada(
+            df_riesgo, ["codigo_igac", "vereda", "sector", "valor_impuesto_a_pagar", "avaluo_catastral", "area_construida", "riesgo_total"],
+            {"valor_impuesto_a_pagar": "${:,.0f}", "avaluo_catastral": "${:,.0f}", "riesgo_total": "{:.2f}"},
+            clave="tabla_riesgo", orden="riesgo_total", ascendente=False,
+            rankings=[ranking_riesgo, rankings]
+        )
+    else:
+        st.info("No hay predios con mayor riesgo para mostrar con los filtros actuales.")
+
+@st.cache_resource(max_entries=MAXIMO_RESULTADOS, ttl=TTL_RESULTADOS)
+def _focos_memoizados(huella, clave_filtros, tamano_celda, percentil, minimo_predios, _df, _indice):
+    """
+    Focos de los morosos filtrados, ponderados por saldo: (tabla de focos, posiciones de los morosos, foco de cada uno).
+    """
+    with etapa("calculo:focos_mora", filas=len(_df)):
+        morosos = _df[~_df['cumplimiento']]
+        posiciones = morosos.index.to_numpy()
+        tabla, foco = _indice.focos(posiciones, morosos['saldo'].clip(lower=0).to_numpy(), percentil, minimo_predios)
+        return tabla, posiciones, foco
+
+def vista_focos_mora(df_filtrado, clave_filtros, indice_espacial):
+    st.subheader("🔥 Focos de Mora")
+    st.caption(
+        "Zonas donde se concentra el saldo de los predios morosos: celdas con saldo en o sobre el percentil "
+        "elegido, unidas con sus vecinas. Los focos se numeran de mayor a menor saldo."
+    )
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        tamano_celda = st.select_slider("Tamaño de celda (m)", [100, 250, 500, 1000], focos.TAMANO_CELDA_M, key="focos_celda")
+    with col2:
+        percentil = st.slider("Percentil de saldo de las celdas densas", 50, 99, focos.PERCENTIL_DENSIDAD, key="focos_percentil")
+    with col3:
+        minimo_predios = st.number_input("Mínimo de morosos por celda", 1, 100, focos.MINIMO_PREDIOS_CELDA, key="focos_minimo")
+
+    base = motor_filtros.df
+    if tamano_celda == focos.TAMANO_CELDA_M and artefactos.error("indice_focos") is None:
+        indice = artefactos.resultado("indice_focos")
+    else:
+        indice = obtener_indice_focos(base.attrs.get("huella"), tamano_celda, base)
+    tabla_focos, posiciones, foco = _focos_memoizados(
+        df_filtrado.attrs.get("huella"), clave_filtros, tamano_celda, percentil, minimo_predios, df_filtrado, indice
+    )
+
+    saldo_morosos = df_filtrado.loc[posiciones, 'saldo'].clip(lower=0).sum() if len(posiciones) else 0
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Focos", f"{len(tabla_focos):,}")
+    col2.metric("Morosos en focos", f"{int((foco > 0).sum()):,} de {len(posiciones):,}")
+    saldo_focos = tabla_focos['saldo'].sum()
+    col3.metric("Saldo en focos", f"${saldo_focos:,.0f}", f"{saldo_focos / saldo_morosos * 100:.1f}% del saldo moroso" if saldo_morosos else None, delta_color="off")
+
+    if tabla_focos.empty:
+        st.info("No hay focos de mora con los filtros y parámetros actuales.")
+        return
+
+    mapa = crear_mapa(tabla_focos, zoom_start=12)
+    popups = (
+        "Foco " + tabla_focos['foco'].astype(str) + "<br>Predios: " + tabla_focos['predios'].map("{:,}".format)
+        + "<br>Saldo: " + moneda(tabla_focos['saldo']) + "<br>Radio: " + tabla_focos['radio_m'].map("{:,.0f} m".format)
+    )
+    capa_focos(tabla_focos, popups).add_to(mapa)
+    with etapa("mapa:st_folium"):
+        st_folium(mapa, key="mapa_focos", width=1000, height=500, returned_objects=[])
+
+    st.markdown("### Focos Ordenados por Saldo")
+    st.dataframe(
+        tabla_focos.drop(columns=["latitud", "longitud"]).style.format({
+            "predios": "{:,}", "saldo": "${:,.0f}", "radio_m": "{:,.0f}", "saldo_km2": "${:,.0f}"
+        }),
+        hide_index=True, use_container_width=True
+    )
+    controles_exportacion(tabla_focos, list(tabla_focos.columns), "tabla_focos", "focos_mora")
+
+    st.markdown("### Ruta de Notificación")
+    numero = st.selectbox("Foco", tabla_focos['foco'].tolist(), key="focos_ruta")
+    en_foco = foco == numero
+    ruta, distancias = indice.ruta(posiciones[en_foco], df_filtrado.loc[posiciones[en_foco], 'saldo'].clip(lower=0).to_numpy())
+    st.caption(
+        f"Los {len(ruta):,} predios de mayor saldo del foco {numero}, desde el de mayor saldo "
+        "y siguiendo siempre al más cercano."
+    )
+    tabla_ruta = df_filtrado.loc[ruta, ["codigo_igac", "vereda", "sector_urbano", "saldo"]].reset_index(drop=True)
+    tabla_ruta.insert(0, "orden", np.arange(1, len(ruta) + 1))
+    tabla_ruta["distancia_m"] = distancias
+    tabla_ruta["acumulado_m"] = np.cumsum(distancias)
+    st.dataframe(
+        tabla_ruta.style.format({"saldo": "${:,.0f}", "distancia_m": "{:,.0f}", "acumulado_m": "{:,.0f}"}),
+        hide_index=True, use_container_width=True
+    )
+    controles_exportacion(
+        tabla_ruta, list(tabla_ruta.columns), "tabla_ruta", f"ruta_foco_{numero}",
+        firma=(clave_filtros, tamano_celda, percentil, minimo_predios, numero)
+    )
+
+    st.markdown("### Predios Cercanos a un Predio")
+    col1, col2, col3 = st.columns([3, 2, 2])
+    with col1:
+        codigo = st.text_input("Código IGAC", str(tabla_ruta['codigo_igac'].iloc[0]) if len(tabla_ruta) else "", key="focos_codigo")
+    with col2:
+        radio = st.slider("Radio (m)", 50, 2000, 300, 50, key="focos_radio")
+    with col3:
+        solo_morosos = st.checkbox("Solo morosos filtrados", True, key="focos_solo_morosos")
+
+    coincidencias = np.flatnonzero((base['codigo_igac'] == codigo.strip()).fillna(False).to_numpy())
+    if len(coincidencias) == 0:
+        st.info("Escriba el código IGAC de un predio para ver los predios a su alrededor.")
+        return
+    cercanos, distancias = indice.vecinos(int(coincidencias[0]), radio, posiciones if solo_morosos else None)
+    st.caption(f"{len(cercanos):,} predios a menos de {radio:,} m (incluye el predio consultado).")
+    if len(cercanos):
+        tabla_cercanos = base.iloc[cercanos][["codigo_igac", "vereda", "sector", "cumplimiento", "saldo"]].reset_index(drop=True)
+        tabla_cercanos["distancia_m"] = distancias
+        tabla_paginada(
+            tabla_cercanos, list(tabla_cercanos.columns), {"saldo": "${:,.0f}", "distancia_m": "{:,.0f}"},
+            clave="tabla_cercanos",
+            firma=(clave_filtros, tamano_celda, percentil, minimo_predios, codigo.strip(), radio, solo_morosos)
+        )
+
+def vista_mora_multianual(df_filtrado, clave_filtros, indice_espacial):
+    st.subheader("📅 Mora Multianual")
+    st.caption("Calculada en el almacén histórico con los filtros globales, sobre todas las vigencias guardadas.")
+
+    por_vigencia, recurrentes = mora_multianual(clave_filtros, obtener_almacen().version())
+    if por_vigencia.empty:
+        st.info("El almacén no tiene predios para los filtros actuales.")
+        return
+
+    st.dataframe(
+        por_vigencia.set_index("vigencia").style.format({
+            "predios": "{:,.0f}", "morosos": "{:,.0f}", "valor_mora": "${:,.0f}",
+            "saldo": "${:,.0f}", "tasa_cumplimiento": "{:.2f}%"
+        }),
+        use_container_width=True
+    )
+    fig = px.line(por_vigencia, x="vigencia", y="valor_mora", markers=True, title="Valor en mora por vigencia")
+    fig.update_xaxes(type="category")
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.markdown("### Predios en Mora en Varias Vigencias")
+    if not recurrentes.empty:
+        if len(recurrentes) == MAXIMO_RECURRENTES:
+            st.caption(f"Se muestran los {MAXIMO_RECURRENTES:,} predios con mayor mora acumulada.")
+        tabla_paginada(
+            recurrentes, ["codigo_igac", "vigencias_en_mora", "primera", "ultima", "mora_acumulada"],
+            {"mora_acumulada": "${:,.0f}"},
+            clave="tabla_recurrentes", firma=(clave_filtros, obtener_almacen().version())
+        )
+    else:
+        st.info("Ningún predio está en mora en más de una vigencia con los filtros actuales.")
+
+def tabla_paginada(df, columnas, formatos, clave, orden=None, ascendente=True, rankings=(), firma=None):
+    """
+    Tabla paginada en el servidor: ordena y corta `df` y solo formatea y envía
+    la página visible. `orden`/`ascendente` son el orden inicial (`None`
+    conserva el orden de `df`). Si alguno de `rankings` (índices de los
+    datos de los que se extrajo `df`; se ignoran los `None`) tiene la columna
+    elegida, la página sale de su orden precalculado.
+
+    Debajo de la tabla se puede exportar completa, en el orden elegido (ver
+    `controles_exportacion`, que también explica `firma`).
+    """
+    sin_orden = "(orden actual)"
+    col1, col2, col3, col4 = st.columns([3, 2, 2, 2])
+    with col1:
+        opciones = [sin_orden] + columnas
+        columna = st.selectbox("Ordenar por", opciones, index=opciones.index(orden or sin_orden), key=f"{clave}_orden")
+    with col2:
+        sentido = st.selectbox("Sentido", ["Descendente", "Ascendente"], index=1 if ascendente else 0, key=f"{clave}_sentido")
+    with col3:
+        tamano = st.selectbox("Filas por página", TAMANOS_PAGINA, index=1, key=f"{clave}_tamano")
+    with col4:
+        paginas = total_paginas(len(df), tamano)
+        # Si los filtros reducen el número de páginas, se vuelve a la última disponible
+        if st.session_state.get(f"{clave}_pagina", 1) > paginas:
+            st.session_state[f"{clave}_pagina"] = paginas
+        numero = st.number_input(f"Página (de {paginas:,})", 1, paginas, 1, key=f"{clave}_pagina")
+
+    orden = None if columna == sin_orden else columna
+    ranking = next((r for r in rankings if r is not None and orden in r), None)
+    with etapa("tabla:pagina", filas=len(df)):
+        tabla = pagina(df, columnas, orden, sentido == "Ascendente", numero, tamano, ranking)
+        st.dataframe(tabla.style.format(formatos), use_container_width=True)
+    inicio = (numero - 1) * tamano
+    st.caption(f"Filas {inicio + 1:,}–{inicio + len(tabla):,} de {len(df):,}")
+
+    ascendente = sentido == "Ascendente"
+    controles_exportacion(
+        df, columnas, clave, clave.removeprefix("tabla_"),
+        # El orden completo se calcula en el hilo de la exportación
+        posiciones=None if orden is None else lambda: posiciones_pagina(df, orden, ascendente, 1, len(df), ranking),
+        firma=(firma if firma is not None else id(df), orden, ascendente),
+    )
+
+@st.experimental_fragment(run_every=1)
+def _esperar_exportacion(clave):
+    # Solo este fragmento se vuelve a ejecutar mientras el archivo se prepara
+    if st.session_state[f"{clave}_exportacion"]["futuro"].done():
+        st.rerun()
+    st.caption("⏳ Preparando el archivo…")
+
+def controles_exportacion(df, columnas, clave, nombre, posiciones=None, firma=None):
+    """
+    Exporta `df` (solo `columnas`, en el orden de `posiciones`) a CSV, XLSX o
+    Parquet en segundo plano; cuando el archivo está listo se puede preparar
+    (leerlo del disco) y descargar, sin bloquear la interfaz mientras tanto.
+
+    `firma` identifica los datos exportados: si cambia (otros filtros u
+    orden), la exportación anterior deja de ofrecerse. Por defecto es la
+    identidad de `df`, válida para resultados memoizados.
+    """
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        formato = st.selectbox("Formato", list(FORMATOS), key=f"{clave}_formato", label_visibility="collapsed")
+    firma = (firma if firma is not None else id(df), tuple(columnas), formato)
+    estado = st.session_state.get(f"{clave}_exportacion")
+    if estado is not None and estado["firma"] != firma:
+        estado = None
+
+    with col2:
+        if estado is None:
+            if st.button(f"⬇️ Exportar {len(df):,} filas ({formato})", key=f"{clave}_exportar"):
+                futuro = obtener_exportador().iniciar(df, formato, columnas, posiciones)
+                # Se guarda `df` para que su identidad (la firma por defecto) no se reutilice
+                st.session_state[f"{clave}_exportacion"] = estado = {"firma": firma, "futuro": futuro, "df": df}
+        if estado is None:
+            return
+        futuro = estado["futuro"]
+        if not futuro.done():
+            _esperar_exportacion(clave)
+        elif futuro.exception() is not None:
+            st.error(f"No se pudo exportar: {futuro.exception()}")
+            del st.session_state[f"{clave}_exportacion"]
+        else:
+            extension, mime = FORMATOS[formato]
+            ruta = futuro.result()
+            # El archivo se lee solo cuando se pide la descarga; hasta entonces solo ocupa disco
+            if "datos" not in estado:
+                try:
+                    megas = ruta.stat().st_size / 2**20
+                    if st.button(f"📦 Preparar {nombre}{extension} ({megas:,.1f} MB)", key=f"{clave}_preparar"):
+                        estado["datos"] = ruta.read_bytes()
+                        st.rerun()
+                except FileNotFoundError:
+                    # El archivo se borró al superar el límite de exportaciones guardadas
+                    del st.session_state[f"{clave}_exportacion"]
+                    st.rerun()
+            if "datos" in estado:
+                # Tras la descarga se sueltan los bytes (el archivo sigue en disco)
+                st.download_button(
+                    f"💾 Descargar {nombre}{extension}", estado["datos"], file_name=f"{nombre}{extension}", mime=mime,
+                    key=f"{clave}_descargar", on_click=estado.pop, args=("datos", None)
+                )
+
+
+VISTAS = {
+    "📊 Información General": vista_informacion_general,
+    "📌 Cumplimiento Tributario": vista_cumplimiento_tributario,
+    "📉 Cartera Morosa": vista_cartera_morosa,
+    "🏗️ Oportunidades Catastrales": vista_oportunidades_catastrales,
+    "💼 Estrategias de Cobro": vista_estrategias_cobro,
+    "🔮 Simulación de Escenarios": vista_simulacion_escenarios,
+    "🗺️ Riesgo Geoespacial": vista_riesgo_geoespacial,
+    "🔥 Focos de Mora": vista_focos_mora,
+}
+
+# Artefactos del precómputo que necesita cada vista (ver `predial.precomputo`)
+_MAPAS = ["indice_espacial", "niveles_mapa", "rankings"]
+REQUISITOS = {
+    "📌 Cumplimiento Tributario": _MAPAS + ["analisis:cumplimiento_tributario"],
+    "📉 Cartera Morosa": _MAPAS + ["analisis:cartera_morosa"],
+    "🏗️ Oportunidades Catastrales": _MAPAS + ["analisis:oportunidades_catastrales"],
+    "💼 Estrategias de Cobro": _MAPAS,
+    "🔮 Simulación de Escenarios": _MAPAS + ["motor_riesgo", "simulacion"],
+    "🗺️ Riesgo Geoespacial": _MAPAS + ["motor_riesgo", "riesgo"],
+    "🔥 Focos de Mora": _MAPAS + ["indice_focos"],
+}
+
+# Artefactos calculados sobre el dataset completo: con filtros activos la vista no los espera
+SIN_FILTROS = {
+    "analisis:cumplimiento_tributario", "analisis:cartera_morosa", "analisis:oportunidades_catastrales",
+    "motor_riesgo", "riesgo", "simulacion",
+}
+
+@st.experimental_fragment(run_every=1)
+def _progreso_precomputo(artefactos, pendientes):
+    # Solo este fragmento se vuelve a ejecutar mientras se calculan los artefactos; la
+    # página completa, cuando la vista ya tiene lo que necesita o cuando termina todo.
+    if (pendientes and all(artefactos.listo(nombre) for nombre in pendientes)) or artefactos.terminado():
+        st.rerun()
+    estado = artefactos.estado()
+    listos = int((estado["estado"] == "listo").sum())
+    st.progress(artefactos.progreso(), text=f"⏳ Preparando los análisis del dataset: {listos} de {len(estado)} listos")
+    if pendientes:
+        st.info(f"Esta vista se mostrará cuando estén listos: {', '.join(pendientes)}.")
+    with st.expander("Detalle del precálculo"):
+        estado.insert(0, "", estado["estado"].map(ESTADOS))
+        st.dataframe(estado, hide_index=True, use_container_width=True)
+
+def filtros_globales(opciones):
+    """
+    Filtros de la barra lateral; `opciones(columna)` da los valores (no
+    nulos, ordenados) de cada filtro. Devuelve la selección.
+    """
     with st.sidebar:
         st.header("Filtros Globales")
-        # Asegurar que las listas de opciones no contengan NaN antes de unique() y que 'Todos' esté al principio
-        sector_options = ["Todos"] + sorted(df["sector"].dropna().astype(str).unique().tolist())
-        sector_urbano_options = ["Todos"] + sorted(df["sector_urbano"].dropna().astype(str).unique().tolist())
-        vereda_options = ["Todas"] + sorted(df["vereda"].dropna().astype(str).unique().tolist())
-        uso_options = ["Todos"] + sorted(df["destino_economico_predio"].dropna().astype(str).unique().tolist())
+        # Las opciones llevan 'Todos' al principio
+        sector_options = ["Todos"] + opciones("sector")
+        sector_urbano_options = ["Todos"] + opciones("sector_urbano")
+        vereda_options = ["Todas"] + opciones("vereda")
+        uso_options = ["Todos"] + opciones("destino_economico_predio")
 
         sector = st.selectbox("Sector (urbano/rural)", sector_options)
         sector_urbano = st.selectbox("Sector Urbano", sector_urbano_options)
@@ -80,402 +907,129 @@ if not df.empty: # Solo procede si el DataFrame no está vacío
         uso = st.selectbox("Uso del predio", uso_options)
         ph = st.selectbox("Propiedad horizontal", ["Todos", "Sí", "No"])
 
-    def aplicar_filtros(data):
-        dff = data.copy()
-        if sector != "Todos":
-            dff = dff[dff["sector"].astype(str) == sector]
-        if sector_urbano != "Todos":
-            dff = dff[dff["sector_urbano"].astype(str) == sector_urbano]
-        if vereda != "Todas":
-            dff = dff[dff["vereda"].astype(str) == vereda]
-        if uso != "Todos":
-            dff = dff[dff["destino_economico_predio"].astype(str) == uso]
-        if ph != "Todos":
-            if 'propiedad_horizontal' in dff.columns:
-                dff = dff[dff["propiedad_horizontal"].astype(str).str.lower() == ph.lower()]
-        return dff
-
-    df_filtrado = aplicar_filtros(df)
+    return {
+        "sector": None if sector == "Todos" else sector,
+        "sector_urbano": None if sector_urbano == "Todos" else sector_urbano,
+        "vereda": None if vereda == "Todas" else vereda,
+        "destino_economico_predio": None if uso == "Todos" else uso,
+        "propiedad_horizontal": None if ph == "Todos" else ph,
+    }
+
+# El almacén histórico solo aparece como origen una vez se ha guardado alguna vigencia
+origen = "Archivo Excel"
+if RUTA_ALMACEN.exists():
+    origen = st.radio("Origen de los datos", ["Archivo Excel", "Almacén histórico"], horizontal=True)
+
+df = pd.DataFrame() # Inicializa df como DataFrame vacío
+seleccion = None # Selección ya aplicada al cargar (almacén histórico)
+if origen == "Almacén histórico":
+    almacen = obtener_almacen()
+    vigencias = almacen.vigencias()
+    if vigencias:
+        vigencia = st.selectbox("Vigencia", vigencias[::-1])
+        version = almacen.version()
+        # Los filtros se resuelven en la consulta al almacén: solo se cargan los predios seleccionados
+        seleccion = filtros_globales(opciones_vigencia(vigencia, version).get)
+        with etapa("carga") as medicion:
+            df = cargar_vigencia(vigencia, version, seleccion)
+            medicion.filas = len(df)
+        if df.empty:
+            st.warning("Los filtros seleccionados no arrojaron ningún resultado. Por favor, ajuste los filtros.")
+    else:
+        st.info("El almacén histórico todavía no tiene vigencias guardadas.")
+else:
+    uploaded_file = st.file_uploader("Cargar archivo Excel con datos prediales", type=["xlsx"])
+
+    if uploaded_file:
+        # Pasa el contenido del archivo al registro compartido de datasets
+        with etapa("carga") as medicion:
+            df = load_and_preprocess_data(uploaded_file)
+            medicion.filas = len(df)
+
+        with st.sidebar.expander("🗄️ Almacén histórico"):
+            vigencia = st.number_input("Vigencia del archivo", 1990, 2100, date.today().year, key="vigencia_almacen")
+            if st.button("Guardar en el almacén"):
+                # Solo se escriben los predios nuevos o modificados respecto a la vigencia guardada
+                resultado = obtener_almacen().integrar(df, vigencia)
+                if resultado["repetida"]:
+                    st.info(f"Este archivo ya estaba guardado en la vigencia {vigencia}.")
+                else:
+                    st.success(
+                        f"Vigencia {vigencia}: {resultado['nuevos']:,} nuevos, {resultado['modificados']:,} "
+                        f"modificados, {resultado['sin_cambios']:,} sin cambios."
+                    )
+                if resultado["descartados"]:
+                    st.warning(f"{resultado['descartados']:,} filas sin código IGAC o repetidas no se guardaron.")
+    else:
+        st.info("Por favor, cargue un archivo Excel para comenzar el análisis.")
+
+# A partir de aquí, el resto de tu código usaría `df` para el filtrado y visualización.
+# Asegúrate de que toda la lógica de filtrado y visualización se realice *después* de que df se haya cargado.
+
+if not df.empty: # Solo procede si el DataFrame no está vacío
+    # Los artefactos del dataset se calculan en segundo plano; los filtros y el
+    # cubo (primeros de la cola) se esperan porque los usan la barra lateral y
+    # la vista inicial.
+    artefactos = obtener_precomputo().artefactos(st.session_state["reserva_dataset"])
+    motor_filtros = artefactos.resultado("motor_filtros")
+    cubo = artefactos.resultado("cubo")
+
+    if seleccion is None:
+        # Las opciones salen del índice de filtros del dataset
+        seleccion = filtros_globales(motor_filtros.opciones)
+        with etapa("filtro") as medicion:
+            df_filtrado = motor_filtros.filtrar(seleccion)
+            medicion.filas = len(df_filtrado)
+    else:
+        # Los predios del almacén ya llegan filtrados: el dataset es la selección completa
+        df_filtrado = df
 
     if df_filtrado.empty:
         st.warning("Los filtros seleccionados no arrojaron ningún resultado. Por favor, ajuste los filtros.")
-        # Aquí, en lugar de st.stop(), puedes simplemente omitir la renderización de las pestañas
+        # Aquí, en lugar de st.stop(), puedes simplemente omitir la renderización de las vistas
         # para que la aplicación no se detenga completamente, pero no muestre nada.
         pass # No hacer nada si df_filtrado está vacío.
-    else: # Solo renderiza las pestañas si df_filtrado no está vacío
-        tabs = st.tabs([
-            "📊 Información General",
-            "📌 Cumplimiento Tributario",
-            "📉 Cartera Morosa",
-            "🏗️ Oportunidades Catastrales",
-            "💼 Estrategias de Cobro",
-            "🔮 Simulación de Escenarios",
-            "🗺️ Riesgo Geoespacial"
-        ])
-
-        with tabs[0]:
-            st.subheader("📊 Información General")
-
-            def resumen_tabla(df_sub):
-                return {
-                    "Número de predios": len(df_sub),
-                    "Avalúo total": df_sub['avaluo_catastral'].sum(),
-                    "Impuesto total": df_sub['valor_impuesto_a_pagar'].sum(),
-                    "Recaudo total": df_sub['recaudo_predial'].sum(),
-                    "Descuento total": df_sub['descuentos_impuesto_predial'].sum(),
-                    "Saldo por pagar": df_sub['saldo'].sum()
-                }
-
-            total = resumen_tabla(df_filtrado)
-            urbano = resumen_tabla(df_filtrado[df_filtrado['sector'].astype(str).str.upper() == 'URBANO'])
-            rural = resumen_tabla(df_filtrado[df_filtrado['sector'].astype(str).str.upper() == 'RURAL'])
-
-            resumen_df = pd.DataFrame([total, urbano, rural], index=["Total", "Urbano", "Rural"]).T
-
-            format_mapping = {
-                "Avalúo total": "${:,.0f}",
-                "Impuesto total": "${:,.0f}",
-                "Recaudo total": "${:,.0f}",
-                "Descuento total": "${:,.0f}",
-                "Saldo por pagar": "${:,.0f}"
-            }
-
-            try:
-                st.dataframe(
-                    resumen_df.style.format(format_mapping)
-                )
-            except Exception as e:
-                st.warning(f"No se pudo aplicar formato de estilo a la tabla: {e}. Mostrando tabla sin formato.")
-                st.dataframe(resumen_df)
-
-
-        with tabs[1]:
-            st.subheader("📌 Cumplimiento Tributario")
-
-            pagados = df_filtrado[df_filtrado['cumplimiento'] == True]
-            no_pagados = df_filtrado[df_filtrado['cumplimiento'] == False]
-
-            # KPIs
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("Tasa de Cumplimiento", f"{len(pagados) / len(df_filtrado) * 100:.2f}%" if len(df_filtrado) > 0 else "0%")
-            with col2:
-                total_impuesto_facturado = df_filtrado['valor_impuesto_a_pagar'].sum()
-                recaudo_porcentaje = f"{pagados['recaudo_predial'].sum() / total_impuesto_facturado * 100:.2f}%" if total_impuesto_facturado > 0 else "0%"
-                st.metric("Recaudo / Facturado", recaudo_porcentaje)
-            with col3:
-                st.metric("Predios Pagados", f"{len(pagados):,}")
-
-            # Mapa: Asegurar que hay datos de latitud y longitud válidos para centrar el mapa
-            if not df_filtrado.empty and not df_filtrado[['latitud', 'longitud']].isnull().all().all():
-                map_center_lat = df_filtrado['latitud'].mean() if not df_filtrado['latitud'].isnull().all() else 4.710989
-                map_center_lon = df_filtrado['longitud'].mean() if not df_filtrado['longitud'].isnull().all() else -74.072090
-                m = folium.Map(location=[map_center_lat, map_center_lon], zoom_start=13)
-
-                for _, row in pagados.iterrows():
-                    if pd.notnull(row['latitud']) and pd.notnull(row['longitud']):
-                        folium.CircleMarker(
-                            location=[row['latitud'], row['longitud']],
-                            radius=5,
-                            color='green',
-                            fill=True,
-                            fill_opacity=0.6,
-                            popup=f"IGAC: {row['codigo_igac']}\nPagado: ${row['recaudo_predial']:,.0f}"
-                        ).add_to(m)
-                for _, row in no_pagados.iterrows():
-                    if pd.notnull(row['latitud']) and pd.notnull(row['longitud']):
-                        folium.CircleMarker(
-                            location=[row['latitud'], row['longitud']],
-                            radius=5,
-                            color='red',
-                            fill=True,
-                            fill_opacity=0.6,
-                            popup=f"IGAC: {row['codigo_igac']}\nPendiente: ${row['valor_impuesto_a_pagar']:,.0f}"
-                        ).add_to(m)
-                st_folium(m, width=1000, height=500)
-            else:
-                st.warning("No hay datos de latitud/longitud para mostrar en el mapa de Cumplimiento Tributario o los datos filtrados están vacíos.")
-
-
-            st.markdown("### Tabla de Predios que Pagaron")
-            if not pagados.empty:
-                pagados_display = pagados.copy()
-                pagados_display["valor_impuesto_a_pagar"] = pd.to_numeric(pagados_display["valor_impuesto_a_pagar"], errors='coerce').fillna(0)
-                pagados_display["recaudo_predial"] = pd.to_numeric(pagados_display["recaudo_predial"], errors='coerce').fillna(0)
-
-                tabla_pagados = pagados_display.sort_values(by="recaudo_predial", ascending=False)[
-                    ["codigo_igac", "vereda", "sector", "valor_impuesto_a_pagar", "recaudo_predial"]
-                ]
-                st.dataframe(tabla_pagados.reset_index(drop=True).style.format({"valor_impuesto_a_pagar": "${:,.0f}", "recaudo_predial": "${:,.0f}"}))
-            else:
-                st.info("No hay predios pagados para mostrar con los filtros actuales.")
-
-
-        with tabs[2]:
-            st.subheader("📉 Segmentación de Cartera Morosa")
-
-            morosos = df_filtrado[df_filtrado['cumplimiento'] == False]
-
-            st.markdown(f"**Número total de predios morosos:** {len(morosos):,}")
-            st.markdown(f"**Valor total en mora:** ${morosos['valor_impuesto_a_pagar'].sum():,.0f}")
-
-            # Mapa de morosos
-            if not morosos.empty and not morosos[['latitud', 'longitud']].isnull().all().all():
-                map_center_mora = morosos['latitud'].mean() if not morosos['latitud'].isnull().all() else 4.710989
-                map_center_lon_mora = morosos['longitud'].mean() if not morosos['longitud'].isnull().all() else -74.072090
-                m_mora = folium.Map(location=[map_center_mora, map_center_lon_mora], zoom_start=13)
-                for _, row in morosos.iterrows():
-                    if pd.notnull(row['latitud']) and pd.notnull(row['longitud']):
-                        folium.CircleMarker(
-                            location=[row['latitud'], row['longitud']],
-                            radius=5,
-                            color='red',
-                            fill=True,
-                            fill_opacity=0.6,
-                            popup=f"IGAC: {row['codigo_igac']}\nImpuesto: ${row['valor_impuesto_a_pagar']:,.0f}"
-                        ).add_to(m_mora)
-                st_folium(m_mora, width=1000, height=500)
-            else:
-                st.warning("No hay datos de latitud/longitud para mostrar en el mapa de Cartera Morosa o no hay predios morosos con los filtros actuales.")
-
-
-            st.markdown("### Tabla de Predios Morosos")
-            if not morosos.empty:
-                morosos_display = morosos.copy()
-                morosos_display["avaluo_catastral"] = pd.to_numeric(morosos_display["avaluo_catastral"], errors='coerce').fillna(0)
-                morosos_display["valor_impuesto_a_pagar"] = pd.to_numeric(morosos_display["valor_impuesto_a_pagar"], errors='coerce').fillna(0)
-
-                tabla_morosos = morosos_display[
-                    ["codigo_igac", "vereda", "sector", "destino_economico_predio", "avaluo_catastral", "valor_impuesto_a_pagar", "area_construida"]
-                ]
-                st.dataframe(tabla_morosos.reset_index(drop=True).style.format({"avaluo_catastral": "${:,.0f}", "valor_impuesto_a_pagar": "${:,.0f}"}))
-            else:
-                st.info("No hay predios morosos para mostrar con los filtros actuales.")
-
-
-        with tabs[3]:
-            st.subheader("🏗️ Oportunidades de Actualización Catastral")
-
-            df_filtrado['avaluo_catastral'] = pd.to_numeric(df_filtrado['avaluo_catastral'], errors='coerce').fillna(0)
-            df_filtrado['area_construida'] = pd.to_numeric(df_filtrado['area_construida'], errors='coerce').fillna(0)
-
-
-            sin_construccion = df_filtrado[df_filtrado['area_construida'] == 0]
-            if not sin_construccion['avaluo_catastral'].empty:
-                alto_avaluo = sin_construccion[sin_construccion['avaluo_catastral'] > sin_construccion['avaluo_catastral'].median()]
-            else:
-                alto_avaluo = pd.DataFrame()
-
-            if not df_filtrado['valor_impuesto_a_pagar'].empty:
-                sin_pago_alto = df_filtrado[
-                    (df_filtrado['cumplimiento'] == False) &
-                    (df_filtrado['valor_impuesto_a_pagar'] > df_filtrado['valor_impuesto_a_pagar'].median())
-                ]
-            else:
-                sin_pago_alto = pd.DataFrame()
-
-            oportunidades = pd.concat([alto_avaluo, sin_pago_alto]).drop_duplicates()
-
-            st.markdown(f"**Total de predios con posibles oportunidades catastrales:** {len(oportunidades):,}")
-
-            if not oportunidades.empty and not oportunidades[['latitud', 'longitud']].isnull().all().all():
-                map_center_opp_lat = oportunidades['latitud'].mean() if not oportunidades['latitud'].isnull().all() else 4.710989
-                map_center_opp_lon = oportunidades['longitud'].mean() if not oportunidades['longitud'].isnull().all() else -74.072090
-                mapa_opp = folium.Map(location=[map_center_opp_lat, map_center_opp_lon], zoom_start=13)
-                for _, row in oportunidades.iterrows():
-                    if pd.notnull(row['latitud']) and pd.notnull(row['longitud']):
-                        folium.CircleMarker(
-                            location=[row['latitud'], row['longitud']],
-                            radius=5,
-                            color='orange',
-                            fill=True,
-                            fill_opacity=0.6,
-                            popup=(f"IGAC: {row['codigo_igac']}\nÁrea: {row['area_construida']}\n"
-                                   f"Avalúo: ${row['avaluo_catastral']:,.0f}\nImpuesto: ${row['valor_impuesto_a_pagar']:,.0f}")
-                        ).add_to(mapa_opp)
-                st_folium(mapa_opp, width=1000, height=500)
-            else:
-                st.warning("No hay datos de latitud/longitud para mostrar en el mapa de Oportunidades Catastrales o no hay oportunidades con los filtros actuales.")
-
-            st.markdown("### Tabla de Predios con Oportunidades Catastrales")
-            if not oportunidades.empty:
-                oportunidades_display = oportunidades.copy()
-                oportunidades_display["avaluo_catastral"] = pd.to_numeric(oportunidades_display["avaluo_catastral"], errors='coerce').fillna(0)
-                oportunidades_display["valor_impuesto_a_pagar"] = pd.to_numeric(oportunidades_display["valor_impuesto_a_pagar"], errors='coerce').fillna(0)
-
-                st.dataframe(oportunidades_display[[
-                    "codigo_igac", "vereda", "sector", "avaluo_catastral", "valor_impuesto_a_pagar", "area_construida"
-                ]].reset_index(drop=True).style.format({"avaluo_catastral": "${:,.0f}", "valor_impuesto_a_pagar": "${:,.0f}"}))
-            else:
-                st.info("No hay predios con oportunidades catastrales para mostrar con los filtros actuales.")
-
-
-        with tabs[4]:
-            st.subheader("💼 Estrategias de Cobro")
-
-            morosos = df_filtrado[df_filtrado['cumplimiento'] == False]
-            predios_focalizables = morosos.sort_values(by="valor_impuesto_a_pagar", ascending=False).head(50)
-
-            st.markdown(f"**Top 50 predios con mayor valor de impuesto en mora:**")
-
-            if not predios_focalizables.empty and not predios_focalizables[['latitud', 'longitud']].isnull().all().all():
-                map_center_cobro_lat = predios_focalizables['latitud'].mean() if not predios_focalizables['latitud'].isnull().all() else 4.710989
-                map_center_cobro_lon = predios_focalizables['longitud'].mean() if not predios_focalizables['longitud'].isnull().all() else -74.072090
-                mapa_cobro = folium.Map(location=[map_center_cobro_lat, map_center_cobro_lon], zoom_start=13)
-                for _, row in predios_focalizables.iterrows():
-                    if pd.notnull(row['latitud']) and pd.notnull(row['longitud']):
-                        folium.CircleMarker(
-                            location=[row['latitud'], row['longitud']],
-                            radius=6,
-                            color='blue',
-                            fill=True,
-                            fill_opacity=0.6,
-                            popup=f"IGAC: {row['codigo_igac']}\nMora: ${row['valor_impuesto_a_pagar']:,.0f}"
-                        ).add_to(mapa_cobro)
-                st_folium(mapa_cobro, width=1000, height=500)
-            else:
-                st.warning("No hay datos de latitud/longitud para mostrar en el mapa de Estrategias de Cobro o no hay predios focalizables con los filtros actuales.")
-
-            st.markdown("### Tabla de Predios Focalizados para Cobro")
-            if not predios_focalizables.empty:
-                predios_focalizables_display = predios_focalizables.copy()
-                predios_focalizables_display["avaluo_catastral"] = pd.to_numeric(predios_focalizables_display["avaluo_catastral"], errors='coerce').fillna(0)
-                predios_focalizables_display["valor_impuesto_a_pagar"] = pd.to_numeric(predios_focalizables_display["valor_impuesto_a_pagar"], errors='coerce').fillna(0)
-
-                st.dataframe(predios_focalizables_display[[
-                    "codigo_igac", "vereda", "sector", "avaluo_catastral", "valor_impuesto_a_pagar", "area_construida"
-                ]].reset_index(drop=True).style.format({"avaluo_catastral": "${:,.0f}", "valor_impuesto_a_pagar": "${:,.0f}"}))
-            else:
-                st.info("No hay predios focalizados para cobro con los filtros actuales.")
-
-
-            st.markdown("### 📌 Recomendaciones Estratégicas")
-            st.markdown("""
-        - Iniciar acuerdos de pago con predios con mora mayor a $10 millones en sectores urbanos con alta valorización.
-        - Priorizar visitas de notificación en veredas con concentración de predios morosos.
-        - Enviar comunicaciones formales a predios con más de 2 años consecutivos de mora.
-        - Implementar campañas de condonación parcial de intereses para predios pequeños rurales.
-        - Generar alertas automáticas para predios con alta mora y sin pago ni financiación.
-        """)
-
-
-        with tabs[5]:
-            st.subheader("🔮 Simulación de Escenarios de Recaudo")
-
-            morosos = df_filtrado[df_filtrado['cumplimiento'] == False]
-            total_morosidad = morosos['valor_impuesto_a_pagar'].sum()
-            escenarios = [10, 30, 50, 100]
-
-            st.markdown(f"**Valor total en mora:** ${total_morosidad:,.0f}")
-
-            for e in escenarios:
-                valor = total_morosidad * (e / 100)
-                st.markdown(f"**→ {e}% cobertura:** ${valor:,.0f}")
-
-            st.markdown("### Mapa y Tabla de Predios Simulados (100%)")
-            top_simulados = morosos.sort_values(by='valor_impuesto_a_pagar', ascending=False)
-
-            if not top_simulados.empty and not top_simulados[['latitud', 'longitud']].isnull().all().all():
-                map_center_sim_lat = top_simulados['latitud'].mean() if not top_simulados['latitud'].isnull().all() else 4.710989
-                map_center_sim_lon = top_simulados['longitud'].mean() if not top_simulados['longitud'].isnull().all() else -74.072090
-                mapa_sim = folium.Map(location=[map_center_sim_lat, map_center_sim_lon], zoom_start=13)
-                for _, row in top_simulados.iterrows():
-                    if pd.notnull(row['latitud']) and pd.notnull(row['longitud']):
-                        folium.CircleMarker(
-                            location=[row['latitud'], row['longitud']],
-                            radius=5,
-                            color='blue',
-                            fill=True,
-                            fill_opacity=0.4,
-                            popup=f"IGAC: {row['codigo_igac']}\nImpuesto: ${row['valor_impuesto_a_pagar']:,.0f}"
-                        ).add_to(mapa_sim)
-                st_folium(mapa_sim, width=1000, height=500)
-            else:
-                st.warning("No hay datos de latitud/longitud para mostrar en el mapa de Simulación de Escenarios o no hay predios para simular con los filtros actuales.")
-
-            st.markdown("### Tabla de Predios Involucrados en Simulación")
-            if not top_simulados.empty:
-                top_simulados_display = top_simulados.copy()
-                top_simulados_display["valor_impuesto_a_pagar"] = pd.to_numeric(top_simulados_display["valor_impuesto_a_pagar"], errors='coerce').fillna(0)
-
-                st.dataframe(top_simulados_display[[
-                    "codigo_igac", "vereda", "sector", "valor_impuesto_a_pagar"
-                ]].reset_index(drop=True).style.format({"valor_impuesto_a_pagar": "${:,.0f}"}))
-            else:
-                st.info("No hay predios para simular con los filtros actuales.")
-
-
-        with tabs[6]:
-            st.subheader("🗺️ Mapa de Riesgo Tributario Geoespacial")
-
-            df_riesgo = df_filtrado.copy()
-
-            df_riesgo['valor_impuesto_a_pagar'] = pd.to_numeric(df_riesgo['valor_impuesto_a_pagar'], errors='coerce').fillna(0)
-            df_riesgo['avaluo_catastral'] = pd.to_numeric(df_riesgo['avaluo_catastral'], errors='coerce').fillna(0)
-            df_riesgo['area_construida'] = pd.to_numeric(df_riesgo['area_construida'], errors='coerce').fillna(0)
-            df_riesgo['financiacion_impuesto_predial'] = df_riesgo['financiacion_impuesto_predial'].astype(str).str.lower()
-
-
-            if not df_riesgo['valor_impuesto_a_pagar'].empty and df_riesgo['valor_impuesto_a_pagar'].nunique() > 1:
-                df_riesgo['riesgo_fiscal'] = pd.qcut(df_riesgo['valor_impuesto_a_pagar'].rank(method='first'), 5, labels=[1,2,3,4,5])
-            else:
-                df_riesgo['riesgo_fiscal'] = 1
-
-
-            df_riesgo['riesgo_catastral'] = 1
-            if not df_riesgo['avaluo_catastral'].empty and not df_riesgo['area_construida'].empty:
-                if df_riesgo['avaluo_catastral'].median() is not np.nan and df_riesgo['area_construida'].quantile(0.2) is not np.nan:
-                    sin_construccion_cond = (df_riesgo['area_construida'] == 0) & (df_riesgo['avaluo_catastral'] > df_riesgo['avaluo_catastral'].median())
-                    bajo_construccion_cond = (df_riesgo['area_construida'] < df_riesgo['area_construida'].quantile(0.2)) & (df_riesgo['avaluo_catastral'] > df_riesgo['avaluo_catastral'].quantile(0.6))
-                    df_riesgo.loc[sin_construccion_cond, 'riesgo_catastral'] = 5
-                    df_riesgo.loc[bajo_construccion_cond, 'riesgo_catastral'] = 3
-
-            df_riesgo['riesgo_comportamental'] = 1
-            df_riesgo.loc[
-                (df_riesgo['cumplimiento'] == False) & (df_riesgo['financiacion_impuesto_predial'] == 'no'),
-                'riesgo_comportamental'
-            ] = 5
-            df_riesgo.loc[
-                (df_riesgo['cumplimiento'] == False) & (df_riesgo['financiacion_impuesto_predial'] == 'si'),
-                'riesgo_comportamental'
-            ] = 3
-
-            df_riesgo['riesgo_total'] = (
-                0.5 * df_riesgo['riesgo_fiscal'].astype(float) +
-                0.3 * df_riesgo['riesgo_catastral'].astype(float) +
-                0.2 * df_riesgo['riesgo_comportamental'].astype(float)
+    else: # Solo renderiza la vista activa si df_filtrado no está vacío
+        # A diferencia de st.tabs, que ejecuta el cuerpo de todas las pestañas en cada
+        # interacción, solo se calcula y dibuja la vista seleccionada.
+        vistas = dict(VISTAS)
+        if RUTA_ALMACEN.exists():
+            vistas["📅 Mora Multianual"] = vista_mora_multianual
+        with st.sidebar.expander("⬇️ Exportar datos filtrados"):
+            controles_exportacion(
+                df_filtrado, list(df_filtrado.columns), "exportar_filtrados", "predios_filtrados",
+                firma=(df.attrs.get("huella"), tuple(seleccion.items()))
             )
 
-            df_riesgo = df_riesgo.sort_values(by="riesgo_total", ascending=False)
-
-            if not df_riesgo.empty and not df_riesgo[['latitud', 'longitud']].isnull().all().all():
-                map_center_riesgo_lat = df_riesgo['latitud'].mean() if not df_riesgo['latitud'].isnull().all() else 4.710989
-                map_center_riesgo_lon = df_riesgo['longitud'].mean() if not df_riesgo['longitud'].isnull().all() else -74.072090
-                mapa_riesgo = folium.Map(location=[map_center_riesgo_lat, map_center_riesgo_lon], zoom_start=13)
-                for _, row in df_riesgo.iterrows():
-                    if pd.notnull(row['latitud']) and pd.notnull(row['longitud']):
-                        folium.CircleMarker(
-                            location=[row['latitud'], row['longitud']],
-                            radius=5,
-                            color='darkred',
-                            fill=True,
-                            fill_opacity=0.5,
-                            popup=f"IGAC: {row['codigo_igac']}\nRiesgo Total: {row['riesgo_total']:.2f}"
-                        ).add_to(mapa_riesgo)
-                st_folium(mapa_riesgo, width=1000, height=500)
-            else:
-                st.warning("No hay datos de latitud/longitud para mostrar en el mapa de Riesgo Tributario o los datos filtrados están vacíos.")
-
-            st.markdown("### Tabla de Predios con Mayor Riesgo")
-            if not df_riesgo.empty:
-                df_riesgo_display = df_riesgo.copy()
-                df_riesgo_display["valor_impuesto_a_pagar"] = pd.to_numeric(df_riesgo_display["valor_impuesto_a_pagar"], errors='coerce').fillna(0)
-                df_riesgo_display["avaluo_catastral"] = pd.to_numeric(df_riesgo_display["avaluo_catastral"], errors='coerce').fillna(0)
-                df_riesgo_display["riesgo_total"] = pd.to_numeric(df_riesgo_display["riesgo_total"], errors='coerce').fillna(0)
-
-
-                st.dataframe(df_riesgo_display[[
-                    "codigo_igac", "vereda", "sector", "valor_impuesto_a_pagar", "avaluo_catastral", "area_construida", "riesgo_total"
-                ]].reset_index(drop=True).style.format({"valor_impuesto_a_pagar": "${:,.0f}", "avaluo_catastral": "${:,.0f}", "riesgo_total": "{:.2f}"}))
-            else:
-                st.info("No hay predios con mayor riesgo para mostrar con los filtros actuales.")
+        vista = st.radio("Vista", list(vistas), horizontal=True, label_visibility="collapsed", key="vista_activa")
+        # La vista espera los artefactos que usa; los resultados sin filtros solo cuentan si no hay filtros
+        pendientes = tuple(
+            nombre for nombre in REQUISITOS.get(vista, [])
+            if not artefactos.listo(nombre) and (nombre not in SIN_FILTROS or df_filtrado is artefactos.df)
+        )
+        if not artefactos.terminado():
+            _progreso_precomputo(artefactos, pendientes)
+        if not pendientes:
+            indice_espacial = artefacto_opcional("indice_espacial", "el índice espacial de los mapas")
+            rankings = artefacto_opcional("rankings", "los rankings de las tablas")
+            with etapa(f"vista:{vistas[vista].__name__}", filas=len(df_filtrado)):
+                vistas[vista](df_filtrado, tuple(seleccion.items()), indice_espacial)
+
+# Panel de diagnóstico: al final del script, para incluir todas las etapas de esta ejecución
+with st.sidebar:
+    if st.checkbox("🩺 Diagnóstico de rendimiento", key="diagnostico"):
+        # Se lee al comienzo de cada ejecución de esta sesión (ver `perfilador.contexto`); no afecta a las demás
+        st.checkbox("Medir memoria pico (más lento)", value=perfilador.memoria, key="diagnostico_memoria")
+        st.caption("Etapas de esta ejecución")
+        st.dataframe(
+            perfilador.registros(ejecucion=id_ejecucion)[["etapa", "segundos", "filas", "memoria_pico_mb"]],
+            hide_index=True, use_container_width=True
+        )
+        st.caption("Percentiles por etapa, todas las sesiones (ms)")
+        st.dataframe(perfilador.percentiles(), hide_index=True, use_container_width=True)
+        if st.button("Expulsar datasets sin uso", key="registro_expulsar"):
+            st.toast(f"{registro.expulsar_sin_uso()} datasets expulsados del registro.")
+        st.caption(
+            f"Datasets en memoria, todas las sesiones ({registro.memoria_mb():,.0f} de {registro.presupuesto_mb:,.0f} MB)"
+        )
+        st.dataframe(registro.residentes(), hide_index=True, use_container_width=True)
@@ -0,0 +1,6 @@
+"""
+Benchmarks de la librería predial sobre datasets sintéticos.
+
+    python -m benchmarks.generador 100000 predios.parquet
+    python -m benchmarks.ejecutar --filas 10000 100000 1000000 --salida resultados.json
+"""
@@ -0,0 +1,271 @@
+"""
+Suite de benchmarks: tiempo y memoria de cada etapa sobre datasets sintéticos.
+
+Cada etapa se ejecuta `--repeticiones` veces para medir el tiempo (mínimo y
+mediana) y una vez más bajo `tracemalloc` para medir la memoria pico que
+asigna. Los resultados se escriben en JSON para comparar ejecuciones
+(`--comparar anterior.json` muestra la razón de tiempos).
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generador import generar, guardar
+from predial import analisis
+from predial.agregacion_espacial import IndiceEspacial, nivel_para_zoom
+from predial.cubo import CuboAgregado
+from predial.exportacion import exportar
+from predial.focos import IndiceFocos
+from predial.filtros import MotorFiltros
+from predial.formato import moneda
+from predial.ingesta import cargar_dataset, preprocesar
+from predial.mapas import capa_celdas, capa_puntos, crear_mapa
+from predial.precomputo import Precomputo, tareas_dataset
+from predial.rankings import IndiceRankings
+from predial.registro import RegistroDatasets, escribir_mapa, leer_mapa
+from predial.riesgo import ConfigRiesgo, MotorRiesgo
+from predial.simulacion import simular_recaudo
+from predial.tablas import pagina
+
+TAMANOS = [10_000, 100_000, 1_000_000]
+
+# Por encima de este tamaño no se genera el Excel (escribirlo tarda minutos)
+MAXIMO_FILAS_EXCEL = 100_000
+
+# Mismo umbral que la aplicación para dibujar predios uno a uno
+PUNTOS_MAPA = 2000
+
+ZOOM_MAPA = 13
+
+SELECCIONES = [
+    {},
+    {"sector": "Rural"},
+    {"vereda": "El Salitre"},
+    {"sector": "Urbano", "destino_economico_predio": "Habitacional"},
+    {"sector": "Urbano", "sector_urbano": "Centro", "propiedad_horizontal": "Sí"},
+]
+
+VISTAS = [
+    "informacion_general", "cumplimiento_tributario", "cartera_morosa",
+    "oportunidades_catastrales", "estrategias_cobro", "simulacion_escenarios",
+    "riesgo_geoespacial",
+]
+
+COLUMNAS_TABLA = ["codigo_igac", "vereda", "sector", "valor_impuesto_a_pagar", "avaluo_catastral", "riesgo_total"]
+FORMATOS_TABLA = {"valor_impuesto_a_pagar": "${:,.0f}", "avaluo_catastral": "${:,.0f}", "riesgo_total": "{:.2f}"}
+
+
+def medir(funcion, repeticiones=3):
+    """
+    Ejecuta `funcion` y devuelve `(resultado, medicion)` con los tiempos y la
+    memoria pico (MB asignados por encima de la memoria al empezar).
+    """
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        funcion()
+        pico = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+
+    return resultado, {
+        "segundos_min": min(tiempos),
+        "segundos_mediana": statistics.median(tiempos),
+        "memoria_pico_mb": pico / 2**20,
+        "repeticiones": repeticiones,
+    }
+
+
+def ejecutar_tamano(filas, repeticiones=3, semilla=0, directorio=None, maximo_excel=MAXIMO_FILAS_EXCEL, registrar=print):
+    """
+    Mide todas las etapas para un dataset de `filas` predios y devuelve la
+    lista de mediciones.
+    """
+    mediciones = []
+
+    def etapa(nombre, funcion, veces=repeticiones):
+        resultado, medicion = medir(funcion, veces)
+        mediciones.append({"filas": filas, "etapa": nombre, **medicion})
+        registrar(f"{filas:>9,} {nombre:<32} {medicion['segundos_mediana']:9.4f} s {medicion['memoria_pico_mb']:9.1f} MB")
+        return resultado
+
+    crudo = generar(filas, semilla)
+    directorio = Path(directorio or tempfile.mkdtemp(prefix="bench_predial_"))
+
+    # Ingesta: Excel completo (parseo + preprocesamiento + copia columnar) y lectura de la copia
+    if filas <= maximo_excel:
+        ruta_excel = directorio / f"predios_{filas}.xlsx"
+        guardar(crudo, ruta_excel)
+        contenido = ruta_excel.read_bytes()
+
+        def ingesta_excel():
+            cache = Path(tempfile.mkdtemp(dir=directorio))
+            return cargar_dataset(contenido, cache)
+
+        etapa("ingesta_excel", ingesta_excel, veces=1)
+
+    df = etapa("preprocesar", lambda: preprocesar(crudo.copy()))
+    ruta_parquet = directorio / f"predios_{filas}.parquet"
+    df.to_parquet(ruta_parquet, index=False)
+    df = etapa("lectura_columnar", lambda: pd.read_parquet(ruta_parquet))
+    df.attrs["huella"] = f"benchmark-{filas}-{semilla}"
+
+    # Registro compartido: archivo Arrow que se mapea en memoria. El resto de las etapas
+    # usa el dataset mapeado (columnas numéricas de solo lectura), como la aplicación.
+    registro = RegistroDatasets(directorio=directorio)
+    ruta_mapa = registro.ruta_mapa(df.attrs["huella"])
+    etapa("registro_escritura", lambda: escribir_mapa(df, ruta_mapa))
+    df = etapa("registro_lectura", lambda: leer_mapa(ruta_mapa))
+    # Los artefactos se precalculan desde una reserva del registro, como en la aplicación
+    reserva = registro.reservar(df.attrs["huella"], lambda: df)
+    df = reserva.df
+
+    # Precómputo de todos los artefactos en el pool de hilos (lo que espera la aplicación tras la carga)
+    def precomputo():
+        artefactos = Precomputo(maximo=1).artefactos(reserva)
+        return {nombre: artefactos.resultado(nombre) for nombre in tareas_dataset(df)}
+
+    etapa("precomputo", precomputo, veces=1)
+
+    # Filtros globales y cubo de agregación
+    motor = etapa("motor_filtros", lambda: MotorFiltros(df, maximo_filtrados=0))
+    # Sin subconjuntos guardados cada repetición extrae las filas (una selección nueva);
+    # luego, con los subconjuntos guardados (la misma selección en otra reejecución)
+    etapa("filtrar", lambda: [motor.filtrar(s) for s in SELECCIONES])
+    motor.maximo_filtrados = len(SELECCIONES)
+    etapa("filtrar_repetido", lambda: [motor.filtrar(s) for s in SELECCIONES])
+    cubo = etapa("cubo", lambda: CuboAgregado(motor))
+    etapa("cubo_consultas", lambda: [(cubo.resumen(s), cubo.kpis(s)) for s in SELECCIONES])
+
+    # Cálculo de cada vista sobre el dataset completo (sin filtros: el caso más costoso)
+    resultados = {}
+    for vista in VISTAS:
+        resultados[vista] = etapa(f"vista_{vista}", lambda vista=vista: getattr(analisis, vista)(df))
+
+    # Rankings precalculados: top-N y percentiles de los morosos de cada selección
+    rankings = etapa("indice_rankings", lambda: IndiceRankings(df))
+    subconjuntos = [motor.filtrar(s) for s in SELECCIONES]
+    etapa("rankings_top", lambda: [analisis.estrategias_cobro(d, analisis.TOP_COBRO, rankings) for d in subconjuntos])
+    etapa("rankings_percentil", lambda: [analisis.morosos_sobre_percentil(d, 90, rankings=rankings) for d in subconjuntos])
+
+    # Simulación Monte Carlo del recaudo (componentes de riesgo ya calculados, como en la aplicación)
+    componentes = MotorRiesgo(df).componentes(ConfigRiesgo())
+    etapa("simulacion_recaudo", lambda: simular_recaudo(df, componentes=componentes))
+
+    # Índice espacial y mapas
+    indice = etapa("indice_espacial", lambda: IndiceEspacial(df))
+    nivel = nivel_para_zoom(ZOOM_MAPA)
+    etapa("indice_celdas", lambda: IndiceEspacial(df).celdas(nivel))
+    posiciones = np.arange(len(df))
+    celdas = etapa(
+        "agregacion_celdas",
+        lambda: indice.agregar(posiciones, nivel, sumas={"saldo": df["saldo"].to_numpy()})
+    )
+
+    # Focos de mora de los morosos (ponderados por saldo) y consultas por radio
+    indice_focos = etapa("indice_focos", lambda: IndiceFocos(df))
+    morosos = np.flatnonzero(~df["cumplimiento"].to_numpy())
+    saldo_morosos = df["saldo"].clip(lower=0).to_numpy()[morosos]
+    etapa("focos_mora", lambda: indice_focos.focos(morosos, saldo_morosos))
+    etapa("focos_radio", lambda: [indice_focos.vecinos(int(p), 500) for p in morosos[:100]])
+
+    puntos = df.head(PUNTOS_MAPA)
+
+    def mapa_puntos():
+        mapa = crear_mapa(puntos)
+        capa_puntos(puntos, "IGAC: " + puntos["codigo_igac"].astype(str) + "<br>Saldo: " + moneda(puntos["saldo"])).add_to(mapa)
+        return mapa.get_root().render()
+
+    def mapa_celdas():
+        mapa = crear_mapa(df)
+        capa_celdas(celdas, "Predios: " + celdas["predios"].map("{:,}".format) + "<br>Saldo: " + moneda(celdas["saldo"])).add_to(mapa)
+        return mapa.get_root().render()
+
+    etapa("mapa_puntos", mapa_puntos)
+    etapa("mapa_celdas", mapa_celdas)
+
+    # Tabla: página ordenada del riesgo, formateada como en la aplicación
+    df_riesgo = resultados["riesgo_geoespacial"]
+    etapa(
+        "tabla_pagina",
+        lambda: pagina(df_riesgo, COLUMNAS_TABLA, "riesgo_total", False, 1, 50).style.format(FORMATOS_TABLA).to_html()
+    )
+
+    ranking_riesgo = IndiceRankings(df_riesgo, ["riesgo_total"])
+    etapa(
+        "tabla_pagina_ranking",
+        lambda: pagina(df_riesgo, COLUMNAS_TABLA, "riesgo_total", False, 1, 50, ranking_riesgo).style.format(FORMATOS_TABLA).to_html()
+    )
+
+    # Exportación de la tabla de riesgo completa, en orden, por bloques
+    posiciones_riesgo = ranking_riesgo.orden("riesgo_total")
+    etapa("exportar_csv", lambda: exportar(df_riesgo, "CSV", directorio / "riesgo.csv", COLUMNAS_TABLA, posiciones_riesgo), veces=1)
+    etapa("exportar_parquet", lambda: exportar(df_riesgo, "Parquet", directorio / "riesgo.parquet", COLUMNAS_TABLA, posiciones_riesgo), veces=1)
+    if filas <= maximo_excel:
+        etapa("exportar_xlsx", lambda: exportar(df_riesgo, "XLSX", directorio / "riesgo.xlsx", COLUMNAS_TABLA, posiciones_riesgo), veces=1)
+
+    return mediciones
+
+
+def comparar(actuales, anteriores):
+    """
+    Razón de tiempos (actual / anterior) por tamaño y etapa.
+    """
+    clave = ["filas", "etapa"]
+    tabla = pd.DataFrame(actuales).merge(pd.DataFrame(anteriores), on=clave, suffixes=("", "_anterior"))
+    tabla["razon_tiempo"] = tabla["segundos_mediana"] / tabla["segundos_mediana_anterior"]
+    tabla["razon_memoria"] = tabla["memoria_pico_mb"] / tabla["memoria_pico_mb_anterior"]
+    return tabla[clave + ["segundos_mediana_anterior", "segundos_mediana", "razon_tiempo", "razon_memoria"]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.ejecutar", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--filas", type=int, nargs="+", default=TAMANOS)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--maximo-excel", type=int, default=MAXIMO_FILAS_EXCEL,
+                        help="Tamaño máximo para el que se mide la ingesta desde Excel.")
+    parser.add_argument("--salida", default="resultados_benchmark.json")
+    parser.add_argument("--comparar", default=None, help="JSON de una ejecución anterior.")
+    args = parser.parse_args(argv)
+
+    mediciones = []
+    with tempfile.TemporaryDirectory(prefix="bench_predial_") as directorio:
+        for filas in args.filas:
+            mediciones += ejecutar_tamano(filas, args.repeticiones, args.semilla, directorio, args.maximo_excel)
+
+    salida = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "plataforma": platform.platform(),
+        "python": platform.python_version(),
+        "versiones": {"pandas": pd.__version__, "numpy": np.__version__},
+        "semilla": args.semilla,
+        "mediciones": mediciones,
+    }
+    Path(args.salida).write_text(json.dumps(salida, indent=2), encoding="utf-8")
+    print(f"Resultados en {args.salida}")
+
+    if args.comparar:
+        anteriores = json.loads(Path(args.comparar).read_text(encoding="utf-8"))["mediciones"]
+        with pd.option_context("display.float_format", "{:.3f}".format, "display.width", 200):
+            print(comparar(mediciones, anteriores).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Generador de datasets prediales sintéticos con la forma de los archivos reales.
+
+Usa los encabezados originales del Excel (con tildes y espacios) e incluye
+los rasgos que afectan el rendimiento: valor del impuesto muy asimétrico,
+coordenadas agrupadas (casco urbano y veredas), veredas de tamaños muy
+distintos, textos de pago mezclados ('si', 'Sí', 'SI', 'no', ...) y algunos
+valores sucios en columnas numéricas.
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CENTRO = (4.8158, -74.1047)
+
+VEREDAS = [
+    "El Salitre", "La Balsa", "Río Frío Occidental", "Río Frío Oriental", "Llano Grande",
+    "Chicú", "Palo Verde", "San Pedro", "Lourdes", "Santa Bárbara", "Canicas",
+    "El Rincón", "Juaica", "Diamante", "La Esperanza", "Terpel", "Fagua", "Tiquiza",
+]
+
+BARRIOS = ["Centro", "Nogales", "San Martín", "Las Acacias", "El Carmen", "Villa Marcela", "Los Cerezos"]
+
+DESTINOS_URBANOS = (["Habitacional", "Comercial", "Lote", "Institucional", "Industrial"], [0.7, 0.14, 0.1, 0.03, 0.03])
+DESTINOS_RURALES = (["Agropecuario", "Habitacional", "Lote", "Recreacional"], [0.55, 0.25, 0.15, 0.05])
+
+TEXTOS_SI = ["si", "Si", "SI", "sí", "Sí"]
+TEXTOS_NO = ["no", "No", "NO"]
+
+
+def _texto_mezclado(rng, valores, opciones_si=TEXTOS_SI, opciones_no=TEXTOS_NO):
+    """
+    'Sí'/'No' escritos de varias formas a partir de un arreglo booleano.
+    """
+    si = np.asarray(opciones_si, dtype=object)[rng.integers(0, len(opciones_si), len(valores))]
+    no = np.asarray(opciones_no, dtype=object)[rng.integers(0, len(opciones_no), len(valores))]
+    return np.where(valores, si, no)
+
+
+def generar(filas, semilla=0, proporcion_urbana=0.6, proporcion_sucia=0.001):
+    """
+    DataFrame sintético de `filas` predios con los encabezados del Excel.
+    """
+    rng = np.random.default_rng(semilla)
+    urbano = rng.random(filas) < proporcion_urbana
+    n_urbano = int(urbano.sum())
+    n_rural = filas - n_urbano
+
+    # Veredas y barrios con tamaños tipo Zipf (unas pocas concentran la mayoría)
+    pesos_veredas = 1 / np.arange(1, len(VEREDAS) + 1) ** 1.1
+    vereda_idx = rng.choice(len(VEREDAS), n_rural, p=pesos_veredas / pesos_veredas.sum())
+    pesos_barrios = 1 / np.arange(1, len(BARRIOS) + 1)
+    barrio_idx = rng.choice(len(BARRIOS), n_urbano, p=pesos_barrios / pesos_barrios.sum())
+
+    vereda = np.full(filas, None, dtype=object)
+    vereda[~urbano] = np.asarray(VEREDAS, dtype=object)[vereda_idx]
+    sector_urbano = np.full(filas, None, dtype=object)
+    sector_urbano[urbano] = np.asarray(BARRIOS, dtype=object)[barrio_idx]
+
+    destino = np.empty(filas, dtype=object)
+    destino[urbano] = rng.choice(DESTINOS_URBANOS[0], n_urbano, p=DESTINOS_URBANOS[1])
+    destino[~urbano] = rng.choice(DESTINOS_RURALES[0], n_rural, p=DESTINOS_RURALES[1])
+    lote = destino == "Lote"
+
+    # Coordenadas: casco urbano compacto y una nube por vereda alrededor de su centro
+    centros_veredas = np.column_stack([
+        CENTRO[0] + rng.normal(0, 0.04, len(VEREDAS)),
+        CENTRO[1] + rng.normal(0, 0.04, len(VEREDAS)),
+    ])
+    latitud = np.empty(filas)
+    longitud = np.empty(filas)
+    latitud[urbano] = CENTRO[0] + rng.normal(0, 0.004, n_urbano)
+    longitud[urbano] = CENTRO[1] + rng.normal(0, 0.004, n_urbano)
+    latitud[~urbano] = centros_veredas[vereda_idx, 0] + rng.normal(0, 0.008, n_rural)
+    longitud[~urbano] = centros_veredas[vereda_idx, 1] + rng.normal(0, 0.008, n_rural)
+    sin_coordenadas = rng.random(filas) < 0.02
+    latitud[sin_coordenadas] = np.nan
+    longitud[sin_coordenadas] = np.nan
+
+    # Avalúo log-normal con cola pesada; tarifa de 4 a 16 por mil
+    avaluo = np.round(rng.lognormal(np.where(urbano, 18.3, 17.6), 1.1))
+    grandes = rng.random(filas) < 0.002
+    avaluo[grandes] *= rng.pareto(1.5, grandes.sum()) * 20 + 10
+    impuesto = np.round(avaluo * rng.uniform(0.004, 0.016, filas), -3)
+
+    area = np.where(lote, 0.0, np.round(rng.lognormal(np.where(urbano, 4.4, 4.0), 0.8), 1))
+    area[~lote & (rng.random(filas) < 0.05)] = 0.0
+
+    financiacion = rng.random(filas) < 0.12
+    pago = rng.random(filas) < np.where(urbano, 0.62, 0.48) + np.where(financiacion, 0.1, 0.0)
+    descuento = np.where(pago & (rng.random(filas) < 0.4), np.round(impuesto * 0.1), 0.0)
+    recaudo = np.where(pago, impuesto - descuento, np.where(rng.random(filas) < 0.1, np.round(impuesto * 0.3), 0.0))
+
+    df = pd.DataFrame({
+        "Código IGAC": [f"25817{'01' if u else '00'}{i:013d}" for i, u in enumerate(urbano)],
+        "Valor Impuesto a Pagar": impuesto,
+        "Recaudo Predial": recaudo,
+        "Pago Impuesto Predial": _texto_mezclado(rng, pago),
+        "Avalúo Catastral": avaluo,
+        "Descuentos Impuesto Predial": descuento,
+        "Sector": np.where(urbano, "Urbano", "Rural"),
+        "Sector Urbano": sector_urbano,
+        "Vereda": vereda,
+        "Destino Económico Predio": destino,
+        "Propiedad Horizontal": _texto_mezclado(rng, urbano & (rng.random(filas) < 0.25), ["Sí"], ["No"]),
+        "Latitud": latitud,
+        "Longitud": longitud,
+        "Área Construida": area,
+        "Financiación Impuesto Predial": _texto_mezclado(rng, financiacion, ["si", "Si"], ["no", "No"]),
+        "Observaciones": "",
+    })
+
+    # Valores sucios como los que llegan en los archivos reales
+    sucias = np.flatnonzero(rng.random(filas) < proporcion_sucia)
+    if len(sucias):
+        df["Valor Impuesto a Pagar"] = df["Valor Impuesto a Pagar"].astype(object)
+        df.loc[sucias, "Valor Impuesto a Pagar"] = "n/d"
+    return df
+
+
+def guardar(df, ruta):
+    """
+    Guarda el dataset en Excel (`.xlsx`) o Parquet (`.parquet`).
+    """
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    if ruta.suffix.lower() == ".parquet":
+        df.astype({"Valor Impuesto a Pagar": str}).to_parquet(ruta, index=False)
+    else:
+        df.to_excel(ruta, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.generador", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("filas", type=int)
+    parser.add_argument("salida", help="Archivo .xlsx o .parquet.")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args(argv)
+    guardar(generar(args.filas, args.semilla), args.salida)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""
+Librería de análisis predial municipal.
+
+Contiene la lógica de carga, preprocesamiento y análisis usada por la
+aplicación Streamlit (`app_streamlit_predial.py`).
+"""
+
+from predial.ingesta import (
+    COLUMNAS_REQUERIDAS,
+    ColumnasFaltantesError,
+    cargar_dataset,
+    huella_contenido,
+    preprocesar,
+)
+
+__all__ = [
+    "COLUMNAS_REQUERIDAS",
+    "ColumnasFaltantesError",
+    "cargar_dataset",
+    "huella_contenido",
+    "preprocesar",
+]
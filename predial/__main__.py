@@ -0,0 +1,64 @@
+"""
+Línea de comandos de la librería predial.
+
+    python -m predial lote DIRECTORIO --salida RESULTADOS [--procesos N]
+    python -m predial almacen cargar ARCHIVO --vigencia 2024 [--db RUTA]
+    python -m predial almacen mora [--recurrentes N] [--db RUTA]
+"""
+
+import argparse
+import logging
+import sys
+
+import pandas as pd
+
+from predial import analisis
+from predial.almacen import Almacen
+from predial.ingesta import cargar_ruta
+from predial.lote import ejecutar_lote
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m predial", description="Análisis predial municipal sin interfaz.")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+
+    lote = subcomandos.add_parser("lote", help="Analiza todos los archivos .xlsx/.parquet de un directorio.")
+    lote.add_argument("directorio", help="Directorio con un archivo por municipio.")
+    lote.add_argument("--salida", required=True, help="Directorio donde se escriben los resultados.")
+    lote.add_argument("--procesos", type=int, default=None, help="Procesos en paralelo (por defecto, uno por núcleo).")
+    lote.add_argument("--top", type=int, default=analisis.TOP_COBRO, help="Predios focalizados para cobro por municipio.")
+    lote.add_argument("--cache", default=None, help="Directorio de la caché columnar (por defecto, PREDIAL_CACHE_DIR).")
+
+    almacen = subcomandos.add_parser("almacen", help="Almacén histórico de predios por vigencia.")
+    almacen.add_argument("--db", default=None, help="Archivo SQLite del almacén (por defecto, PREDIAL_ALMACEN).")
+    acciones = almacen.add_subparsers(dest="accion", required=True)
+    cargar = acciones.add_parser("cargar", help="Integra archivos en una vigencia (solo predios nuevos o modificados).")
+    cargar.add_argument("archivos", nargs="+", help="Archivos .xlsx/.parquet.")
+    cargar.add_argument("--vigencia", type=int, required=True)
+    mora = acciones.add_parser("mora", help="Mora por vigencia y predios morosos en varias vigencias.")
+    mora.add_argument("--recurrentes", type=int, default=20, help="Número de morosos recurrentes a mostrar.")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.comando == "lote":
+        resumen = ejecutar_lote(args.directorio, args.salida, args.procesos, args.top, directorio_cache=args.cache)
+        print(resumen.to_string(index=False))
+        return 1 if resumen["error"].notna().any() else 0
+
+    if args.comando == "almacen":
+        almacen = Almacen(args.db)
+        if args.accion == "cargar":
+            for ruta in args.archivos:
+                resultado = almacen.integrar(cargar_ruta(ruta), args.vigencia)
+                print(f"{ruta}: {resultado}")
+        elif args.accion == "mora":
+            with pd.option_context("display.float_format", "{:,.2f}".format):
+                print(almacen.mora_por_vigencia().to_string(index=False))
+                print()
+                print(almacen.morosos_recurrentes(limite=args.recurrentes).to_string(index=False))
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Agregación espacial por rejilla multirresolución.
+
+Sobre `latitud`/`longitud` se define una rejilla por nivel, con celdas cuyo
+tamaño se divide a la mitad en cada nivel. La asignación de cada predio a su
+celda se calcula una sola vez por nivel y dataset; agregar cualquier
+subconjunto (por ejemplo, los morosos filtrados) es luego un `bincount` sobre
+las filas del subconjunto. Así el mapa envía, a baja escala, una celda con
+conteo, saldo y riesgo medio en lugar de cada predio.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Tamaño de celda (grados) del nivel 0; cada nivel siguiente lo divide a la mitad
+TAMANO_CELDA_BASE = 0.64
+NUMERO_NIVELES = 12
+
+# Tamaño objetivo de una celda en pantalla (píxeles) al elegir el nivel por zoom
+PIXELES_POR_CELDA = 48
+
+
+def tamano_celda(nivel):
+    """
+    Tamaño (grados) de las celdas de un nivel.
+    """
+    return TAMANO_CELDA_BASE / 2 ** nivel
+
+
+def nivel_para_zoom(zoom):
+    """
+    Nivel de rejilla cuyas celdas miden alrededor de `PIXELES_POR_CELDA`
+    píxeles al zoom dado (teselas web de 256 px).
+    """
+    grados_por_pixel = 360 / (256 * 2 ** zoom)
+    objetivo = PIXELES_POR_CELDA * grados_por_pixel
+    nivel = int(np.floor(np.log2(TAMANO_CELDA_BASE / objetivo)))
+    return int(np.clip(nivel, 0, NUMERO_NIVELES - 1))
+
+
+class IndiceEspacial:
+    """
+    Asignación de predios a celdas de rejilla, por nivel, para un dataset.
+
+    Las posiciones que reciben los métodos son posiciones de fila en el
+    dataset con el que se construyó el índice; `posiciones_de` las obtiene
+    para un subconjunto extraído del dataset.
+    """
+
+    def __init__(self, df):
+        self._etiquetas = df.index
+        self._lat = df['latitud'].to_numpy(dtype=float)
+        self._lon = df['longitud'].to_numpy(dtype=float)
+        self._validas = ~(np.isnan(self._lat) | np.isnan(self._lon))
+        self._niveles = {}
+
+    def celdas(self, nivel):
+        """
+        Número de celda de cada fila en el nivel dado (-1 sin coordenadas).
+        """
+        if nivel not in self._niveles:
+            tamano = tamano_celda(nivel)
+            x = np.floor(self._lon[self._validas] / tamano).astype(np.int64)
+            y = np.floor(self._lat[self._validas] / tamano).astype(np.int64)
+            _, inverso = np.unique((x << 32) ^ (y & 0xFFFFFFFF), return_inverse=True)
+
+            # Hay menos celdas que filas: el número de celda cabe en 32 bits salvo en datasets enormes
+            tipo = np.int32 if len(self._lat) < np.iinfo(np.int32).max else np.int64
+            celda = np.full(len(self._lat), -1, dtype=tipo)
+            celda[self._validas] = inverso.ravel()
+            self._niveles[nivel] = celda
+        return self._niveles[nivel]
+
+    def posiciones_de(self, subconjunto):
+        """
+        Posiciones en el dataset del índice de las filas de `subconjunto` (un
+        DataFrame extraído del dataset, con sus mismas etiquetas), en el orden
+        de `subconjunto`.
+        """
+        etiquetas = self._etiquetas
+        if isinstance(etiquetas, pd.RangeIndex) and etiquetas.start == 0 and etiquetas.step == 1:
+            return subconjunto.index.to_numpy()
+        return etiquetas.get_indexer(subconjunto.index)
+
+    def dentro_de(self, posiciones, limites):
+        """
+        Máscara (alineada con `posiciones`) de las filas dentro de `limites`
+        ((lat_sur, lon_oeste), (lat_norte, lon_este)).
+        """
+        (sur, oeste), (norte, este) = limites
+        lat = self._lat[posiciones]
+        lon = self._lon[posiciones]
+        return (lat >= sur) & (lat <= norte) & (lon >= oeste) & (lon <= este)
+
+    def agregar(self, posiciones, nivel, sumas=None, medias=None):
+        """
+        Agrega las filas `posiciones` por celda del nivel.
+
+        `sumas` y `medias` son dicts `{nombre: valores}` con arreglos alineados
+        con `posiciones`. Devuelve un DataFrame con una fila por celda no
+        vacía: centroide (`latitud`, `longitud`), `predios` y una columna por
+        cada suma o media.
+        """
+        celda = self.celdas(nivel)[posiciones]
+        con_celda = celda >= 0
+        celda = celda[con_celda]
+        if len(celda) == 0:
+            return pd.DataFrame(columns=["latitud", "longitud", "predios"])
+
+        # Se renumeran las celdas presentes para que el bincount sea del tamaño del subconjunto
+        _, celda = np.unique(celda, return_inverse=True)
+        conteo = np.bincount(celda)
+
+        def suma(valores):
+            return np.bincount(celda, weights=np.asarray(valores, dtype=float)[con_celda])
+
+        resultado = {
+            "latitud": suma(self._lat[posiciones]) / conteo,
+            "longitud": suma(self._lon[posiciones]) / conteo,
+            "predios": conteo,
+        }
+        for nombre, valores in (sumas or {}).items():
+            resultado[nombre] = suma(valores)
+        for nombre, valores in (medias or {}).items():
+            resultado[nombre] = suma(valores) / conteo
+        return pd.DataFrame(resultado)
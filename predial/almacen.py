@@ -0,0 +1,382 @@
+"""
+Almacén histórico de predios en SQLite, con una fila por predio y vigencia.
+
+Cada archivo cargado se integra por (`codigo_igac`, vigencia): se calcula una
+huella por fila y solo se escriben los predios nuevos o modificados; la
+versión anterior de un predio modificado pasa a la tabla `historial`. Las
+consultas filtran en SQL (vigencia y filtros globales) y los análisis de
+varias vigencias se agregan en la base, sin cargar todos los años en memoria.
+
+Las columnas que los filtros comparan sin distinguir mayúsculas se guardan
+en minúsculas (el `lower()` de SQLite solo convierte letras ASCII, así que
+no serviría para 'SÍ'); los filtros se comparan directamente.
+"""
+
+import hashlib
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from predial.filtros import COLUMNAS_FILTRO, COLUMNAS_MINUSCULAS
+from predial.ingesta import COLUMNAS_NUMERICAS, COLUMNAS_REQUERIDAS, compactar
+
+RUTA_ALMACEN = Path(os.environ.get("PREDIAL_ALMACEN", "almacen_predial.sqlite"))
+
+# Columnas de datos guardadas por predio y vigencia (la huella se calcula sobre ellas)
+COLUMNAS_ALMACEN = ["codigo_igac"] + [
+    col for col in COLUMNAS_REQUERIDAS if col != "codigo_igac"
+] + ["saldo", "cumplimiento"]
+
+_COLUMNAS_REALES = set(COLUMNAS_NUMERICAS) | {"saldo"}
+
+
+def _tipo_sql(col):
+    if col in _COLUMNAS_REALES:
+        return "REAL"
+    if col == "cumplimiento":
+        return "INTEGER"
+    return "TEXT"
+
+
+_DEFINICION_COLUMNAS = ", ".join(f"{col} {_tipo_sql(col)}" for col in COLUMNAS_ALMACEN)
+
+ESQUEMA = f"""
+CREATE TABLE IF NOT EXISTS cargas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    vigencia INTEGER NOT NULL,
+    huella TEXT NOT NULL,
+    fecha TEXT NOT NULL,
+    nuevos INTEGER NOT NULL DEFAULT 0,
+    modificados INTEGER NOT NULL DEFAULT 0,
+    sin_cambios INTEGER NOT NULL DEFAULT 0,
+    descartados INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (vigencia, huella)
+);
+CREATE TABLE IF NOT EXISTS predios (
+    vigencia INTEGER NOT NULL,
+    {_DEFINICION_COLUMNAS},
+    huella_fila INTEGER NOT NULL,
+    carga INTEGER NOT NULL,
+    PRIMARY KEY (vigencia, codigo_igac)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS historial (
+    vigencia INTEGER NOT NULL,
+    {_DEFINICION_COLUMNAS},
+    huella_fila INTEGER NOT NULL,
+    carga INTEGER NOT NULL,
+    reemplazada_en INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_predios_codigo ON predios (codigo_igac);
+CREATE INDEX IF NOT EXISTS ix_predios_sector ON predios (vigencia, sector, vereda);
+CREATE INDEX IF NOT EXISTS ix_historial_codigo ON historial (codigo_igac, vigencia);
+"""
+
+# Versión del formato de las filas (`PRAGMA user_version`); ver `Almacen._migrar`
+VERSION_ESQUEMA = 1
+
+
+def _codigos_texto(serie):
+    """
+    Código IGAC como texto (sin el `.0` que deja una columna numérica).
+    """
+    if pd.api.types.is_float_dtype(serie):
+        serie = serie.astype("Int64")
+    return serie.astype("string").astype(object)
+
+
+def huellas_filas(df):
+    """
+    Huella (entero de 64 bits) del contenido de cada fila de `COLUMNAS_ALMACEN`.
+    """
+    return pd.util.hash_pandas_object(df[COLUMNAS_ALMACEN], index=False).to_numpy().view(np.int64)
+
+
+def preparar_filas(df):
+    """
+    Filas del dataset preprocesado tal como se guardan en el almacén.
+
+    Se descartan las filas sin `codigo_igac` y, si un código se repite, se
+    conserva su última aparición. Cada columna toma el tipo con que la
+    devuelve SQLite (textos, `float64` y enteros), de modo que la huella de
+    una fila leída de la base es la misma que la del archivo que la escribió.
+    Devuelve `(filas, descartados)`.
+    """
+    datos = df[COLUMNAS_ALMACEN].copy()
+    datos["codigo_igac"] = _codigos_texto(datos["codigo_igac"])
+    for col in COLUMNAS_ALMACEN:
+        if _tipo_sql(col) == "TEXT":
+            valores = datos[col].astype(object)
+            datos[col] = valores.where(valores.isna(), valores.astype(str))
+        elif _tipo_sql(col) == "REAL":
+            datos[col] = datos[col].astype(np.float64)
+    for col in COLUMNAS_MINUSCULAS:
+        datos[col] = datos[col].str.lower()
+    datos["cumplimiento"] = datos["cumplimiento"].astype(np.int64)
+
+    validos = datos[datos["codigo_igac"].notna()].drop_duplicates("codigo_igac", keep="last")
+    validos["huella_fila"] = huellas_filas(validos)
+    return validos.reset_index(drop=True), len(datos) - len(validos)
+
+
+def _condiciones(seleccion):
+    """
+    Cláusulas SQL y parámetros de los filtros globales activos.
+    """
+    condiciones, parametros = [], []
+    for col, valor in (seleccion or {}).items():
+        if valor is None:
+            continue
+        if col not in COLUMNAS_FILTRO:
+            raise ValueError(f"Columna de filtro desconocida: {col}")
+        # Las columnas sin mayúsculas ya se guardaron en minúsculas (`preparar_filas`)
+        valor = str(valor)
+        condiciones.append(f"{col} = ?")
+        parametros.append(valor.lower() if col in COLUMNAS_MINUSCULAS else valor)
+    return condiciones, parametros
+
+
+class Almacen:
+    """
+    Almacén histórico en un archivo SQLite (por defecto `RUTA_ALMACEN`).
+
+    Cada operación abre su propia conexión, de modo que una misma instancia
+    se puede usar desde varios hilos o sesiones de Streamlit.
+    """
+
+    def __init__(self, ruta=None):
+        self.ruta = Path(ruta or RUTA_ALMACEN)
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        with self._conectar() as conexion:
+            conexion.executescript(ESQUEMA)
+            if conexion.execute("PRAGMA user_version").fetchone()[0] < VERSION_ESQUEMA:
+                self._migrar(conexion)
+
+    @staticmethod
+    def _migrar(conexion):
+        """
+        Lleva las filas de una versión anterior a `VERSION_ESQUEMA`: pasa a
+        minúsculas las columnas de `COLUMNAS_MINUSCULAS` y recalcula la huella
+        de cada predio, para que volver a cargar el mismo archivo no marque
+        predios como modificados.
+        """
+        columnas = ["vigencia"] + COLUMNAS_ALMACEN + ["huella_fila", "carga"]
+        lista = ", ".join(columnas)
+        vigencias = [v for (v,) in conexion.execute("SELECT DISTINCT vigencia FROM predios")]
+        for vigencia in vigencias:
+            guardadas = pd.read_sql_query(
+                f"SELECT {', '.join(COLUMNAS_ALMACEN)}, carga FROM predios WHERE vigencia = ?",
+                conexion, params=[vigencia]
+            )
+            filas, _ = preparar_filas(guardadas)
+            filas = filas.assign(vigencia=vigencia, carga=guardadas["carga"].to_numpy())[columnas]
+            filas = filas.astype(object).where(filas.notna(), None)
+            conexion.executemany(
+                f"INSERT OR REPLACE INTO predios ({lista}) VALUES ({', '.join('?' * len(columnas))})",
+                filas.itertuples(index=False, name=None)
+            )
+        for col in COLUMNAS_MINUSCULAS:
+            valores = [v for (v,) in conexion.execute(f"SELECT DISTINCT {col} FROM historial WHERE {col} IS NOT NULL")]
+            conexion.executemany(
+                f"UPDATE historial SET {col} = ? WHERE {col} = ?",
+                ((v.lower(), v) for v in valores if v != v.lower())
+            )
+        conexion.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
+
+    @contextmanager
+    def _conectar(self):
+        conexion = sqlite3.connect(self.ruta, timeout=30)
+        try:
+            conexion.execute("PRAGMA journal_mode=WAL")
+            with conexion:
+                yield conexion
+        finally:
+            conexion.close()
+
+    def _consulta(self, sql, parametros=()):
+        with self._conectar() as conexion:
+            return pd.read_sql_query(sql, conexion, params=list(parametros))
+
+    def integrar(self, df, vigencia, huella=None):
+        """
+        Integra un dataset preprocesado como la vigencia `vigencia`.
+
+        Solo se escriben los predios nuevos o con cambios; la versión anterior
+        de cada predio modificado se guarda en `historial`. Un archivo ya
+        integrado en la misma vigencia (misma `huella`) no se vuelve a procesar.
+        Devuelve un dict con el id de la carga y los conteos.
+        """
+        vigencia = int(vigencia)
+        huella = huella or df.attrs.get("huella")
+        if huella is None:
+            raise ValueError("El dataset no tiene huella; páselo en `huella`.")
+
+        with self._conectar() as conexion:
+            previa = conexion.execute(
+                "SELECT id, nuevos, modificados, sin_cambios, descartados FROM cargas"
+                " WHERE vigencia = ? AND huella = ?", (vigencia, huella)
+            ).fetchone()
+            if previa is not None:
+                return dict(zip(["carga", "nuevos", "modificados", "sin_cambios", "descartados"], previa),
+                            repetida=True)
+
+            filas, descartados = preparar_filas(df)
+            existentes = pd.read_sql_query(
+                "SELECT codigo_igac, huella_fila AS huella_anterior FROM predios WHERE vigencia = ?",
+                conexion, params=[vigencia]
+            )
+            comparacion = filas[["codigo_igac", "huella_fila"]].merge(existentes, on="codigo_igac", how="left")
+            nuevos = comparacion["huella_anterior"].isna().to_numpy()
+            modificados = ~nuevos & (comparacion["huella_anterior"].to_numpy() != comparacion["huella_fila"].to_numpy())
+
+            carga = conexion.execute(
+                "INSERT INTO cargas (vigencia, huella, fecha) VALUES (?, ?, ?)",
+                (vigencia, huella, datetime.now().isoformat(timespec="seconds"))
+            ).lastrowid
+
+            columnas = ["vigencia"] + COLUMNAS_ALMACEN + ["huella_fila", "carga"]
+            lista = ", ".join(columnas)
+            if modificados.any():
+                conexion.execute("CREATE TEMP TABLE IF NOT EXISTS _cambiados (codigo_igac TEXT PRIMARY KEY)")
+                conexion.execute("DELETE FROM _cambiados")
+                conexion.executemany(
+                    "INSERT INTO _cambiados VALUES (?)",
+                    ((c,) for c in filas.loc[modificados, "codigo_igac"])
+                )
+                conexion.execute(
+                    f"INSERT INTO historial ({lista}, reemplazada_en)"
+                    f" SELECT {lista}, ? FROM predios"
+                    " WHERE vigencia = ? AND codigo_igac IN (SELECT codigo_igac FROM _cambiados)",
+                    (carga, vigencia)
+                )
+
+            escribir = filas[nuevos | modificados]
+            if len(escribir):
+                escribir = escribir.assign(vigencia=vigencia, carga=carga)[columnas]
+                escribir = escribir.astype(object).where(escribir.notna(), None)
+                conexion.executemany(
+                    f"INSERT OR REPLACE INTO predios ({lista}) VALUES ({', '.join('?' * len(columnas))})",
+                    escribir.itertuples(index=False, name=None)
+                )
+
+            resultado = {
+                "carga": carga,
+                "nuevos": int(nuevos.sum()),
+                "modificados": int(modificados.sum()),
+                "sin_cambios": int(len(filas) - nuevos.sum() - modificados.sum()),
+                "descartados": int(descartados),
+            }
+            conexion.execute(
+                "UPDATE cargas SET nuevos = ?, modificados = ?, sin_cambios = ?, descartados = ? WHERE id = ?",
+                (resultado["nuevos"], resultado["modificados"], resultado["sin_cambios"], resultado["descartados"], carga)
+            )
+        resultado["repetida"] = False
+        return resultado
+
+    def vigencias(self):
+        """
+        Vigencias con datos, ordenadas.
+        """
+        return self._consulta("SELECT DISTINCT vigencia FROM predios ORDER BY vigencia")["vigencia"].tolist()
+
+    def opciones(self, vigencia):
+        """
+        Valores distintos (no nulos, ordenados) de cada filtro global en una
+        vigencia: `{columna: [valores]}`.
+        """
+        with self._conectar() as conexion:
+            return {
+                col: [v for (v,) in conexion.execute(
+                    f"SELECT DISTINCT {col} FROM predios WHERE vigencia = ? AND {col} IS NOT NULL ORDER BY {col}",
+                    (int(vigencia),)
+                )]
+                for col in COLUMNAS_FILTRO
+            }
+
+    def cargas(self):
+        """
+        Registro de cargas (más reciente primero).
+        """
+        return self._consulta("SELECT * FROM cargas ORDER BY id DESC")
+
+    def version(self):
+        """
+        Id de la última carga: cambia cada vez que cambia el contenido.
+        """
+        with self._conectar() as conexion:
+            return conexion.execute("SELECT COALESCE(MAX(id), 0) FROM cargas").fetchone()[0]
+
+    def consultar(self, vigencia, seleccion=None, columnas=None):
+        """
+        Predios de una vigencia que cumplen `seleccion` (filtros globales,
+        resueltos en SQL), con las columnas del dataset preprocesado.
+
+        La huella del resultado (`df.attrs["huella"]`) depende del almacén, la
+        vigencia, la selección y la última carga, para usarla en otras cachés.
+        """
+        condiciones, parametros = _condiciones(seleccion)
+        columnas = columnas or COLUMNAS_ALMACEN
+        df = self._consulta(
+            f"SELECT {', '.join(columnas)} FROM predios WHERE "
+            + " AND ".join(["vigencia = ?"] + condiciones),
+            [int(vigencia)] + parametros
+        )
+        if "cumplimiento" in df.columns:
+            df["cumplimiento"] = df["cumplimiento"].astype(bool)
+        compactar(df)
+
+        clave = f"{self.ruta.resolve()}|{vigencia}|{sorted((seleccion or {}).items())}|{columnas}|{self.version()}"
+        df.attrs["huella"] = hashlib.sha256(clave.encode()).hexdigest()
+        return df
+
+    def mora_por_vigencia(self, seleccion=None):
+        """
+        Predios, morosos, tasa de cumplimiento, valor en mora y saldo por
+        vigencia, agregados en SQL.
+        """
+        condiciones, parametros = _condiciones(seleccion)
+        donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        df = self._consulta(
+            "SELECT vigencia, COUNT(*) AS predios, SUM(1 - cumplimiento) AS morosos,"
+            " SUM(CASE WHEN cumplimiento = 0 THEN valor_impuesto_a_pagar ELSE 0 END) AS valor_mora,"
+            " SUM(saldo) AS saldo"
+            f" FROM predios {donde} GROUP BY vigencia ORDER BY vigencia",
+            parametros
+        )
+        df["tasa_cumplimiento"] = (df["predios"] - df["morosos"]) / df["predios"] * 100
+        return df
+
+    def morosos_recurrentes(self, minimo=2, seleccion=None, limite=None):
+        """
+        Predios en mora en al menos `minimo` vigencias, con el número de
+        vigencias y la mora acumulada, de mayor a menor mora.
+        """
+        condiciones, parametros = _condiciones(seleccion)
+        sql = (
+            "SELECT codigo_igac, COUNT(*) AS vigencias_en_mora, MIN(vigencia) AS primera,"
+            " MAX(vigencia) AS ultima, SUM(valor_impuesto_a_pagar) AS mora_acumulada"
+            " FROM predios WHERE " + " AND ".join(["cumplimiento = 0"] + condiciones)
+            + " GROUP BY codigo_igac HAVING COUNT(*) >= ? ORDER BY mora_acumulada DESC"
+        )
+        parametros = parametros + [int(minimo)]
+        if limite is not None:
+            sql += " LIMIT ?"
+            parametros.append(int(limite))
+        return self._consulta(sql, parametros)
+
+    def historial(self, codigo_igac):
+        """
+        Todas las versiones de un predio (vigentes y reemplazadas), por
+        vigencia y carga.
+        """
+        lista = ", ".join(["vigencia"] + COLUMNAS_ALMACEN + ["carga"])
+        return self._consulta(
+            f"SELECT {lista}, NULL AS reemplazada_en FROM predios WHERE codigo_igac = ?"
+            f" UNION ALL SELECT {lista}, reemplazada_en FROM historial WHERE codigo_igac = ?"
+            " ORDER BY vigencia, carga",
+            [str(codigo_igac)] * 2
+        )
@@ -0,0 +1,192 @@
+"""
+Cálculos de cada vista de la plataforma, sin dependencias de Streamlit.
+
+Cada función recibe el DataFrame ya filtrado y devuelve los resultados que
+muestra su vista (KPIs y tablas). La aplicación solo ejecuta las funciones
+de la vista activa y memoiza sus resultados por dataset y filtros.
+"""
+
+import numpy as np
+import pandas as pd
+
+from predial.riesgo import ConfigRiesgo, puntuar
+
+ESCENARIOS_COBERTURA = [10, 30, 50, 100]
+
+TOP_COBRO = 50
+
+MEDIDAS_RESUMEN = [
+    "avaluo_catastral", "valor_impuesto_a_pagar", "recaudo_predial",
+    "descuentos_impuesto_predial", "saldo"
+]
+
+
+def resumen_desde_totales(n, sumas):
+    """
+    Fila de la tabla resumen a partir del número de predios y las sumas de
+    `MEDIDAS_RESUMEN`.
+    """
+    return {
+        "Número de predios": n,
+        "Avalúo total": sumas['avaluo_catastral'],
+        "Impuesto total": sumas['valor_impuesto_a_pagar'],
+        "Recaudo total": sumas['recaudo_predial'],
+        "Descuento total": sumas['descuentos_impuesto_predial'],
+        "Saldo por pagar": sumas['saldo']
+    }
+
+
+def resumen_tabla(df_sub):
+    """
+    Totales de un conjunto de predios.
+    """
+    return resumen_desde_totales(len(df_sub), {m: df_sub[m].sum() for m in MEDIDAS_RESUMEN})
+
+
+def escenarios_cobertura(total_morosidad, escenarios=ESCENARIOS_COBERTURA):
+    """
+    Recaudo proyectado para cada porcentaje de cobertura de la mora.
+    """
+    return [(e, total_morosidad * (e / 100)) for e in escenarios]
+
+
+def _es_texto(serie, valor):
+    """
+    Máscara de las filas cuyo texto en mayúsculas es `valor`; en columnas
+    categóricas solo se comparan las categorías.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        coinciden = np.flatnonzero(serie.cat.categories.astype(str).str.upper() == valor)
+        return serie.cat.codes.isin(coinciden)
+    return serie.astype(str).str.upper() == valor
+
+
+def informacion_general(df):
+    """
+    Tabla resumen con columnas Total, Urbano y Rural.
+    """
+    total = resumen_tabla(df)
+    urbano = resumen_tabla(df[_es_texto(df['sector'], 'URBANO')])
+    rural = resumen_tabla(df[_es_texto(df['sector'], 'RURAL')])
+
+    return pd.DataFrame([total, urbano, rural], index=["Total", "Urbano", "Rural"]).T
+
+
+def cumplimiento_tributario(df):
+    """
+    KPIs de cumplimiento y predios pagados / no pagados.
+    """
+    pagados = df[df['cumplimiento'] == True]
+    no_pagados = df[df['cumplimiento'] == False]
+    total_impuesto_facturado = df['valor_impuesto_a_pagar'].sum()
+
+    return {
+        "pagados": pagados,
+        "no_pagados": no_pagados,
+        "tasa_cumplimiento": len(pagados) / len(df) * 100 if len(df) > 0 else None,
+        "recaudo_facturado": (
+            pagados['recaudo_predial'].sum() / total_impuesto_facturado * 100
+            if total_impuesto_facturado > 0 else None
+        ),
+    }
+
+
+def cartera_morosa(df, no_pagados=None):
+    """
+    Predios morosos y valor total en mora. Si se pasan los `no_pagados` de
+    `cumplimiento_tributario(df)`, se reutilizan en lugar de extraer otra
+    copia de las mismas filas.
+    """
+    morosos = df[df['cumplimiento'] == False] if no_pagados is None else no_pagados
+    return {
+        "morosos": morosos,
+        "valor_mora": morosos['valor_impuesto_a_pagar'].sum(),
+    }
+
+
+def oportunidades_catastrales(df):
+    """
+    Predios sin construcción con avalúo alto, o morosos con impuesto alto
+    (sobre la mediana del conjunto), en el orden de `df`.
+    """
+    # Unión de máscaras: cada predio aparece una vez sin comparar filas completas
+    avaluo = df['avaluo_catastral'].to_numpy()
+    impuesto = df['valor_impuesto_a_pagar'].to_numpy()
+    sin_construccion = (df['area_construida'] == 0).to_numpy()
+    morosos = ~df['cumplimiento'].to_numpy(dtype=bool)
+
+    seleccion = np.zeros(len(df), dtype=bool)
+    if sin_construccion.any():
+        seleccion |= sin_construccion & (avaluo > np.median(avaluo[sin_construccion]))
+    if len(df):
+        seleccion |= morosos & (impuesto > np.median(impuesto))
+    return df[seleccion]
+
+
+def estrategias_cobro(df, n=TOP_COBRO, rankings=None):
+    """
+    Los `n` predios morosos con mayor valor de impuesto. Si se pasa el
+    `IndiceRankings` del dataset del que se extrajo `df`, se toman de su
+    ranking sin ordenar.
+    """
+    if rankings is not None:
+        mascara = ~rankings.df['cumplimiento'].to_numpy(dtype=bool)
+        presentes = rankings.mascara_de(df)
+        if presentes is not None:
+            mascara &= presentes
+        return df.loc[rankings.etiquetas(rankings.top('valor_impuesto_a_pagar', n, mascara))]
+
+    # Se seleccionan sobre la columna del impuesto; solo se extraen las `n` filas
+    impuesto_morosos = df['valor_impuesto_a_pagar'].where(~df['cumplimiento'])
+    return df.loc[impuesto_morosos.nlargest(n).index]
+
+
+def morosos_sobre_percentil(df, percentil, columna='valor_impuesto_a_pagar', rankings=None):
+    """
+    Predios morosos cuyo valor de `columna` está en o sobre el `percentil`
+    (0 a 100) de los morosos, de mayor a menor.
+    """
+    if rankings is not None:
+        mascara = ~rankings.df['cumplimiento'].to_numpy(dtype=bool)
+        presentes = rankings.mascara_de(df)
+        if presentes is not None:
+            mascara &= presentes
+        return df.loc[rankings.etiquetas(rankings.sobre_cuantil(columna, percentil / 100, mascara))]
+
+    morosos = df[~df['cumplimiento']]
+    if morosos.empty:
+        return morosos
+    umbral = np.quantile(morosos[columna].to_numpy(dtype=float), percentil / 100)
+    return morosos[morosos[columna] >= umbral].sort_values(columna, ascending=False, kind="stable")
+
+
+def simulacion_escenarios(df, escenarios=ESCENARIOS_COBERTURA):
+    """
+    Recaudo proyectado por porcentaje de cobertura de la mora y predios
+    morosos involucrados (sin ordenar: las tablas ordenan en el servidor).
+    """
+    morosos = df[df['cumplimiento'] == False]
+    total_morosidad = morosos['valor_impuesto_a_pagar'].sum()
+
+    return {
+        "total_morosidad": total_morosidad,
+        "escenarios": escenarios_cobertura(total_morosidad, escenarios),
+        "predios_simulados": morosos,
+    }
+
+
+def riesgo_geoespacial(df, config=None, motor=None):
+    """
+    Columnas de `df` más los puntajes de riesgo fiscal, catastral,
+    comportamental y total (ver `predial.riesgo`), en el orden de `df`: las
+    tablas ordenan por `riesgo_total` en el servidor. Si se pasa un
+    `MotorRiesgo` de `df`, se reutilizan sus componentes en caché.
+    """
+    config = config or ConfigRiesgo()
+    puntajes = motor.puntuar(config) if motor is not None else puntuar(df, config)
+
+    # Copia superficial: comparte las columnas de `df` y solo añade los puntajes
+    df_riesgo = df.copy(deep=False)
+    for col in puntajes.columns:
+        df_riesgo[col] = puntajes[col].to_numpy()
+    return df_riesgo
@@ -0,0 +1,116 @@
+"""
+Cubo de agregación para los resúmenes y KPIs.
+
+Se agrupa el dataset una sola vez por sector × sector urbano × vereda ×
+destino económico × propiedad horizontal × cumplimiento, guardando el número
+de predios y la suma de cada medida por celda. Cualquier combinación de
+filtros globales se resuelve sumando las celdas que la cumplen, sin recorrer
+las filas del dataset.
+"""
+
+import numpy as np
+import pandas as pd
+
+from predial.analisis import MEDIDAS_RESUMEN, resumen_desde_totales
+from predial.filtros import COLUMNAS_FILTRO
+
+
+class CuboAgregado:
+    """
+    Agregados por celda, construidos a partir de un `MotorFiltros` (se
+    reutilizan sus códigos categóricos como dimensiones).
+    """
+
+    def __init__(self, motor):
+        self._motor = motor
+        df = motor.df
+
+        # Clave única por fila en base mixta: cada dimensión aporta (categorías + 1) valores,
+        # el 0 reservado para nulos
+        clave = df['cumplimiento'].to_numpy(dtype=np.int64)
+        base = 2
+        for col in COLUMNAS_FILTRO:
+            cardinalidad = len(motor.opciones(col)) + 1
+            clave = clave + base * (motor.codigos(col).astype(np.int64) + 1)
+            base *= cardinalidad
+
+        claves, inverso = np.unique(clave, return_inverse=True)
+        inverso = inverso.ravel()
+
+        # Dimensiones de cada celda, decodificadas de la clave
+        self.cumplimiento = (claves % 2).astype(bool)
+        self.dimensiones = {}
+        resto = claves // 2
+        for col in COLUMNAS_FILTRO:
+            cardinalidad = len(motor.opciones(col)) + 1
+            self.dimensiones[col] = resto % cardinalidad - 1
+            resto = resto // cardinalidad
+
+        self.predios = np.bincount(inverso, minlength=len(claves))
+        self.sumas = {
+            m: np.bincount(inverso, weights=df[m].to_numpy(dtype=float), minlength=len(claves))
+            for m in MEDIDAS_RESUMEN
+        }
+
+        # Sector de cada celda en mayúsculas, para separar urbano y rural
+        sectores = np.array([s.upper() for s in motor.opciones("sector")] + [""], dtype=object)
+        self._sector_mayus = sectores[self.dimensiones["sector"]]
+
+    def __len__(self):
+        return len(self.predios)
+
+    def mascara(self, seleccion):
+        """
+        Celdas que cumplen la selección de filtros globales. Un valor que no
+        está en el dataset no selecciona ninguna celda (su código, -1, es
+        también el de los nulos).
+        """
+        mascara = np.ones(len(self), dtype=bool)
+        for col, valor in seleccion.items():
+            if valor is None:
+                continue
+            codigo = self._motor.codigo(col, valor)
+            if codigo < 0:
+                return np.zeros(len(self), dtype=bool)
+            mascara &= self.dimensiones[col] == codigo
+        return mascara
+
+    def _totales(self, mascara):
+        return resumen_desde_totales(
+            int(self.predios[mascara].sum()),
+            {m: self.sumas[m][mascara].sum() for m in MEDIDAS_RESUMEN},
+        )
+
+    def resumen(self, seleccion):
+        """
+        Tabla resumen (Total, Urbano, Rural) para la selección; equivale a
+        `predial.analisis.informacion_general` sobre los datos filtrados.
+        """
+        mascara = self.mascara(seleccion)
+        total = self._totales(mascara)
+        urbano = self._totales(mascara & (self._sector_mayus == 'URBANO'))
+        rural = self._totales(mascara & (self._sector_mayus == 'RURAL'))
+
+        return pd.DataFrame([total, urbano, rural], index=["Total", "Urbano", "Rural"]).T
+
+    def kpis(self, seleccion):
+        """
+        Indicadores de cumplimiento y mora para la selección.
+        """
+        mascara = self.mascara(seleccion)
+        pagados = mascara & self.cumplimiento
+        morosos = mascara & ~self.cumplimiento
+
+        predios = int(self.predios[mascara].sum())
+        n_pagados = int(self.predios[pagados].sum())
+        facturado = self.sumas['valor_impuesto_a_pagar'][mascara].sum()
+        recaudo_pagados = self.sumas['recaudo_predial'][pagados].sum()
+
+        return {
+            "predios": predios,
+            "pagados": n_pagados,
+            "morosos": int(self.predios[morosos].sum()),
+            "tasa_cumplimiento": n_pagados / predios * 100 if predios > 0 else None,
+            "recaudo_facturado": recaudo_pagados / facturado * 100 if facturado > 0 else None,
+            "valor_mora": self.sumas['valor_impuesto_a_pagar'][morosos].sum(),
+        }
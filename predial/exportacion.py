@@ -0,0 +1,189 @@
+"""
+Exportación de tablas a CSV, XLSX y Parquet por bloques.
+
+Los archivos se escriben desde las columnas del DataFrame, `FILAS_POR_BLOQUE`
+filas a la vez: nunca se arma una copia completa formateada (como la de
+`DataFrame.style`). El XLSX usa el modo `write_only` de openpyxl (las filas
+se escriben en streaming) y el Parquet escribe un grupo de filas por bloque.
+
+`Exportador` ejecuta las exportaciones en hilos y deja cada archivo en un
+directorio temporal, para que la interfaz no espere a que terminen.
+"""
+
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from uuid import uuid4
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+FILAS_POR_BLOQUE = 50_000
+
+# Límite de filas de una hoja de Excel (sin contar el encabezado)
+MAXIMO_FILAS_XLSX = 1_048_575
+
+# Extensión y tipo MIME de cada formato
+FORMATOS = {
+    "CSV": (".csv", "text/csv"),
+    "XLSX": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "Parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+
+DIRECTORIO_EXPORTACION = Path(
+    os.environ.get("PREDIAL_EXPORT_DIR", Path(tempfile.gettempdir()) / "predial_exportaciones")
+)
+
+# Archivos exportados que se conservan; los más antiguos se borran
+MAXIMO_ARCHIVOS = 64
+
+
+def bloques(df, columnas=None, posiciones=None, filas=FILAS_POR_BLOQUE):
+    """
+    Bloques consecutivos de `df` (solo `columnas`), en el orden de
+    `posiciones` (posiciones de fila) si se pasan.
+    """
+    columnas = list(df.columns) if columnas is None else list(columnas)
+    n = len(df) if posiciones is None else len(posiciones)
+    for inicio in range(0, n, filas):
+        if posiciones is None:
+            yield df.iloc[inicio:inicio + filas][columnas]
+        else:
+            yield df.iloc[posiciones[inicio:inicio + filas]][columnas]
+
+
+def escribir_csv(df, destino, columnas=None, posiciones=None, filas=FILAS_POR_BLOQUE):
+    """
+    CSV en UTF-8 con BOM (para que Excel reconozca las tildes).
+    """
+    columnas = list(df.columns) if columnas is None else list(columnas)
+    with open(destino, "w", encoding="utf-8-sig", newline="") as archivo:
+        encabezado = True
+        for bloque in bloques(df, columnas, posiciones, filas):
+            bloque.to_csv(archivo, header=encabezado, index=False)
+            encabezado = False
+        if encabezado:
+            # Sin filas: solo el encabezado
+            pd.DataFrame(columns=columnas).to_csv(archivo, index=False)
+
+
+def _valores_celda(serie):
+    # Valores nativos de Python, con None en lugar de los nulos (openpyxl no acepta NaN ni NA)
+    return serie.astype(object).where(serie.notna(), None).tolist()
+
+
+def escribir_xlsx(df, destino, columnas=None, posiciones=None, filas=FILAS_POR_BLOQUE):
+    """
+    XLSX con openpyxl en modo `write_only`. Lanza `ValueError` si las filas
+    no caben en una hoja.
+    """
+    from openpyxl import Workbook
+
+    n = len(df) if posiciones is None else len(posiciones)
+    if n > MAXIMO_FILAS_XLSX:
+        raise ValueError(f"Una hoja de Excel admite hasta {MAXIMO_FILAS_XLSX:,} filas; la tabla tiene {n:,}.")
+
+    columnas = list(df.columns) if columnas is None else list(columnas)
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet("datos")
+    hoja.append(columnas)
+    for bloque in bloques(df, columnas, posiciones, filas):
+        for fila in zip(*(_valores_celda(bloque[col]) for col in columnas)):
+            hoja.append(fila)
+    libro.save(destino)
+
+
+def _esquema_parquet(df, columnas):
+    """
+    Esquema Arrow de las columnas; las de texto sin tipo (object) se fijan
+    como texto para que todos los bloques compartan el esquema.
+    """
+    import pyarrow as pa
+
+    esquema = pa.Schema.from_pandas(df.iloc[:0][columnas], preserve_index=False)
+    for i, campo in enumerate(esquema):
+        if pa.types.is_null(campo.type):
+            esquema = esquema.set(i, pa.field(campo.name, pa.string()))
+    return esquema
+
+
+def escribir_parquet(df, destino, columnas=None, posiciones=None, filas=FILAS_POR_BLOQUE):
+    """
+    Parquet con un grupo de filas por bloque.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columnas = list(df.columns) if columnas is None else list(columnas)
+    esquema = _esquema_parquet(df, columnas)
+    with pq.ParquetWriter(destino, esquema) as escritor:
+        for bloque in bloques(df, columnas, posiciones, filas):
+            escritor.write_table(pa.Table.from_pandas(bloque, schema=esquema, preserve_index=False))
+
+
+ESCRITORES = {"CSV": escribir_csv, "XLSX": escribir_xlsx, "Parquet": escribir_parquet}
+
+
+def exportar(df, formato, destino, columnas=None, posiciones=None, filas=FILAS_POR_BLOQUE):
+    """
+    Escribe `df` (solo `columnas`, en el orden de `posiciones`) en `destino`
+    con el formato dado (`FORMATOS`).
+    """
+    if formato not in ESCRITORES:
+        raise ValueError(f"Formato no soportado: {formato}")
+    ESCRITORES[formato](df, destino, columnas, posiciones, filas)
+
+
+class Exportador:
+    """
+    Exportaciones en segundo plano, compartidas por todas las sesiones.
+
+    `iniciar` devuelve un `Future` con la ruta del archivo. Se conservan los
+    últimos `maximo` archivos; al superar el límite se borran los más
+    antiguos ya terminados.
+    """
+
+    def __init__(self, directorio=None, hilos=2, maximo=MAXIMO_ARCHIVOS):
+        self.directorio = Path(directorio or DIRECTORIO_EXPORTACION)
+        self.maximo = maximo
+        self._pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="exportacion")
+        self._trabajos = OrderedDict()
+        self._candado = threading.Lock()
+
+    def iniciar(self, df, formato, columnas=None, posiciones=None):
+        """
+        Lanza la exportación. `posiciones` puede ser un arreglo o una función
+        sin argumentos que lo devuelve (se evalúa en el hilo, p. ej. para
+        ordenar la tabla completa fuera de la interfaz).
+        """
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        ruta = self.directorio / f"{uuid4().hex}{FORMATOS[formato][0]}"
+
+        def trabajo():
+            orden = posiciones() if callable(posiciones) else posiciones
+            temporal = ruta.with_suffix(".tmp")
+            try:
+                exportar(df, formato, temporal, columnas, orden)
+                os.replace(temporal, ruta)
+            except BaseException:
+                temporal.unlink(missing_ok=True)
+                logger.exception("Falló la exportación a %s", formato)
+                raise
+            return ruta
+
+        futuro = self._pool.submit(trabajo)
+        with self._candado:
+            self._trabajos[ruta] = futuro
+            self._limpiar()
+        return futuro
+
+    def _limpiar(self):
+        terminados = [r for r, f in self._trabajos.items() if f.done()]
+        for ruta in terminados[:max(0, len(self._trabajos) - self.maximo)]:
+            del self._trabajos[ruta]
+            ruta.unlink(missing_ok=True)
@@ -0,0 +1,176 @@
+"""
+Motor de filtros globales, construido una vez por dataset.
+
+Cada columna filtrable se guarda como códigos categóricos junto con, para cada
+valor, la lista ordenada de filas que lo contienen (lista invertida). Una
+combinación de filtros se resuelve partiendo de la lista más corta y
+descartando las filas que no cumplen los demás filtros, sin recorrer todo el
+DataFrame ni comparar textos.
+
+Los subconjuntos filtrados de las últimas `MAXIMO_FILTRADOS` selecciones se
+conservan: las reejecuciones con los mismos filtros no vuelven a copiar las
+filas.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+COLUMNAS_FILTRO = [
+    "sector", "sector_urbano", "vereda",
+    "destino_economico_predio", "propiedad_horizontal"
+]
+
+# Columnas que se comparan sin distinguir mayúsculas
+COLUMNAS_MINUSCULAS = {"propiedad_horizontal"}
+
+MAXIMO_FILTRADOS = int(os.environ.get("PREDIAL_FILTRADOS", "4"))
+
+
+def codigos_categoricos(valores, minusculas=False):
+    """
+    Categorías ordenadas (texto) y código de cada fila (-1 para nulos).
+
+    Si la columna ya es categórica solo se procesan sus categorías, sin
+    convertir cada fila a texto.
+    """
+    if isinstance(valores.dtype, pd.CategoricalDtype):
+        categorias = valores.cat.categories.astype(str)
+        if minusculas:
+            categorias = categorias.str.lower()
+        # Reordena (y une, si al pasar a minúsculas coinciden) las categorías
+        unicas, inversa = np.unique(np.asarray(categorias, dtype=object), return_inverse=True)
+        codigos = valores.cat.codes.to_numpy()
+        if len(unicas):
+            codigos = np.where(codigos >= 0, inversa[codigos], -1).astype(codigos.dtype)
+        return pd.Index(unicas, dtype=object), codigos
+
+    texto = valores.where(valores.isna(), valores.astype(str))
+    if minusculas:
+        texto = texto.str.lower()
+    categorico = pd.Categorical(texto)
+    return categorico.categories, categorico.codes
+
+
+class MotorFiltros:
+    """
+    Índice de las columnas filtrables de un dataset.
+
+    `seleccion` es un dict `{columna: valor}`; las columnas ausentes o con
+    valor `None` no filtran.
+    """
+
+    def __init__(self, df, maximo_filtrados=MAXIMO_FILTRADOS):
+        self.df = df
+        self.maximo_filtrados = maximo_filtrados
+        # Subconjuntos por selección (LRU), compartidos por las sesiones del dataset
+        self._filtrados = OrderedDict()
+        self._candado = threading.Lock()
+        self._categorias = {}
+        self._codigos = {}
+        self._orden = {}
+        self._limites = {}
+
+        for col in COLUMNAS_FILTRO:
+            categorias, codigos = codigos_categoricos(df[col], col in COLUMNAS_MINUSCULAS)
+
+            # Filas agrupadas por código; los nulos (-1) quedan al inicio. Las
+            # posiciones caben en 32 bits salvo en datasets enormes.
+            orden = np.argsort(codigos, kind="stable")
+            if len(orden) < np.iinfo(np.int32).max:
+                orden = orden.astype(np.int32)
+            limites = np.searchsorted(codigos[orden], np.arange(len(categorias) + 1))
+
+            self._categorias[col] = categorias
+            self._codigos[col] = codigos
+            self._orden[col] = orden
+            self._limites[col] = limites
+
+    def opciones(self, col):
+        """
+        Valores distintos (no nulos) de una columna, ordenados.
+        """
+        return self._categorias[col].tolist()
+
+    def codigos(self, col):
+        """
+        Código categórico de cada fila en una columna (-1 para nulos).
+        """
+        return self._codigos[col]
+
+    def codigo(self, col, valor):
+        """
+        Código de un valor en una columna (-1 si no existe).
+        """
+        valor = str(valor)
+        if col in COLUMNAS_MINUSCULAS:
+            valor = valor.lower()
+        return self._categorias[col].get_indexer([valor])[0]
+
+    def posiciones(self, seleccion):
+        """
+        Posiciones (ordenadas) de las filas que cumplen la selección, o `None`
+        si no hay ningún filtro activo.
+        """
+        activos = []
+        for col, valor in seleccion.items():
+            if valor is None:
+                continue
+            codigo = self.codigo(col, valor)
+            if codigo < 0:
+                return np.empty(0, dtype=np.intp)
+            inicio, fin = self._limites[col][codigo], self._limites[col][codigo + 1]
+            activos.append((fin - inicio, col, codigo, inicio, fin))
+
+        if not activos:
+            return None
+
+        activos.sort(key=lambda a: a[0])
+        _, col, _, inicio, fin = activos[0]
+        # Dentro de cada valor las filas ya están en orden ascendente
+        filas = self._orden[col][inicio:fin].copy()
+        for _, col, codigo, _, _ in activos[1:]:
+            filas = filas[self._codigos[col][filas] == codigo]
+        return filas
+
+    def mascara(self, seleccion):
+        """
+        Máscara booleana de la selección sobre todo el dataset.
+        """
+        filas = self.posiciones(seleccion)
+        mascara = np.ones(len(self.df), dtype=bool)
+        if filas is not None:
+            mascara[:] = False
+            mascara[filas] = True
+        return mascara
+
+    def filtrar(self, seleccion):
+        """
+        Subconjunto del dataset para la selección.
+
+        Sin filtros activos devuelve el propio DataFrame (sin copia); en otro
+        caso solo se extraen las filas seleccionadas, una vez por selección
+        mientras siga entre las `maximo_filtrados` más recientes. El resultado
+        se comparte: no debe modificarse.
+        """
+        # Clave por códigos: valores que solo difieren en mayúsculas comparten subconjunto
+        clave = tuple(sorted(
+            (col, int(self.codigo(col, valor))) for col, valor in seleccion.items() if valor is not None
+        ))
+        if not clave:
+            return self.df
+        with self._candado:
+            filtrado = self._filtrados.get(clave)
+            if filtrado is not None:
+                self._filtrados.move_to_end(clave)
+                return filtrado
+
+        filtrado = self.df.take(self.posiciones(seleccion))
+        with self._candado:
+            self._filtrados[clave] = filtrado
+            while len(self._filtrados) > self.maximo_filtrados:
+                self._filtrados.popitem(last=False)
+        return filtrado
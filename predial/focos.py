@@ -0,0 +1,251 @@
+"""
+Focos de mora: concentraciones espaciales de predios morosos.
+
+Las coordenadas se proyectan a metros (proyección equirectangular local,
+suficiente a escala municipal) y cada predio se asigna a una celda cuadrada
+de `tamano_celda` metros. El índice guarda los predios ordenados por celda,
+de modo que:
+
+- los focos de un subconjunto (p. ej. los morosos filtrados) se obtienen
+  sumando el saldo por celda, marcando las celdas densas y uniendo las
+  celdas densas vecinas en componentes conexas;
+- una consulta por radio solo revisa las celdas que cubren el círculo.
+
+Construir el índice cuesta O(n log n) (un ordenamiento) y un análisis de
+focos O(m log m) sobre las `m` filas del subconjunto, sin comparar pares de
+predios.
+"""
+
+import numpy as np
+import pandas as pd
+
+RADIO_TIERRA_M = 6_371_000
+
+TAMANO_CELDA_M = 250
+
+# Celdas densas: saldo de la celda en o sobre este percentil de las celdas con morosos
+PERCENTIL_DENSIDAD = 90
+
+MINIMO_PREDIOS_CELDA = 3
+
+# Predios por ruta de notificación
+MAXIMO_RUTA = 50
+
+# Vecinos de una celda (8-conectividad)
+_VECINOS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if (dx, dy) != (0, 0)]
+
+
+def _clave(x, y):
+    # Una sola clave entera por celda (x, y)
+    return (x.astype(np.int64) << 32) ^ (y.astype(np.int64) & 0xFFFFFFFF)
+
+
+def _moda(valores, grupos, n_grupos):
+    """
+    Valor más frecuente de `valores` (texto o categoría) en cada grupo.
+    """
+    codigos, unicos = pd.factorize(valores)
+    etiquetas = np.asarray([str(u) for u in unicos] + [""], dtype=object)
+    codigos = np.where(codigos < 0, len(unicos), codigos)
+    conteo = np.zeros((n_grupos, len(etiquetas)), dtype=np.int64)
+    np.add.at(conteo, (grupos, codigos), 1)
+    return etiquetas[conteo.argmax(axis=1)]
+
+
+class IndiceFocos:
+    """
+    Rejilla métrica de los predios de un dataset para focos y consultas por
+    radio.
+
+    Las posiciones que reciben y devuelven los métodos son posiciones de fila
+    en el dataset con el que se construyó el índice.
+    """
+
+    def __init__(self, df, tamano_celda=TAMANO_CELDA_M):
+        self.df = df
+        self.tamano_celda = tamano_celda
+        lat = df['latitud'].to_numpy(dtype=float)
+        lon = df['longitud'].to_numpy(dtype=float)
+        # Las coordenadas vacías quedan en 0 tras el preprocesamiento: (0, 0) no es un predio
+        self._validas = ~(np.isnan(lat) | np.isnan(lon) | ((lat == 0) & (lon == 0)))
+
+        # Proyección equirectangular alrededor del centro del dataset
+        lat0 = lat[self._validas].mean() if self._validas.any() else 0.0
+        lon0 = lon[self._validas].mean() if self._validas.any() else 0.0
+        self._origen = (lat0, lon0)
+        self._escala_x = np.radians(1) * RADIO_TIERRA_M * np.cos(np.radians(lat0))
+        self._escala_y = np.radians(1) * RADIO_TIERRA_M
+        self._x = (lon - lon0) * self._escala_x
+        self._y = (lat - lat0) * self._escala_y
+
+        cx = np.floor(self._x / tamano_celda)
+        cy = np.floor(self._y / tamano_celda)
+        # Coordenadas de celda en 32 bits: a escala municipal son unas pocas centenas
+        self._celda_x = np.where(self._validas, cx, 0).astype(np.int32)
+        self._celda_y = np.where(self._validas, cy, 0).astype(np.int32)
+        clave = _clave(self._celda_x, self._celda_y)
+
+        # Predios con coordenadas ordenados por celda (estructura tipo CSR)
+        posiciones = np.flatnonzero(self._validas)
+        orden = posiciones[np.argsort(clave[posiciones], kind="stable")]
+        if len(df) < np.iinfo(np.int32).max:
+            orden = orden.astype(np.int32)
+        self._orden = orden
+        self._claves, self._inicios = np.unique(clave[orden], return_index=True)
+        self._fines = np.append(self._inicios[1:], len(orden))
+
+    def _a_grados(self, x, y):
+        lat0, lon0 = self._origen
+        return lat0 + y / self._escala_y, lon0 + x / self._escala_x
+
+    def vecinos(self, posicion, radio, posiciones=None):
+        """
+        Filas a menos de `radio` metros de la fila `posicion`, ordenadas por
+        distancia: `(posiciones, distancias)`. Si se pasan `posiciones`, solo
+        se consideran esas filas.
+        """
+        if not self._validas[posicion]:
+            return np.array([], dtype=np.int64), np.array([])
+
+        anillos = int(np.ceil(radio / self.tamano_celda))
+        dx, dy = np.meshgrid(np.arange(-anillos, anillos + 1), np.arange(-anillos, anillos + 1))
+        claves = _clave(self._celda_x[posicion] + dx.ravel(), self._celda_y[posicion] + dy.ravel())
+        i = np.searchsorted(self._claves, claves)
+        i = i[(i < len(self._claves)) & (self._claves[np.minimum(i, len(self._claves) - 1)] == claves)]
+        if len(i) == 0:
+            return np.array([], dtype=np.int64), np.array([])
+        candidatos = np.concatenate([self._orden[a:b] for a, b in zip(self._inicios[i], self._fines[i])])
+
+        if posiciones is not None:
+            permitidas = np.zeros(len(self._x), dtype=bool)
+            permitidas[posiciones] = True
+            candidatos = candidatos[permitidas[candidatos]]
+        distancia = np.hypot(self._x[candidatos] - self._x[posicion], self._y[candidatos] - self._y[posicion])
+        dentro = distancia <= radio
+        candidatos, distancia = candidatos[dentro], distancia[dentro]
+        orden = np.argsort(distancia, kind="stable")
+        return candidatos[orden], distancia[orden]
+
+    def focos(self, posiciones, pesos, percentil=PERCENTIL_DENSIDAD, minimo_predios=MINIMO_PREDIOS_CELDA):
+        """
+        Focos de las filas `posiciones` ponderadas por `pesos` (p. ej. el
+        saldo de los morosos), ordenados de mayor a menor peso.
+
+        Una celda es densa si su peso está en o sobre el `percentil` de las
+        celdas ocupadas y tiene al menos `minimo_predios`; las celdas densas
+        vecinas (incluidas las diagonales) forman un foco. Devuelve
+        `(focos, foco)`: un DataFrame con una fila por foco y el número de
+        foco (1 es el de mayor peso; 0 si ninguno) de cada posición.
+        """
+        posiciones = np.asarray(posiciones)
+        pesos = np.asarray(pesos, dtype=float)
+        foco = np.zeros(len(posiciones), dtype=np.int64)
+        columnas = ["foco", "predios", "saldo", "latitud", "longitud", "radio_m", "celdas",
+                    "saldo_km2", "sector", "vereda", "sector_urbano"]
+
+        validas = self._validas[posiciones]
+        if not validas.any():
+            return pd.DataFrame(columns=columnas), foco
+
+        # Peso y número de predios por celda ocupada
+        clave = _clave(self._celda_x[posiciones[validas]], self._celda_y[posiciones[validas]])
+        claves, celda = np.unique(clave, return_inverse=True)
+        peso_celda = np.bincount(celda, pesos[validas])
+        predios_celda = np.bincount(celda)
+
+        umbral = np.percentile(peso_celda, percentil)
+        densas = np.flatnonzero((peso_celda >= umbral) & (predios_celda >= minimo_predios) & (peso_celda > 0))
+        if len(densas) == 0:
+            return pd.DataFrame(columns=columnas), foco
+
+        # Componentes conexas de las celdas densas: propagación de la etiqueta mínima
+        densas_claves = claves[densas]
+        x, y = densas_claves >> 32, (densas_claves & 0xFFFFFFFF).astype(np.int32).astype(np.int64)
+        aristas = []
+        for dx, dy in _VECINOS:
+            vecina = _clave(x + dx, y + dy)
+            j = np.searchsorted(densas_claves, vecina)
+            existe = (j < len(densas_claves)) & (densas_claves[np.minimum(j, len(densas_claves) - 1)] == vecina)
+            aristas.append((np.flatnonzero(existe), j[existe]))
+        etiqueta = np.arange(len(densas))
+        while True:
+            anterior = etiqueta.copy()
+            for a, b in aristas:
+                np.minimum.at(etiqueta, a, etiqueta[b])
+            etiqueta = etiqueta[etiqueta]
+            if np.array_equal(etiqueta, anterior):
+                break
+        _, componente = np.unique(etiqueta, return_inverse=True)
+
+        # Componente de cada fila (-1 si su celda no es densa)
+        componente_celda = np.full(len(claves), -1, dtype=np.int64)
+        componente_celda[densas] = componente
+        componente_fila = np.full(len(posiciones), -1, dtype=np.int64)
+        componente_fila[validas] = componente_celda[celda]
+
+        en_foco = componente_fila >= 0
+        grupo = componente_fila[en_foco]
+        filas = posiciones[en_foco]
+        peso = pesos[en_foco]
+        n_focos = componente.max() + 1
+
+        saldo = np.bincount(grupo, peso, minlength=n_focos)
+        predios = np.bincount(grupo, minlength=n_focos)
+        # Centro ponderado por saldo (por número de predios si el saldo es nulo)
+        ponderacion = np.where(saldo[grupo] > 0, peso, 1.0)
+        total = np.bincount(grupo, ponderacion, minlength=n_focos)
+        cx = np.bincount(grupo, ponderacion * self._x[filas], minlength=n_focos) / total
+        cy = np.bincount(grupo, ponderacion * self._y[filas], minlength=n_focos) / total
+        distancia = np.hypot(self._x[filas] - cx[grupo], self._y[filas] - cy[grupo])
+        radio = np.zeros(n_focos)
+        np.maximum.at(radio, grupo, distancia)
+        celdas = np.bincount(componente, minlength=n_focos)
+        lat, lon = self._a_grados(cx, cy)
+
+        tabla = pd.DataFrame({
+            "predios": predios,
+            "saldo": saldo,
+            "latitud": lat,
+            "longitud": lon,
+            "radio_m": radio,
+            "celdas": celdas,
+            "saldo_km2": saldo / (celdas * (self.tamano_celda / 1000) ** 2),
+            "sector": _moda(self.df['sector'].iloc[filas], grupo, n_focos),
+            "vereda": _moda(self.df['vereda'].iloc[filas], grupo, n_focos),
+            "sector_urbano": _moda(self.df['sector_urbano'].iloc[filas], grupo, n_focos),
+        })
+
+        # Focos numerados de mayor a menor saldo
+        rango = np.empty(n_focos, dtype=np.int64)
+        rango[np.argsort(-saldo, kind="stable")] = np.arange(1, n_focos + 1)
+        tabla.insert(0, "foco", rango)
+        foco[en_foco] = rango[grupo]
+        return tabla.sort_values("foco").reset_index(drop=True)[columnas], foco
+
+    def ruta(self, posiciones, pesos, maximo=MAXIMO_RUTA):
+        """
+        Orden de visita de los `maximo` predios de mayor peso entre
+        `posiciones`: se empieza por el de mayor peso y se sigue siempre al
+        más cercano no visitado. Devuelve `(posiciones, distancias)`, con la
+        distancia en metros desde el predio anterior.
+        """
+        posiciones = np.asarray(posiciones)
+        pesos = np.asarray(pesos, dtype=float)
+        con_coordenadas = self._validas[posiciones]
+        posiciones, pesos = posiciones[con_coordenadas], pesos[con_coordenadas]
+        seleccion = posiciones[np.argsort(-pesos, kind="stable")[:maximo]]
+        if len(seleccion) == 0:
+            return seleccion, np.array([])
+
+        x, y = self._x[seleccion], self._y[seleccion]
+        pendientes = np.ones(len(seleccion), dtype=bool)
+        actual = 0
+        orden, distancias = [0], [0.0]
+        pendientes[0] = False
+        for _ in range(len(seleccion) - 1):
+            distancia = np.where(pendientes, np.hypot(x - x[actual], y - y[actual]), np.inf)
+            actual = int(distancia.argmin())
+            pendientes[actual] = False
+            orden.append(actual)
+            distancias.append(distancia[actual])
+        return seleccion[orden], np.asarray(distancias)
@@ -0,0 +1,17 @@
+"""
+Formato de valores para mostrar en popups y tablas.
+"""
+
+
+def moneda(serie):
+    """
+    Formatea una serie numérica como pesos sin decimales ("$1,234,567").
+    """
+    return serie.map("${:,.0f}".format)
+
+
+def decimal(serie, decimales=2):
+    """
+    Formatea una serie numérica con un número fijo de decimales.
+    """
+    return serie.map(f"{{:.{decimales}f}}".format)
@@ -0,0 +1,269 @@
+"""
+Etapa de ingesta: convierte el Excel predial en una copia columnar (Parquet).
+
+El Excel se parsea una sola vez por contenido. El resultado ya normalizado
+(columnas, tipos numéricos, `saldo` y `cumplimiento`) se guarda en disco con
+la huella SHA-256 del archivo como nombre, de modo que las cargas siguientes
+del mismo archivo (incluso tras reiniciar la app o expirar la caché de
+Streamlit) solo leen el Parquet.
+
+El dataset es compacto: solo las columnas requeridas, textos repetidos como
+categorías (un código de 1 byte por fila), `codigo_igac` como texto Arrow y
+`cumplimiento` booleano. Los valores monetarios y las coordenadas se dejan en
+`float64`: sus sumas y la ubicación de los predios necesitan esa precisión
+(en `float32` una longitud de -74° se redondea a casi un metro), y los
+índices espaciales los leen sin copiar. El área construida, una medida sin
+sumas de dinero, se guarda en `float32`.
+"""
+
+import hashlib
+import io
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Se incrementa cuando cambia el preprocesamiento, para invalidar las copias
+# columnares generadas con una versión anterior.
+VERSION_INGESTA = "3"
+
+DIRECTORIO_CACHE = Path(os.environ.get("PREDIAL_CACHE_DIR", ".cache_predial"))
+
+COLUMNAS_REQUERIDAS = [
+    "valor_impuesto_a_pagar", "recaudo_predial", "pago_impuesto_predial",
+    "avaluo_catastral", "descuentos_impuesto_predial", "sector",
+    "sector_urbano", "vereda", "destino_economico_predio",
+    "propiedad_horizontal", "latitud", "longitud", "codigo_igac",
+    "area_construida", "financiacion_impuesto_predial"
+]
+
+COLUMNAS_NUMERICAS = [
+    "valor_impuesto_a_pagar", "recaudo_predial", "avaluo_catastral",
+    "descuentos_impuesto_predial", "latitud", "longitud", "area_construida"
+]
+
+# Medidas que no necesitan la precisión de `float64`
+COLUMNAS_FLOAT32 = ["area_construida"]
+
+# Columnas de texto con pocos valores distintos: se guardan como categorías
+COLUMNAS_CATEGORICAS = [
+    "pago_impuesto_predial", "sector", "sector_urbano", "vereda",
+    "destino_economico_predio", "propiedad_horizontal",
+    "financiacion_impuesto_predial"
+]
+
+
+class ColumnasFaltantesError(ValueError):
+    """El archivo no contiene todas las columnas requeridas."""
+
+    def __init__(self, faltantes):
+        self.faltantes = list(faltantes)
+        super().__init__(
+            f"Faltan columnas requeridas: {', '.join(self.faltantes)}"
+        )
+
+    def __reduce__(self):
+        # Para reconstruirla al volver de otro proceso (ejecución por lotes)
+        return (type(self), (self.faltantes,))
+
+
+def normalizar_columnas(columnas):
+    """
+    Normaliza nombres de columnas: minúsculas, sin tildes ni espacios.
+    """
+    return (
+        pd.Index(columnas).astype(str).str.strip().str.lower()
+        .str.replace(" ", "_")
+        .str.replace("á", "a").str.replace("é", "e")
+        .str.replace("í", "i").str.replace("ó", "o").str.replace("ú", "u")
+        .str.replace("ñ", "n")
+    )
+
+
+def huella_contenido(contenido):
+    """
+    Huella SHA-256 del archivo cargado (incluye la versión de ingesta).
+    """
+    h = hashlib.sha256()
+    h.update(VERSION_INGESTA.encode())
+    h.update(contenido)
+    return h.hexdigest()
+
+
+def leer_excel_columnas(origen, columnas=COLUMNAS_REQUERIDAS):
+    """
+    Lee la primera hoja del Excel en modo streaming (openpyxl `read_only`),
+    conservando únicamente `columnas`.
+
+    Lanza `ColumnasFaltantesError` si alguna columna no está en el encabezado.
+    """
+    from openpyxl import load_workbook
+
+    libro = load_workbook(origen, read_only=True, data_only=True)
+    try:
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        encabezado = next(filas, ())
+        nombres = normalizar_columnas(["" if v is None else v for v in encabezado])
+
+        # Primera aparición de cada columna requerida en el encabezado
+        posiciones = {}
+        for i, nombre in enumerate(nombres):
+            if nombre in columnas and nombre not in posiciones:
+                posiciones[nombre] = i
+        faltantes = [col for col in columnas if col not in posiciones]
+        if faltantes:
+            raise ColumnasFaltantesError(faltantes)
+
+        indices = [posiciones[col] for col in columnas]
+        valores = {col: [] for col in columnas}
+        for fila in filas:
+            seleccion = [fila[i] if i < len(fila) else None for i in indices]
+            if all(v is None for v in seleccion):
+                continue
+            for col, v in zip(columnas, seleccion):
+                valores[col].append(v)
+    finally:
+        libro.close()
+
+    return pd.DataFrame(valores, columns=list(columnas))
+
+
+def _sin_decimales(serie):
+    # Los códigos numéricos leídos como decimales (por los nulos) se escriben sin `.0`
+    if pd.api.types.is_float_dtype(serie) and (serie.dropna() % 1 == 0).all():
+        return serie.astype("Int64")
+    return serie
+
+
+def _texto(serie):
+    """
+    Valores como texto conservando los nulos.
+    """
+    serie = _sin_decimales(serie)
+    if not pd.api.types.is_object_dtype(serie):
+        serie = serie.astype(object)
+    return serie.where(serie.isna(), serie.astype(str))
+
+
+def _categoria_texto(serie):
+    """
+    Columna categórica de texto con categorías ordenadas. Solo se convierte a
+    texto cada valor distinto (p. ej. 1 y '1' quedan en la misma categoría).
+    """
+    codigos, unicos = pd.factorize(_sin_decimales(serie))
+    categorias, inversa = np.unique(np.array([str(u) for u in unicos], dtype=object), return_inverse=True)
+    if len(categorias):
+        codigos = np.where(codigos >= 0, inversa[codigos], -1)
+    return pd.Categorical.from_codes(codigos, categorias)
+
+
+def preprocesar(df):
+    """
+    Normaliza columnas, convierte tipos y crea `saldo` y `cumplimiento`.
+
+    Devuelve un DataFrame nuevo con solo las columnas requeridas (más las
+    derivadas), en su representación compacta.
+    """
+    df.columns = normalizar_columnas(df.columns)
+
+    faltantes = [col for col in COLUMNAS_REQUERIDAS if col not in df.columns]
+    if faltantes:
+        raise ColumnasFaltantesError(faltantes)
+
+    # Primera aparición de cada columna requerida; el resto no se conserva
+    df = df.loc[:, ~df.columns.duplicated()][COLUMNAS_REQUERIDAS]
+
+    for col in COLUMNAS_NUMERICAS:
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+
+    df['saldo'] = df['valor_impuesto_a_pagar'] - df['recaudo_predial']
+    df['cumplimiento'] = df['pago_impuesto_predial'].astype(str).str.lower().isin(['si', 'sí'])
+
+    return compactar(df)
+
+
+def compactar(df):
+    """
+    Pasa las columnas a su representación compacta: textos como categorías,
+    `codigo_igac` como texto Arrow y `COLUMNAS_FLOAT32` en `float32`.
+    Modifica y devuelve `df`.
+    """
+    # Las columnas de texto pueden traer valores mixtos (números y textos);
+    # se guardan como texto para que el Parquet tenga un tipo único.
+    for col in COLUMNAS_CATEGORICAS:
+        if col in df.columns:
+            df[col] = _categoria_texto(df[col])
+    if 'codigo_igac' in df.columns:
+        df['codigo_igac'] = _texto(df['codigo_igac']).astype("string[pyarrow]")
+    for col in COLUMNAS_FLOAT32:
+        if col in df.columns:
+            df[col] = df[col].astype(np.float32)
+    return df
+
+
+def ruta_columnar(huella, directorio=None):
+    """
+    Ruta del Parquet correspondiente a una huella.
+    """
+    return Path(directorio or DIRECTORIO_CACHE) / f"{huella}.parquet"
+
+
+def leer_columnar(ruta):
+    """
+    Lee una copia columnar. Las columnas de Arrow se liberan a medida que se
+    convierten, de modo que el pico de memoria no es la suma de ambas copias.
+    Los textos se leen como texto Arrow, igual que los deja `compactar`.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    texto = pd.StringDtype("pyarrow")
+    return pq.read_table(ruta).to_pandas(
+        split_blocks=True, self_destruct=True,
+        types_mapper={pa.string(): texto, pa.large_string(): texto}.get
+    )
+
+
+def cargar_dataset(contenido, directorio=None):
+    """
+    Devuelve el DataFrame preprocesado de un Excel predial (bytes).
+
+    Si ya existe la copia columnar del mismo contenido se lee directamente;
+    si no, se parsea el Excel, se preprocesa y se guarda en Parquet. La huella
+    queda en `df.attrs["huella"]` para identificar el dataset en otras cachés.
+    """
+    huella = huella_contenido(contenido)
+    ruta = ruta_columnar(huella, directorio)
+
+    df = None
+    if ruta.exists():
+        try:
+            df = leer_columnar(ruta)
+        except Exception:
+            # Copia corrupta o incompleta: se regenera desde el Excel
+            ruta.unlink(missing_ok=True)
+
+    if df is None:
+        df = preprocesar(leer_excel_columnas(io.BytesIO(contenido)))
+
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        temporal = ruta.with_suffix(f".{os.getpid()}.tmp")
+        df.to_parquet(temporal, index=False)
+        os.replace(temporal, ruta)
+
+    df.attrs["huella"] = huella
+    return df
+
+
+def cargar_ruta(ruta, directorio=None):
+    """
+    Carga un archivo predial desde disco: Excel (`.xlsx`, con la misma copia
+    columnar que `cargar_dataset`) o Parquet ya exportado (`.parquet`).
+    """
+    ruta = Path(ruta)
+    if ruta.suffix.lower() == ".parquet":
+        df = preprocesar(pd.read_parquet(ruta))
+        df.attrs["huella"] = huella_contenido(ruta.read_bytes())
+        return df
+    return cargar_dataset(ruta.read_bytes(), directorio)
@@ -0,0 +1,156 @@
+"""
+Ejecución por lotes (sin Streamlit) de todos los análisis sobre un
+directorio de archivos municipales.
+
+Cada archivo se procesa en un proceso del pool y deja sus resultados en
+`<salida>/<municipio>/`:
+
+- `kpis.json`: indicadores, resumen general y escenarios de cobertura.
+- `cobro.csv`: predios focalizados para cobro.
+- `oportunidades.csv`: oportunidades catastrales.
+- `riesgo.parquet`: puntajes de riesgo por predio, de mayor a menor.
+
+Además se escribe `<salida>/resumen_lote.csv` con una fila por archivo.
+"""
+
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+from predial import analisis
+from predial.cubo import CuboAgregado
+from predial.filtros import MotorFiltros
+from predial.ingesta import cargar_ruta
+from predial.perfilado import etapa
+from predial.riesgo import COMPONENTES, ConfigRiesgo
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONES = {".xlsx", ".parquet"}
+
+COLUMNAS_TABLA = [
+    "codigo_igac", "vereda", "sector", "avaluo_catastral",
+    "valor_impuesto_a_pagar", "area_construida"
+]
+
+
+def archivos_municipales(directorio):
+    """
+    Archivos `.xlsx` / `.parquet` del directorio (sin temporales de Excel).
+    """
+    return sorted(
+        ruta for ruta in Path(directorio).iterdir()
+        if ruta.is_file() and ruta.suffix.lower() in EXTENSIONES and not ruta.name.startswith("~$")
+    )
+
+
+def _json_nativo(valor):
+    # Tipos NumPy a tipos nativos para json.dumps
+    return valor.item() if hasattr(valor, "item") else str(valor)
+
+
+def analizar_municipio(ruta, salida, top=analisis.TOP_COBRO, config=None, directorio_cache=None):
+    """
+    Ejecuta todos los análisis sobre un archivo y escribe sus resultados.
+
+    Devuelve un dict con los indicadores principales del municipio.
+    """
+    inicio = time.perf_counter()
+    ruta = Path(ruta)
+    destino = Path(salida) / ruta.stem
+
+    with etapa("lote:carga", municipio=ruta.stem) as medicion:
+        df = cargar_ruta(ruta, directorio_cache)
+        medicion.filas = len(df)
+    # Solo se crea tras cargar el archivo: un archivo inválido no deja un directorio vacío
+    destino.mkdir(parents=True, exist_ok=True)
+    with etapa("lote:cubo", filas=len(df), municipio=ruta.stem):
+        cubo = CuboAgregado(MotorFiltros(df))
+        kpis = cubo.kpis({})
+
+    resultados = {
+        "archivo": ruta.name,
+        "kpis": kpis,
+        "resumen": cubo.resumen({}).to_dict(),
+        "escenarios": dict(analisis.escenarios_cobertura(kpis["valor_mora"])),
+    }
+    (destino / "kpis.json").write_text(
+        json.dumps(resultados, ensure_ascii=False, indent=2, default=_json_nativo), encoding="utf-8"
+    )
+
+    with etapa("lote:cobro", filas=len(df), municipio=ruta.stem):
+        analisis.estrategias_cobro(df, top)[COLUMNAS_TABLA].to_csv(destino / "cobro.csv", index=False)
+    with etapa("lote:oportunidades", filas=len(df), municipio=ruta.stem):
+        analisis.oportunidades_catastrales(df)[COLUMNAS_TABLA].to_csv(destino / "oportunidades.csv", index=False)
+
+    with etapa("lote:riesgo", filas=len(df), municipio=ruta.stem):
+        df_riesgo = analisis.riesgo_geoespacial(df, config or ConfigRiesgo())
+        df_riesgo = df_riesgo[["codigo_igac", "vereda", "sector", "latitud", "longitud"] + COMPONENTES + ["riesgo_total"]]
+        df_riesgo.sort_values("riesgo_total", ascending=False, kind="stable").to_parquet(
+            destino / "riesgo.parquet", index=False
+        )
+
+    return {
+        "municipio": ruta.stem,
+        "predios": kpis["predios"],
+        "morosos": kpis["morosos"],
+        "tasa_cumplimiento": kpis["tasa_cumplimiento"],
+        "valor_mora": kpis["valor_mora"],
+        "segundos": round(time.perf_counter() - inicio, 3),
+        "error": None,
+    }
+
+
+def ejecutar_lote(directorio, salida, procesos=None, top=analisis.TOP_COBRO, config=None, directorio_cache=None):
+    """
+    Analiza todos los archivos de `directorio` en paralelo (`procesos`
+    procesos; por defecto, uno por núcleo) y devuelve el resumen del lote.
+
+    Un archivo con errores (por ejemplo, columnas faltantes) queda registrado
+    en el resumen sin detener el resto del lote. Los archivos de un mismo
+    municipio (mismo nombre con otra extensión, p. ej. `a.xlsx` y
+    `a.parquet`) escribirían en el mismo directorio: no se analizan y quedan
+    en el resumen con su error.
+    """
+    archivos = archivos_municipales(directorio)
+    Path(salida).mkdir(parents=True, exist_ok=True)
+    procesos = procesos or os.cpu_count() or 1
+
+    por_municipio = defaultdict(list)
+    for ruta in archivos:
+        por_municipio[ruta.stem.lower()].append(ruta)
+
+    filas = []
+    for rutas in por_municipio.values():
+        if len(rutas) > 1:
+            error = f"Varios archivos para el mismo municipio: {', '.join(r.name for r in rutas)}"
+            logger.error(error)
+            filas.extend({"municipio": ruta.stem, "error": error} for ruta in rutas)
+    archivos = [ruta for ruta in archivos if len(por_municipio[ruta.stem.lower()]) == 1]
+
+    with ProcessPoolExecutor(max_workers=min(procesos, max(len(archivos), 1))) as pool:
+        tareas = {
+            pool.submit(analizar_municipio, ruta, salida, top, config, directorio_cache): ruta
+            for ruta in archivos
+        }
+        for tarea in as_completed(tareas):
+            ruta = tareas[tarea]
+            try:
+                fila = tarea.result()
+                logger.info("%s: %s predios en %ss", ruta.name, fila["predios"], fila["segundos"])
+            except Exception as e:
+                logger.error("%s: %s", ruta.name, e)
+                fila = {"municipio": ruta.stem, "error": str(e)}
+            filas.append(fila)
+
+    resumen = pd.DataFrame(filas, columns=[
+        "municipio", "predios", "morosos", "tasa_cumplimiento", "valor_mora", "segundos", "error"
+    ]).sort_values("municipio")
+    resumen.to_csv(Path(salida) / "resumen_lote.csv", index=False)
+    return resumen
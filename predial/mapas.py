@@ -0,0 +1,102 @@
+"""
+Construcción de mapas Folium a partir de columnas completas.
+
+Cada capa de puntos es un único `folium.GeoJson` (FeatureCollection) en lugar
+de un `folium.CircleMarker` por predio: el trabajo de Folium y el número de
+objetos del mapa crecen con el número de capas, no con el de predios. Los
+popups viajan como propiedades de cada punto y el estilo se define una vez
+por capa.
+"""
+
+import folium
+import numpy as np
+
+CENTRO_POR_DEFECTO = (4.710989, -74.072090)
+
+# Decimales de las coordenadas en el GeoJSON (~10 cm), para reducir el tamaño del mapa
+DECIMALES_COORDENADAS = 6
+
+
+def tiene_coordenadas(df):
+    """
+    Indica si el DataFrame tiene al menos una fila con latitud o longitud.
+    """
+    return not df.empty and not df[['latitud', 'longitud']].isnull().all().all()
+
+
+def crear_mapa(df, zoom_start=13):
+    """
+    Mapa base centrado en la media de las coordenadas de `df`.
+    """
+    lat = df['latitud'].mean() if not df['latitud'].isnull().all() else CENTRO_POR_DEFECTO[0]
+    lon = df['longitud'].mean() if not df['longitud'].isnull().all() else CENTRO_POR_DEFECTO[1]
+    # Con `prefer_canvas` los círculos se dibujan en un canvas en lugar de un nodo SVG por punto
+    return folium.Map(location=[lat, lon], zoom_start=zoom_start, prefer_canvas=True)
+
+
+def _geojson_puntos(df, popups, color, radio, opacidad, nombre=None):
+    validas = (df['latitud'].notna() & df['longitud'].notna()).to_numpy()
+    lat = np.round(df['latitud'].to_numpy()[validas], DECIMALES_COORDENADAS).tolist()
+    lon = np.round(df['longitud'].to_numpy()[validas], DECIMALES_COORDENADAS).tolist()
+    textos = popups.to_numpy()[validas].tolist()
+
+    datos = {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [x, y]},
+                "properties": {"popup": t},
+            }
+            for x, y, t in zip(lon, lat, textos)
+        ],
+    }
+    return folium.GeoJson(
+        datos,
+        name=nombre,
+        marker=folium.CircleMarker(radius=radio, color=color, fill=True, fill_opacity=opacidad),
+        popup=folium.GeoJsonPopup(fields=["popup"], labels=False),
+    )
+
+
+def capa_puntos(df, popups, color='red', radio=5, opacidad=0.6, nombre=None):
+    """
+    Capa de puntos (círculos) para todas las filas de `df` con coordenadas.
+
+    `popups` es una serie de textos (HTML) alineada con `df`.
+    """
+    return _geojson_puntos(df, popups, color, radio, opacidad, nombre)
+
+
+def capa_celdas(celdas, popups, color='red', opacidad=0.5, nombre=None):
+    """
+    Capa de celdas agregadas (ver `predial.agregacion_espacial`).
+
+    Cada celda se dibuja como un círculo en el centroide de sus predios, con
+    un radio que crece con el orden de magnitud de `celdas['predios']`. Se
+    crea un GeoJSON por tamaño de radio.
+    """
+    grupo = folium.FeatureGroup(name=nombre)
+    clases = np.clip(np.log10(np.maximum(celdas['predios'].to_numpy(), 1)).astype(int), 0, 4)
+    for clase in np.unique(clases):
+        seleccion = clases == clase
+        _geojson_puntos(
+            celdas[seleccion], popups[seleccion], color, 6 + 4 * int(clase), opacidad
+        ).add_to(grupo)
+    return grupo
+
+
+def capa_focos(focos, popups, color='darkred', radio_minimo=50, nombre=None):
+    """
+    Capa de focos de mora (ver `predial.focos`): un círculo por foco con el
+    radio en metros de `focos['radio_m']` (al menos `radio_minimo`). Los
+    focos son pocos, de modo que se dibujan como objetos individuales.
+    """
+    grupo = folium.FeatureGroup(name=nombre)
+    for fila, popup in zip(focos.itertuples(index=False), popups):
+        folium.Circle(
+            location=[fila.latitud, fila.longitud], radius=max(float(fila.radio_m), radio_minimo),
+            color=color, fill=True, fill_opacity=0.35, weight=2,
+            popup=folium.Popup(popup, max_width=300),
+        ).add_to(grupo)
+    return grupo
@@ -0,0 +1,189 @@
+"""
+Perfilado por etapas: tiempo, filas procesadas y memoria pico.
+
+    with etapa("filtro") as medicion:
+        df_filtrado = motor.filtrar(seleccion)
+        medicion.filas = len(df_filtrado)
+
+Cada medición se guarda en memoria (las últimas `MAXIMO_REGISTROS` por
+etapa, compartidas por todas las sesiones del proceso) para calcular
+percentiles, y se emite como una línea JSON en el logger `predial.perfilado`
+y, si está definida la variable de entorno `PREDIAL_PERFILADO_LOG`, en ese
+archivo.
+
+La memoria pico se mide con `tracemalloc` solo si se activa, porque hace
+más lento el código Python: para todo el proceso con
+`PREDIAL_PERFILADO_MEMORIA=1`, o solo para las etapas de un hilo (la
+ejecución de una sesión) con `perfilador.contexto(memoria=True)`. Es la
+memoria asignada por todo el proceso durante la etapa, de modo que con
+varias sesiones simultáneas es aproximada.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MAXIMO_REGISTROS = 1000
+
+PERCENTILES = [50, 90, 99]
+
+
+class Medicion:
+    """
+    Medición de una etapa; `filas` se puede fijar dentro del bloque.
+    """
+
+    def __init__(self, etapa, filas=None):
+        self.etapa = etapa
+        self.filas = filas
+        self.segundos = None
+        self.memoria_pico_mb = None
+        self.error = None
+        self._base = 0
+        self._pico = 0
+
+
+class Perfilador:
+    """
+    Registro de mediciones por etapa, seguro entre hilos.
+    """
+
+    def __init__(self, memoria=None, ruta_registro=None):
+        if memoria is None:
+            memoria = os.environ.get("PREDIAL_PERFILADO_MEMORIA") == "1"
+        self.memoria = memoria
+        self.ruta_registro = ruta_registro or os.environ.get("PREDIAL_PERFILADO_LOG")
+        self._registros = defaultdict(lambda: deque(maxlen=MAXIMO_REGISTROS))
+        self._candado = threading.Lock()
+        self._local = threading.local()
+
+    def contexto(self, memoria=None, **campos):
+        """
+        Campos que se añaden a las mediciones de este hilo (p. ej. sesión y
+        ejecución de Streamlit) hasta la siguiente llamada. `memoria` activa o
+        desactiva la medición de memoria en este hilo (`None`: la opción del
+        perfilador, `self.memoria`).
+        """
+        self._local.contexto = campos
+        self._local.memoria = memoria
+        self._local.pila = []
+
+    def _pila(self):
+        if not hasattr(self._local, "pila"):
+            self._local.pila = []
+        return self._local.pila
+
+    @contextmanager
+    def etapa(self, nombre, filas=None, **campos):
+        """
+        Mide el bloque como la etapa `nombre`. Las etapas se pueden anidar.
+        """
+        medicion = Medicion(nombre, filas)
+        pila = self._pila()
+        memoria = getattr(self._local, "memoria", None)
+        if memoria is None:
+            memoria = self.memoria
+        if memoria:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                medicion._propietaria = True
+            actual, pico = tracemalloc.get_traced_memory()
+            # El pico acumulado hasta aquí pertenece a la etapa que nos contiene
+            if pila:
+                pila[-1]._pico = max(pila[-1]._pico, pico)
+            tracemalloc.reset_peak()
+            medicion._base = actual
+        pila.append(medicion)
+
+        inicio = time.perf_counter()
+        try:
+            yield medicion
+        except BaseException as e:
+            medicion.error = type(e).__name__
+            raise
+        finally:
+            medicion.segundos = time.perf_counter() - inicio
+            pila.pop()
+            if memoria and tracemalloc.is_tracing():
+                pico = max(medicion._pico, tracemalloc.get_traced_memory()[1])
+                medicion.memoria_pico_mb = (pico - medicion._base) / 2**20
+                if pila:
+                    pila[-1]._pico = max(pila[-1]._pico, pico)
+                if getattr(medicion, "_propietaria", False):
+                    tracemalloc.stop()
+            self._guardar(medicion, campos)
+
+    def _guardar(self, medicion, campos):
+        registro = {
+            "fecha": datetime.now().isoformat(timespec="milliseconds"),
+            "etapa": medicion.etapa,
+            "segundos": round(medicion.segundos, 6),
+            "filas": None if medicion.filas is None else int(medicion.filas),
+            "memoria_pico_mb": None if medicion.memoria_pico_mb is None else round(medicion.memoria_pico_mb, 3),
+            "error": medicion.error,
+            **getattr(self._local, "contexto", {}),
+            **campos,
+        }
+        linea = json.dumps(registro, ensure_ascii=False, default=str)
+        with self._candado:
+            self._registros[medicion.etapa].append(registro)
+            if self.ruta_registro:
+                with open(self.ruta_registro, "a", encoding="utf-8") as archivo:
+                    archivo.write(linea + "\n")
+        logger.debug(linea)
+
+    def registros(self, **filtro):
+        """
+        Mediciones guardadas (DataFrame) que coinciden con `filtro`
+        (p. ej. `ejecucion=...`).
+        """
+        with self._candado:
+            filas = [r for cola in self._registros.values() for r in cola]
+        filas = [r for r in filas if all(r.get(k) == v for k, v in filtro.items())]
+        if not filas:
+            return pd.DataFrame(columns=["fecha", "etapa", "segundos", "filas", "memoria_pico_mb"])
+        return pd.DataFrame(filas).sort_values("fecha", kind="stable")
+
+    def percentiles(self, percentiles=PERCENTILES):
+        """
+        Percentiles de tiempo por etapa (en ms) sobre las mediciones guardadas.
+        """
+        with self._candado:
+            por_etapa = {etapa: list(cola) for etapa, cola in self._registros.items() if cola}
+
+        filas = []
+        for nombre, registros in sorted(por_etapa.items()):
+            segundos = np.array([r["segundos"] for r in registros])
+            fila = {"etapa": nombre, "n": len(segundos)}
+            for p, valor in zip(percentiles, np.percentile(segundos, percentiles)):
+                fila[f"p{p}_ms"] = valor * 1000
+            fila["max_ms"] = segundos.max() * 1000
+            memoria = [r["memoria_pico_mb"] for r in registros if r["memoria_pico_mb"] is not None]
+            fila["memoria_pico_mb"] = max(memoria) if memoria else None
+            filas.append(fila)
+        return pd.DataFrame(filas)
+
+    def limpiar(self):
+        with self._candado:
+            self._registros.clear()
+
+
+perfilador = Perfilador()
+
+
+def etapa(nombre, filas=None, **campos):
+    """
+    `Perfilador.etapa` del perfilador compartido del proceso.
+    """
+    return perfilador.etapa(nombre, filas, **campos)
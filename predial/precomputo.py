@@ -0,0 +1,260 @@
+"""
+Precómputo en segundo plano de los artefactos de un dataset.
+
+Al cargar un dataset se lanzan en un pool de hilos los bloques que usan las
+vistas: índices (filtros, espacial, rankings, focos), cubo de agregación,
+resultados de las vistas sin filtros, componentes y puntajes de riesgo y la
+simulación de recaudo. La interfaz muestra de inmediato lo que ya está listo
+y consulta el estado de cada artefacto para completar las demás vistas.
+
+Se usan hilos y no procesos: los artefactos son objetos que la aplicación
+usa directamente y comparten las columnas del dataset (mapeadas en memoria,
+ver `predial.registro`); NumPy libera el GIL en los ordenamientos y sumas que
+dominan su cálculo.
+
+Los artefactos se guardan por huella del dataset; se conservan los de los
+últimos `MAXIMO_DATASETS` datasets usados. Mientras se conservan, tienen su
+propia reserva del dataset en el registro: el presupuesto del registro
+cuenta la memoria que siguen ocupando.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from predial import analisis
+from predial.agregacion_espacial import IndiceEspacial, nivel_para_zoom
+from predial.cubo import CuboAgregado
+from predial.filtros import MotorFiltros
+from predial.focos import IndiceFocos
+from predial.perfilado import etapa
+from predial.rankings import IndiceRankings
+from predial.riesgo import ConfigRiesgo, MotorRiesgo
+from predial.simulacion import ConfigSimulacion, simular_recaudo
+
+HILOS = int(os.environ.get("PREDIAL_PRECOMPUTO_HILOS", min(4, os.cpu_count() or 1)))
+
+MAXIMO_DATASETS = int(os.environ.get("PREDIAL_PRECOMPUTO_DATASETS", "4"))
+
+# Zooms del mapa cuyos niveles de rejilla se calculan de antemano
+ZOOMS_MAPA = [12, 13, 14]
+
+# Vistas cuyo resultado sin filtros se calcula de antemano
+VISTAS_PRECALCULADAS = ["cumplimiento_tributario", "cartera_morosa", "oportunidades_catastrales"]
+
+ESTADOS = {"pendiente": "🕓", "calculando": "⏳", "listo": "✅", "error": "❌", "cancelado": "⏹️"}
+
+
+def _niveles_mapa(indice):
+    niveles = sorted({nivel_para_zoom(z) for z in ZOOMS_MAPA})
+    for nivel in niveles:
+        indice.celdas(nivel)
+    return niveles
+
+
+def _riesgo(df, motor):
+    df_riesgo = analisis.riesgo_geoespacial(df, ConfigRiesgo(), motor)
+    return df_riesgo, IndiceRankings(df_riesgo, ["riesgo_total"])
+
+
+def _simulacion(df, motor):
+    simulacion = simular_recaudo(df, ConfigSimulacion(), motor.componentes(ConfigRiesgo()))
+    return simulacion, IndiceRankings(simulacion["predios"], ["aporte_esperado", "probabilidad_pago"])
+
+
+def tareas_dataset(df):
+    """
+    Artefactos de `df`, en el orden en que se lanzan: `{nombre: función}`,
+    donde cada función recibe los `Artefactos` para pedir los anteriores.
+
+    - `motor_filtros`, `cubo`: filtros globales y resumen general;
+    - `indice_espacial`, `niveles_mapa`: rejilla de los mapas y sus niveles
+      para los zooms habituales;
+    - `rankings`: rankings por impuesto, saldo y avalúo;
+    - `analisis:<vista>`: resultados de `VISTAS_PRECALCULADAS` sin filtros;
+    - `motor_riesgo`, `riesgo`: componentes y puntajes de riesgo con
+      `ConfigRiesgo()` (`riesgo` es `(df_riesgo, ranking)`);
+    - `indice_focos`: rejilla métrica de los focos de mora;
+    - `simulacion`: simulación con `ConfigSimulacion()` y su ranking por
+      aporte esperado.
+    """
+    def motor_riesgo(a):
+        motor = MotorRiesgo(df)
+        motor.componentes(ConfigRiesgo())
+        return motor
+
+    tareas = {
+        "motor_filtros": lambda a: MotorFiltros(df),
+        "cubo": lambda a: CuboAgregado(a.resultado("motor_filtros")),
+        "indice_espacial": lambda a: IndiceEspacial(df),
+        "rankings": lambda a: IndiceRankings(df),
+    }
+    for vista in VISTAS_PRECALCULADAS:
+        tareas[f"analisis:{vista}"] = lambda a, vista=vista: getattr(analisis, vista)(df)
+    # Los morosos de la cartera son los no pagados de cumplimiento (una sola copia de esas filas)
+    tareas["analisis:cartera_morosa"] = lambda a: analisis.cartera_morosa(
+        df, a.resultado("analisis:cumplimiento_tributario")["no_pagados"]
+    )
+    tareas.update({
+        "niveles_mapa": lambda a: _niveles_mapa(a.resultado("indice_espacial")),
+        "motor_riesgo": motor_riesgo,
+        "riesgo": lambda a: _riesgo(df, a.resultado("motor_riesgo")),
+        "indice_focos": lambda a: IndiceFocos(df),
+        "simulacion": lambda a: _simulacion(df, a.resultado("motor_riesgo")),
+    })
+    return tareas
+
+
+class Artefactos:
+    """
+    Artefactos de un dataset en cálculo o ya calculados.
+
+    Las tareas se lanzan en el orden dado y cada una solo puede pedir
+    (`resultado`) artefactos anteriores: como el pool los toma en ese orden,
+    un artefacto pedido ya está en cálculo o terminado.
+
+    `reserva` es una `predial.registro.Reserva` del dataset, propia de estos
+    artefactos (se suelta con `liberar()`). Los artefactos cancelados se
+    vuelven a lanzar, en el mismo orden, cuando alguien los consulta.
+    """
+
+    def __init__(self, reserva, tareas, pool):
+        self._reserva = reserva
+        self._tareas = tareas
+        self._pool = pool
+        self._candado = threading.Lock()
+        self._estado = {}
+        self._futuros = {}
+        for nombre in tareas:
+            self._lanzar(nombre)
+
+    @property
+    def df(self):
+        return self._reserva.df
+
+    def _lanzar(self, nombre):
+        self._estado[nombre] = {"estado": "pendiente", "segundos": None}
+        self._futuros[nombre] = self._pool.submit(self._calcular, nombre, self._tareas[nombre])
+
+    def _calcular(self, nombre, funcion):
+        estado = self._estado[nombre]
+        estado["estado"] = "calculando"
+        inicio = time.perf_counter()
+        try:
+            with etapa(f"precomputo:{nombre}", filas=len(self.df)):
+                resultado = funcion(self)
+        except BaseException:
+            estado["estado"] = "error"
+            raise
+        finally:
+            estado["segundos"] = time.perf_counter() - inicio
+        estado["estado"] = "listo"
+        return resultado
+
+    def _vigentes(self):
+        # Si se cancelaron artefactos (al expulsarse de `Precomputo`) y otra sesión aún los
+        # usa, se relanzan todos los cancelados en el orden original: así los anteriores
+        # que pida cada tarea siguen en cálculo o terminados.
+        with self._candado:
+            if any(f.cancelled() for f in self._futuros.values()):
+                for nombre, futuro in list(self._futuros.items()):
+                    if futuro.cancelled():
+                        self._lanzar(nombre)
+            return dict(self._futuros)
+
+    def __contains__(self, nombre):
+        return nombre in self._futuros
+
+    def listo(self, nombre):
+        """
+        Si el artefacto terminó (también si terminó con error).
+        """
+        return self._vigentes()[nombre].done()
+
+    def terminado(self):
+        return all(f.done() for f in self._vigentes().values())
+
+    def resultado(self, nombre):
+        """
+        Valor del artefacto; espera a que termine y relanza su error si lo hubo.
+        """
+        return self._vigentes()[nombre].result()
+
+    def error(self, nombre):
+        """
+        Excepción del artefacto si terminó con error; `None` si terminó bien o
+        aún no termina.
+        """
+        futuro = self._vigentes()[nombre]
+        return futuro.exception() if futuro.done() else None
+
+    def progreso(self):
+        """
+        Fracción de artefactos terminados.
+        """
+        futuros = self._vigentes()
+        return sum(f.done() for f in futuros.values()) / max(len(futuros), 1)
+
+    def estado(self):
+        """
+        Estado y segundos de cálculo de cada artefacto.
+        """
+        return pd.DataFrame(
+            [{"artefacto": nombre, **estado} for nombre, estado in self._estado.items()],
+            columns=["artefacto", "estado", "segundos"]
+        )
+
+    def cancelar(self):
+        """
+        Cancela los artefactos que aún no empezaron.
+        """
+        with self._candado:
+            for nombre, futuro in self._futuros.items():
+                if futuro.cancel():
+                    self._estado[nombre]["estado"] = "cancelado"
+
+    def liberar(self):
+        """
+        Suelta la reserva del dataset (el registro ya puede expulsarlo si
+        ninguna sesión lo usa).
+        """
+        self._reserva.liberar()
+
+
+class Precomputo:
+    """
+    Artefactos por huella de dataset, compartidos por todas las sesiones, con
+    expulsión LRU a partir de `maximo` datasets.
+    """
+
+    def __init__(self, hilos=HILOS, maximo=MAXIMO_DATASETS):
+        self.maximo = maximo
+        self._pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="precomputo")
+        self._artefactos = OrderedDict()
+        self._candado = threading.Lock()
+
+    def artefactos(self, reserva, tareas=None):
+        """
+        `Artefactos` del dataset de `reserva` (una `predial.registro.Reserva`;
+        por `df.attrs["huella"]`). La primera vez se toma otra reserva del
+        dataset para los artefactos y se lanzan sus tareas (por defecto,
+        `tareas_dataset(df)`).
+        """
+        df = reserva.df
+        huella = df.attrs.get("huella")
+        with self._candado:
+            artefactos = self._artefactos.get(huella)
+            if artefactos is None:
+                tareas = tareas if tareas is not None else tareas_dataset(df)
+                artefactos = Artefactos(reserva.copia(), tareas, self._pool)
+                self._artefactos[huella] = artefactos
+            self._artefactos.move_to_end(huella)
+            while len(self._artefactos) > self.maximo:
+                _, expulsados = self._artefactos.popitem(last=False)
+                expulsados.cancelar()
+                expulsados.liberar()
+        return artefactos
@@ -0,0 +1,157 @@
+"""
+Índices de ranking: permutaciones de las filas ordenadas por una columna.
+
+Cada permutación se calcula una vez por dataset (de mayor a menor; los
+empates, en orden de fila). Cualquier subconjunto de filas, dado como máscara,
+se ordena o se corta en top-N filtrando la permutación, sin volver a ordenar.
+Los cuantiles de un subconjunto salen de la misma permutación.
+"""
+
+import numpy as np
+import pandas as pd
+
+COLUMNAS_RANKING = ["valor_impuesto_a_pagar", "saldo", "avaluo_catastral"]
+
+
+def _interpolar(a, b, t):
+    # Interpolación lineal como la de np.quantile (exacta en los extremos)
+    return b - (b - a) * (1 - t) if t >= 0.5 else a + (b - a) * t
+
+
+class IndiceRankings:
+    """
+    Rankings de las columnas de un dataset.
+
+    Las máscaras son arreglos booleanos alineados con `df` (ver `mascara_de`);
+    las posiciones devueltas son posiciones de fila de `df`. El orden es el de
+    un ordenamiento estable con los nulos al final, como en `predial.tablas`.
+    """
+
+    def __init__(self, df, columnas=COLUMNAS_RANKING):
+        self.df = df
+        self._orden = {}
+        self._valores = {}
+        for col in columnas:
+            self.agregar(col, df[col])
+
+    def __contains__(self, columna):
+        return columna in self._orden
+
+    def agregar(self, columna, valores):
+        """
+        Añade (o reemplaza) el ranking de `columna` con los `valores` dados,
+        alineados con `df`. Los nulos quedan al final.
+        """
+        valores = np.asarray(valores, dtype=float)
+        orden = np.argsort(-valores, kind="stable")
+        if len(orden) < np.iinfo(np.int32).max:
+            orden = orden.astype(np.int32)
+        self._orden[columna] = orden
+        self._valores[columna] = valores
+
+    def mascara_de(self, subconjunto):
+        """
+        Máscara de las filas de `df` presentes en `subconjunto` (un DataFrame
+        extraído de `df`, con sus mismas etiquetas), o `None` si es `df`.
+        """
+        if subconjunto is self.df:
+            return None
+        indice = self.df.index
+        if isinstance(indice, pd.RangeIndex) and indice.start == 0 and indice.step == 1:
+            posiciones = subconjunto.index.to_numpy()
+        else:
+            posiciones = indice.get_indexer(subconjunto.index)
+        mascara = np.zeros(len(self.df), dtype=bool)
+        mascara[posiciones] = True
+        return mascara
+
+    def orden(self, columna, mascara=None, ascendente=False):
+        """
+        Posiciones de las filas de la máscara ordenadas por `columna`.
+        """
+        orden = self._orden[columna]
+        if mascara is not None:
+            orden = orden[mascara[orden]]
+        if not ascendente:
+            return orden
+
+        # Ascendente: se invierte la parte no nula y, dentro de cada grupo de
+        # valores iguales, se restituye el orden de fila.
+        valores = self._valores[columna][orden]
+        validos = len(valores) - np.count_nonzero(np.isnan(valores))
+        invertido = orden[:validos][::-1]
+        grupos = np.flatnonzero(np.diff(valores[:validos][::-1])) + 1
+        inicios = np.concatenate([[0], grupos])
+        largos = np.diff(np.concatenate([inicios, [validos]]))
+        i = np.arange(validos)
+        destino = np.repeat(2 * inicios + largos - 1, largos) - i
+        return np.concatenate([invertido[destino], orden[validos:]])
+
+    def top(self, columna, n, mascara=None):
+        """
+        Posiciones de las `n` filas de la máscara con mayor `columna`.
+
+        Se recorre la permutación por bloques crecientes, de modo que un top
+        pequeño solo revisa el comienzo del ranking.
+        """
+        orden = self._orden[columna]
+        if mascara is None:
+            return orden[:n]
+
+        partes, encontradas = [], 0
+        inicio, paso = 0, max(4 * n, 1024)
+        while inicio < len(orden) and encontradas < n:
+            bloque = orden[inicio:inicio + paso]
+            seleccion = bloque[mascara[bloque]]
+            partes.append(seleccion)
+            encontradas += len(seleccion)
+            inicio += paso
+            paso *= 4
+        if not partes:
+            return orden[:0]
+        return np.concatenate(partes)[:n]
+
+    def valores_ordenados(self, columna, mascara=None):
+        """
+        Valores no nulos de `columna` en las filas de la máscara, de mayor a
+        menor.
+        """
+        valores = self._valores[columna][self.orden(columna, mascara)]
+        return valores[~np.isnan(valores)]
+
+    def cuantil(self, columna, q, mascara=None):
+        """
+        Cuantil `q` (0 a 1) de `columna` en las filas de la máscara, con la
+        misma interpolación que `np.quantile`; los nulos se omiten (`NaN` si
+        no hay valores).
+        """
+        # Ascendente: los valores están de mayor a menor
+        valores = self.valores_ordenados(columna, mascara)[::-1]
+        if len(valores) == 0:
+            return np.nan
+        posicion = q * (len(valores) - 1)
+        abajo = int(np.floor(posicion))
+        arriba = min(abajo + 1, len(valores) - 1)
+        if q == 0.5 and len(valores) % 2 == 0:
+            # Mediana par: promedio de los dos centrales, como np.median
+            return (valores[abajo] + valores[arriba]) / 2
+        return _interpolar(valores[abajo], valores[arriba], posicion - abajo)
+
+    def sobre_cuantil(self, columna, q, mascara=None):
+        """
+        Posiciones (de mayor a menor) de las filas de la máscara cuyo valor
+        de `columna` es mayor o igual que su cuantil `q`.
+        """
+        orden = self.orden(columna, mascara)
+        if len(orden) == 0:
+            return orden
+        umbral = self.cuantil(columna, q, mascara)
+        valores = self._valores[columna][orden]
+        # Los valores están en orden descendente: las filas buscadas son un prefijo
+        return orden[:np.searchsorted(-valores, -umbral, side="right")]
+
+    def etiquetas(self, posiciones):
+        """
+        Etiquetas de índice de `df` para unas posiciones.
+        """
+        return self.df.index[posiciones]
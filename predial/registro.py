@@ -0,0 +1,271 @@
+"""
+Registro de datasets compartido por todas las sesiones del proceso.
+
+`st.cache_data` entrega a cada sesión una copia (deserializada) del
+DataFrame: con veinte analistas sobre el mismo archivo municipal el servidor
+guarda veinte copias. El registro guarda un solo DataFrame por clave (la
+huella del archivo) y todas las sesiones reciben el mismo objeto.
+
+Los datos viven en un archivo Arrow IPC mapeado en memoria (`pa.memory_map`),
+junto a las copias Parquet de `predial.ingesta`. Las columnas numéricas y
+`codigo_igac` se leen sin copiar desde el mapa (son de solo lectura); las
+categorías y `cumplimiento` se materializan al leer (1 byte por fila). Las
+páginas del mapa las administra el sistema operativo y, tras una expulsión o
+un reinicio, volver a cargar el dataset solo mapea el archivo.
+
+Cada sesión guarda una `Reserva`; mientras exista, el dataset tiene una
+referencia y no se expulsa. Cuando los datasets residentes superan el
+presupuesto (`PREDIAL_REGISTRO_MB`) se expulsan los menos usados
+recientemente entre los que no tienen referencias.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from predial.ingesta import DIRECTORIO_CACHE
+
+logger = logging.getLogger(__name__)
+
+PRESUPUESTO_MB = float(os.environ.get("PREDIAL_REGISTRO_MB", "2048"))
+
+# Tipos Arrow que se leen como texto Arrow de pandas (sin copiar)
+_TIPOS_TEXTO = {"string", "large_string"}
+
+
+def _columna_arrow(serie):
+    """
+    Columna de Arrow equivalente a `serie`, sin copiar los valores numéricos.
+    Los `NaN` se guardan como valores (no como nulos) para que la lectura
+    no tenga que rellenarlos.
+    """
+    import pyarrow as pa
+
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        codigos = serie.cat.codes.to_numpy()
+        categorias = pa.array(serie.cat.categories.astype(str).to_numpy(dtype=object), type=pa.string())
+        return pa.DictionaryArray.from_arrays(pa.array(codigos, mask=codigos < 0), categorias)
+    if isinstance(serie.dtype, pd.StringDtype) and serie.dtype.storage == "pyarrow":
+        return serie.array._pa_array.combine_chunks()
+    if serie.dtype.kind in "fiub":
+        return pa.array(serie.to_numpy())
+    return pa.array(serie, from_pandas=True)
+
+
+def escribir_mapa(df, ruta):
+    """
+    Guarda `df` como archivo Arrow IPC sin comprimir (apto para mapear). La
+    huella del dataset queda en los metadatos del esquema.
+    """
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+
+    tabla = pa.table({col: _columna_arrow(df[col]) for col in df.columns})
+    tabla = tabla.replace_schema_metadata({"huella": str(df.attrs.get("huella", ""))})
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    with pa.OSFile(str(temporal), "wb") as archivo, ipc.new_file(archivo, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+    os.replace(temporal, ruta)
+
+
+def leer_mapa(ruta):
+    """
+    DataFrame cuyas columnas apuntan al archivo Arrow mapeado en memoria.
+    """
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+
+    tabla = ipc.open_file(pa.memory_map(str(ruta))).read_all()
+    texto = pd.StringDtype("pyarrow")
+    df = tabla.to_pandas(
+        split_blocks=True, types_mapper=lambda tipo: texto if str(tipo) in _TIPOS_TEXTO else None
+    )
+    metadatos = tabla.schema.metadata or {}
+    if metadatos.get(b"huella"):
+        df.attrs["huella"] = metadatos[b"huella"].decode()
+    return df
+
+
+class Reserva:
+    """
+    Referencia de una sesión a un dataset del registro. La referencia se
+    descuenta con `liberar()` o cuando la reserva deja de existir.
+    """
+
+    def __init__(self, registro, clave, df):
+        self.clave = clave
+        self.df = df
+        self._registro = registro
+        self._finalizador = weakref.finalize(self, registro._liberar, clave)
+
+    def copia(self):
+        """
+        Otra reserva del mismo dataset, con su propia referencia.
+        """
+        return self._registro._referenciar(self.clave, self.df)
+
+    def liberar(self):
+        self._finalizador()
+
+
+class RegistroDatasets:
+    """
+    Datasets residentes por clave, con conteo de referencias y expulsión LRU
+    bajo un presupuesto de memoria (en MB).
+    """
+
+    def __init__(self, presupuesto_mb=PRESUPUESTO_MB, directorio=None):
+        self.presupuesto_mb = presupuesto_mb
+        self.directorio = Path(directorio or DIRECTORIO_CACHE)
+        self._datasets = OrderedDict()
+        # Reentrante: una reserva puede finalizarse (y descontarse) dentro de una sección con el candado
+        self._candado = threading.RLock()
+        # Un candado por clave mientras alguna sesión la pide: si varias piden el mismo
+        # dataset, solo una lo carga. Se descarta cuando ya nadie lo usa.
+        self._cargando = {}
+
+    def ruta_mapa(self, clave):
+        """
+        Archivo Arrow del dataset de una clave.
+        """
+        return self.directorio / f"{hashlib.sha256(str(clave).encode()).hexdigest()}.arrow"
+
+    def reservar(self, clave, cargar, nombre=None):
+        """
+        `Reserva` del dataset de `clave`. Si no está residente se mapea su
+        archivo Arrow o, si no existe, se obtiene con `cargar()` (sin
+        argumentos) y se guarda como archivo Arrow. `nombre` identifica el
+        dataset en `residentes()`.
+        """
+        with self._candado:
+            cargando = self._cargando.setdefault(clave, {"candado": threading.Lock(), "usuarios": 0})
+            cargando["usuarios"] += 1
+        try:
+            with cargando["candado"]:
+                with self._candado:
+                    entrada = self._datasets.get(clave)
+                if entrada is None:
+                    entrada = self._cargar(clave, cargar)
+                    entrada["nombre"] = nombre or str(clave)[:16]
+                with self._candado:
+                    self._datasets[clave] = entrada
+                    self._datasets.move_to_end(clave)
+                    entrada["referencias"] += 1
+                    entrada["reservas"] += 1
+                    entrada["ultimo_uso"] = time.time()
+                    reserva = Reserva(self, clave, entrada["df"])
+                    self._ajustar()
+        finally:
+            with self._candado:
+                cargando["usuarios"] -= 1
+                if cargando["usuarios"] == 0:
+                    del self._cargando[clave]
+        return reserva
+
+    def _cargar(self, clave, cargar):
+        ruta = self.ruta_mapa(clave)
+        df, mapeado = None, False
+        if ruta.exists():
+            try:
+                df, mapeado = leer_mapa(ruta), True
+            except Exception:
+                # Archivo incompleto o de otra versión: se regenera
+                ruta.unlink(missing_ok=True)
+
+        if df is None:
+            df = cargar()
+            try:
+                escribir_mapa(df, ruta)
+                df, mapeado = leer_mapa(ruta), True
+            except Exception:
+                # Sin disco disponible el dataset queda en memoria del proceso
+                logger.exception("No se pudo mapear el dataset %s; se conserva en memoria", clave)
+
+        return {
+            "df": df,
+            "mapeado": mapeado,
+            "bytes": int(df.memory_usage(index=False).sum()),
+            "referencias": 0,
+            "reservas": 0,
+            "cargado": time.time(),
+            "ultimo_uso": time.time(),
+        }
+
+    def _referenciar(self, clave, df):
+        with self._candado:
+            entrada = self._datasets.get(clave)
+            if entrada is None or entrada["df"] is not df:
+                raise KeyError(f"El dataset {clave} ya no está en el registro")
+            entrada["referencias"] += 1
+            entrada["ultimo_uso"] = time.time()
+            return Reserva(self, clave, df)
+
+    def _liberar(self, clave):
+        with self._candado:
+            entrada = self._datasets.get(clave)
+            if entrada is not None:
+                entrada["referencias"] -= 1
+                entrada["ultimo_uso"] = time.time()
+                self._ajustar()
+
+    def _ajustar(self):
+        # Expulsa los datasets sin referencias menos usados hasta entrar en el presupuesto
+        total = sum(e["bytes"] for e in self._datasets.values())
+        for clave in list(self._datasets):
+            if total <= self.presupuesto_mb * 2**20:
+                break
+            entrada = self._datasets[clave]
+            if entrada["referencias"] == 0:
+                del self._datasets[clave]
+                total -= entrada["bytes"]
+                logger.info("Dataset %s expulsado del registro (%.1f MB)", clave, entrada["bytes"] / 2**20)
+
+    def expulsar_sin_uso(self):
+        """
+        Expulsa todos los datasets sin referencias; devuelve cuántos.
+        """
+        with self._candado:
+            claves = [c for c, e in self._datasets.items() if e["referencias"] == 0]
+            for clave in claves:
+                del self._datasets[clave]
+        return len(claves)
+
+    def residentes(self):
+        """
+        Datasets residentes, del más al menos usado recientemente.
+        """
+        with self._candado:
+            filas = [
+                {
+                    "dataset": e["nombre"],
+                    "filas": len(e["df"]),
+                    "mb": e["bytes"] / 2**20,
+                    "referencias": e["referencias"],
+                    "reservas": e["reservas"],
+                    "mapeado": e["mapeado"],
+                    "cargado": datetime.fromtimestamp(e["cargado"]).strftime("%Y-%m-%d %H:%M:%S"),
+                    "ultimo_uso": datetime.fromtimestamp(e["ultimo_uso"]).strftime("%Y-%m-%d %H:%M:%S"),
+                }
+                for e in reversed(self._datasets.values())
+            ]
+        columnas = ["dataset", "filas", "mb", "referencias", "reservas", "mapeado", "cargado", "ultimo_uso"]
+        return pd.DataFrame(filas, columns=columnas)
+
+    def memoria_mb(self):
+        """
+        Tamaño total de los datasets residentes, en MB.
+        """
+        with self._candado:
+            return sum(e["bytes"] for e in self._datasets.values()) / 2**20
+
+
+registro = RegistroDatasets()
@@ -0,0 +1,173 @@
+"""
+Modelo de riesgo tributario: puntajes fiscal, catastral y comportamental.
+
+Cada componente toma valores 1, 3 o 5 (el fiscal, de 1 a `grupos_fiscales`)
+y se calcula con operaciones NumPy sobre columnas completas. El riesgo total
+es la suma ponderada de los tres componentes. `MotorRiesgo` guarda los
+componentes por umbrales, de modo que un cambio solo de pesos recombina los
+componentes ya calculados en lugar de recalcularlos.
+"""
+
+from dataclasses import dataclass, replace
+
+import numpy as np
+import pandas as pd
+
+PUNTAJE_ALTO = 5
+PUNTAJE_MEDIO = 3
+PUNTAJE_BAJO = 1
+
+COMPONENTES = ["riesgo_fiscal", "riesgo_catastral", "riesgo_comportamental"]
+
+
+@dataclass(frozen=True)
+class ConfigRiesgo:
+    """
+    Pesos y umbrales del modelo de riesgo.
+
+    - `grupos_fiscales`: grupos de igual tamaño en que se divide el valor del
+      impuesto (riesgo fiscal 1..n).
+    - `cuantil_area_baja` / `cuantil_avaluo_alto`: un predio con área
+      construida bajo el primer cuantil y avalúo sobre el segundo tiene riesgo
+      catastral medio; sin construcción y avalúo sobre la mediana, alto.
+    """
+    peso_fiscal: float = 0.5
+    peso_catastral: float = 0.3
+    peso_comportamental: float = 0.2
+    grupos_fiscales: int = 5
+    cuantil_area_baja: float = 0.2
+    cuantil_avaluo_alto: float = 0.6
+
+    def sin_pesos(self):
+        """
+        Configuración con los pesos por defecto: identifica los componentes,
+        que no dependen de los pesos.
+        """
+        return replace(
+            self,
+            peso_fiscal=ConfigRiesgo.peso_fiscal,
+            peso_catastral=ConfigRiesgo.peso_catastral,
+            peso_comportamental=ConfigRiesgo.peso_comportamental,
+        )
+
+
+def _texto_minusculas(serie):
+    """
+    Valores de una columna de texto (o categórica) en minúsculas, como
+    arreglo; los nulos quedan como 'nan'. Se pasa a minúsculas cada valor
+    distinto una sola vez.
+    """
+    codigos, unicos = pd.factorize(serie)
+    # El código -1 (nulo) toma el último elemento
+    return np.asarray([str(u).lower() for u in unicos] + ["nan"], dtype=object)[codigos]
+
+
+def riesgo_fiscal(impuesto, grupos=5):
+    """
+    Grupo (1..`grupos`) de cada predio según su valor de impuesto, en grupos
+    de igual tamaño; los empates se reparten por orden de aparición.
+    """
+    n = len(impuesto)
+    if n == 0 or impuesto.min() == impuesto.max():
+        return np.full(n, PUNTAJE_BAJO, dtype=np.int8)
+
+    rango = np.empty(n, dtype=float)
+    rango[np.argsort(impuesto, kind="stable")] = np.arange(1, n + 1)
+    # Cortes entre grupos sobre los rangos 1..n (interpolación lineal, como pd.qcut)
+    cortes = 1 + np.arange(1, grupos) / grupos * (n - 1)
+    return (np.searchsorted(cortes, rango, side="left") + 1).astype(np.int8)
+
+
+def riesgo_catastral(avaluo, area, cuantil_area_baja=0.2, cuantil_avaluo_alto=0.6):
+    """
+    Riesgo alto para predios sin construcción con avalúo sobre la mediana y
+    medio para área construida baja con avalúo alto.
+    """
+    puntaje = np.full(len(avaluo), PUNTAJE_BAJO, dtype=np.int8)
+    if len(avaluo) == 0:
+        return puntaje
+
+    mediana_avaluo, avaluo_alto = np.quantile(avaluo, [0.5, cuantil_avaluo_alto])
+    area_baja = np.quantile(area, cuantil_area_baja)
+
+    puntaje[(area == 0) & (avaluo > mediana_avaluo)] = PUNTAJE_ALTO
+    puntaje[(area < area_baja) & (avaluo > avaluo_alto)] = PUNTAJE_MEDIO
+    return puntaje
+
+
+def riesgo_comportamental(cumplimiento, financiacion):
+    """
+    Riesgo alto para morosos sin financiación y medio para morosos con
+    financiación. `financiacion` debe venir en minúsculas.
+    """
+    puntaje = np.full(len(cumplimiento), PUNTAJE_BAJO, dtype=np.int8)
+    morosos = ~cumplimiento
+    puntaje[morosos & (financiacion == 'no')] = PUNTAJE_ALTO
+    puntaje[morosos & (financiacion == 'si')] = PUNTAJE_MEDIO
+    return puntaje
+
+
+def componentes_riesgo(df, config=ConfigRiesgo()):
+    """
+    Componentes de riesgo de cada predio (DataFrame alineado con `df`).
+    """
+    componentes = {
+        "riesgo_fiscal": riesgo_fiscal(
+            df['valor_impuesto_a_pagar'].to_numpy(dtype=float), config.grupos_fiscales
+        ),
+        "riesgo_catastral": riesgo_catastral(
+            df['avaluo_catastral'].to_numpy(dtype=float),
+            df['area_construida'].to_numpy(dtype=float),
+            config.cuantil_area_baja, config.cuantil_avaluo_alto,
+        ),
+        "riesgo_comportamental": riesgo_comportamental(
+            df['cumplimiento'].to_numpy(dtype=bool),
+            _texto_minusculas(df['financiacion_impuesto_predial']),
+        ),
+    }
+    return pd.DataFrame(componentes, index=df.index)
+
+
+def combinar_riesgo(componentes, config=ConfigRiesgo()):
+    """
+    Riesgo total: suma ponderada de los componentes.
+    """
+    total = (
+        config.peso_fiscal * componentes['riesgo_fiscal'].to_numpy(dtype=float) +
+        config.peso_catastral * componentes['riesgo_catastral'].to_numpy(dtype=float) +
+        config.peso_comportamental * componentes['riesgo_comportamental'].to_numpy(dtype=float)
+    )
+    return pd.Series(total, index=componentes.index, name="riesgo_total")
+
+
+def puntuar(df, config=ConfigRiesgo()):
+    """
+    Componentes y riesgo total de cada predio, en una sola pasada.
+    """
+    puntajes = componentes_riesgo(df, config)
+    puntajes["riesgo_total"] = combinar_riesgo(puntajes, config)
+    return puntajes
+
+
+class MotorRiesgo:
+    """
+    Puntajes de riesgo de un conjunto de predios con los componentes en caché.
+
+    Los componentes se guardan por umbrales (`ConfigRiesgo.sin_pesos`); si
+    solo cambian los pesos, el riesgo total se recombina sin recalcularlos.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self._componentes = {}
+
+    def componentes(self, config=ConfigRiesgo()):
+        clave = config.sin_pesos()
+        if clave not in self._componentes:
+            self._componentes[clave] = componentes_riesgo(self.df, config)
+        return self._componentes[clave]
+
+    def puntuar(self, config=ConfigRiesgo()):
+        puntajes = self.componentes(config).copy()
+        puntajes["riesgo_total"] = combinar_riesgo(puntajes, config)
+        return puntajes
@@ -0,0 +1,228 @@
+"""
+Simulación Monte Carlo del recaudo de la cartera morosa.
+
+Cada predio moroso recibe una probabilidad de pago con un modelo logístico
+sobre datos que ya están en el dataset: componentes de riesgo, financiación,
+sector y monto en mora. Luego se simulan miles de escenarios en los que cada
+moroso paga (todo su monto) o no, de forma independiente, y se resumen los
+recaudos por sector y vereda con sus percentiles P10/P50/P90.
+
+Simular cada predio en cada escenario no es viable con un millón de predios,
+de modo que los morosos se agrupan por sector y vereda y en cada grupo:
+
+- los `exactos` predios de mayor monto (todos, si el grupo es pequeño) se
+  simulan uno a uno con sorteos de Bernoulli: son los que pueden dominar la
+  distribución;
+- el resto se resume con su aproximación normal (suma de muchos términos
+  pequeños e independientes), con media `Σ p·m` y varianza `Σ p(1-p)·m²`.
+
+Los escenarios se generan por lotes con semillas derivadas de `semilla`, de
+modo que el resultado no depende de si los lotes se reparten en procesos.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from predial.riesgo import COMPONENTES, ConfigRiesgo, componentes_riesgo
+
+PERCENTILES = [10, 50, 90]
+
+# Predios simulados uno a uno en cada grupo de sector y vereda
+EXACTOS_POR_GRUPO = 64
+
+# Escenarios por lote (acota la memoria de los sorteos)
+LOTE_SIMULACIONES = 2000
+
+# Procesos para repartir los lotes (0: en el proceso actual)
+PROCESOS = int(os.environ.get("PREDIAL_SIMULACION_PROCESOS", "0"))
+
+SIN_DATO = "(sin dato)"
+
+
+@dataclass(frozen=True)
+class ConfigSimulacion:
+    """
+    Coeficientes del modelo logístico de pago y tamaño de la simulación.
+
+    El logit de la probabilidad de pago es `intercepto` más cada coeficiente
+    por su variable: los puntajes de riesgo (1 a 5), `financiacion` (1 si el
+    predio tiene financiación), `rural` (1 si el sector es rural) y `monto`
+    (logaritmo del monto en mora sobre su mediana).
+    """
+    intercepto: float = 1.0
+    coef_fiscal: float = -0.15
+    coef_catastral: float = -0.10
+    coef_comportamental: float = -0.35
+    coef_financiacion: float = 0.8
+    coef_rural: float = -0.3
+    coef_monto: float = -0.25
+    simulaciones: int = 20_000
+    semilla: int = 0
+
+
+def _es_alguno(serie, valores):
+    """
+    Máscara de las filas cuyo texto en minúsculas está en `valores` (se
+    compara cada valor distinto una sola vez).
+    """
+    codigos, unicos = pd.factorize(serie)
+    coinciden = np.array([str(u).lower() in valores for u in unicos] + [False])
+    return coinciden[codigos]
+
+
+def probabilidades_pago(df, config=ConfigSimulacion(), componentes=None, columna_monto="valor_impuesto_a_pagar"):
+    """
+    Probabilidad de pago de cada predio de `df` (arreglo). `componentes` son
+    los componentes de riesgo de `df` (por defecto se calculan con
+    `ConfigRiesgo()`).
+    """
+    if componentes is None:
+        componentes = componentes_riesgo(df, ConfigRiesgo())
+    monto = df[columna_monto].to_numpy(dtype=float)
+    positivos = monto[monto > 0]
+    mediana = np.median(positivos) if len(positivos) else 1.0
+
+    logit = (
+        config.intercepto
+        + config.coef_fiscal * componentes["riesgo_fiscal"].to_numpy(dtype=float)
+        + config.coef_catastral * componentes["riesgo_catastral"].to_numpy(dtype=float)
+        + config.coef_comportamental * componentes["riesgo_comportamental"].to_numpy(dtype=float)
+        + config.coef_financiacion * _es_alguno(df["financiacion_impuesto_predial"], {"si", "sí"})
+        + config.coef_rural * _es_alguno(df["sector"], {"rural"})
+        + config.coef_monto * np.log(np.maximum(monto, 1.0) / mediana)
+    )
+    return 1 / (1 + np.exp(-logit))
+
+
+def _grupos(df):
+    """
+    Código de grupo (sector, vereda) de cada fila y etiquetas de los grupos.
+    """
+    codigos_sector, sectores = pd.factorize(df["sector"])
+    codigos_vereda, veredas = pd.factorize(df["vereda"])
+    # Los nulos (código -1) toman la última etiqueta, SIN_DATO
+    sectores = np.asarray([str(s) for s in sectores] + [SIN_DATO], dtype=object)
+    veredas = np.asarray([str(v) for v in veredas] + [SIN_DATO], dtype=object)
+    codigos_sector = np.where(codigos_sector < 0, len(sectores) - 1, codigos_sector)
+    codigos_vereda = np.where(codigos_vereda < 0, len(veredas) - 1, codigos_vereda)
+
+    grupo, unicos = pd.factorize(codigos_sector.astype(np.int64) * len(veredas) + codigos_vereda, sort=True)
+    s, v = np.divmod(unicos, len(veredas))
+    etiquetas = pd.DataFrame({"sector": sectores[s], "vereda": veredas[v]})
+    return grupo, etiquetas
+
+
+def _simular_lote(p_exactos, m_exactos, inicios, media, desviacion, maximo, n, semilla):
+    """
+    `n` escenarios de recaudo por grupo (matriz `n × grupos`).
+    """
+    rng = np.random.default_rng(semilla)
+    grupos = len(media)
+    recaudo = np.clip(rng.normal(media, desviacion, (n, grupos)), 0, maximo)
+    if len(p_exactos):
+        pagos = (rng.random((n, len(p_exactos))) < p_exactos) * m_exactos
+        # Suma por grupo de los predios exactos (ordenados por grupo)
+        con_exactos = np.flatnonzero(np.diff(np.append(inicios, len(p_exactos))) > 0)
+        recaudo[:, con_exactos] += np.add.reduceat(pagos, inicios[con_exactos], axis=1)
+    return recaudo
+
+
+def _resumen(escenarios, esperado, etiquetas, predios, mora):
+    """
+    Recaudo esperado y percentiles de cada columna de `escenarios`.
+    """
+    percentiles = np.percentile(escenarios, PERCENTILES, axis=0) if len(escenarios) else np.full((len(PERCENTILES), len(esperado)), np.nan)
+    tabla = pd.DataFrame({"predios": predios, "mora": mora, "esperado": esperado}, index=etiquetas)
+    for p, valores in zip(PERCENTILES, percentiles):
+        tabla[f"p{p}"] = valores
+    return tabla
+
+
+def simular_recaudo(df, config=ConfigSimulacion(), componentes=None, procesos=PROCESOS,
+                    exactos=EXACTOS_POR_GRUPO, lote=LOTE_SIMULACIONES, columna_monto="valor_impuesto_a_pagar"):
+    """
+    Simula el recaudo de los morosos de `df` y devuelve un dict con:
+
+    - `predios`: los morosos con `probabilidad_pago` y `aporte_esperado`
+      (probabilidad por monto), en el orden de `df`;
+    - `total`: recaudo esperado y percentiles del total (dict);
+    - `por_sector` / `por_vereda`: predios, mora, recaudo esperado y
+      percentiles por grupo (DataFrames);
+    - `escenarios_total`: recaudo total de cada escenario (para histogramas).
+
+    `componentes` son los componentes de riesgo de `df` (p. ej. de un
+    `MotorRiesgo`); con `procesos` > 1 los lotes se reparten en un pool.
+    """
+    morosos_mascara = ~df["cumplimiento"].to_numpy(dtype=bool)
+    if componentes is None:
+        componentes = componentes_riesgo(df, ConfigRiesgo())
+    morosos = df[morosos_mascara]
+    probabilidad = probabilidades_pago(morosos, config, componentes[COMPONENTES][morosos_mascara], columna_monto)
+    monto = np.maximum(morosos[columna_monto].to_numpy(dtype=float), 0)
+
+    # Copia superficial: solo se añaden las dos columnas
+    predios = morosos.copy(deep=False)
+    predios["probabilidad_pago"] = probabilidad
+    predios["aporte_esperado"] = probabilidad * monto
+
+    grupo, etiquetas = _grupos(morosos)
+    n_grupos = len(etiquetas)
+
+    # Dentro de cada grupo, los `exactos` predios de mayor monto se simulan uno a uno
+    orden = np.lexsort((-monto, grupo))
+    inicios_grupo = np.searchsorted(grupo[orden], np.arange(n_grupos))
+    rango = np.arange(len(orden)) - inicios_grupo[grupo[orden]]
+    exacto = np.zeros(len(orden), dtype=bool)
+    exacto[orden[rango < exactos]] = True
+
+    indices_exactos = orden[exacto[orden]]
+    p_exactos = probabilidad[indices_exactos]
+    m_exactos = monto[indices_exactos]
+    inicios = np.searchsorted(grupo[indices_exactos], np.arange(n_grupos))
+
+    resto = ~exacto
+    pm = probabilidad * monto
+    media = np.bincount(grupo[resto], pm[resto], minlength=n_grupos)
+    desviacion = np.sqrt(np.bincount(grupo[resto], (pm * (1 - probabilidad) * monto)[resto], minlength=n_grupos))
+    maximo = np.bincount(grupo[resto], monto[resto], minlength=n_grupos)
+
+    tamanos = [min(lote, config.simulaciones - i) for i in range(0, config.simulaciones, lote)]
+    semillas = np.random.SeedSequence(config.semilla).spawn(len(tamanos))
+    argumentos = [(p_exactos, m_exactos, inicios, media, desviacion, maximo, n, s) for n, s in zip(tamanos, semillas)]
+    if procesos and procesos > 1 and len(tamanos) > 1:
+        with ProcessPoolExecutor(max_workers=min(procesos, len(tamanos))) as pool:
+            partes = list(pool.map(_simular_lote, *zip(*argumentos)))
+    else:
+        partes = [_simular_lote(*a) for a in argumentos]
+    escenarios = np.concatenate(partes) if partes else np.zeros((0, n_grupos))
+
+    esperado = np.bincount(grupo, pm, minlength=n_grupos)
+    predios_grupo = np.bincount(grupo, minlength=n_grupos)
+    mora_grupo = np.bincount(grupo, monto, minlength=n_grupos)
+
+    def agregar(columna):
+        # Suma de los escenarios de los grupos con la misma etiqueta
+        codigos, nombres = pd.factorize(etiquetas[columna], sort=True)
+        indicador = np.zeros((n_grupos, len(nombres)))
+        indicador[np.arange(n_grupos), codigos] = 1
+        return _resumen(
+            escenarios @ indicador, esperado @ indicador, pd.Index(nombres, name=columna),
+            (predios_grupo @ indicador).astype(int), mora_grupo @ indicador
+        )
+
+    escenarios_total = escenarios.sum(axis=1)
+    total = {"predios": len(morosos), "mora": monto.sum(), "esperado": pm.sum()}
+    for p, valor in zip(PERCENTILES, np.percentile(escenarios_total, PERCENTILES) if len(escenarios_total) else [np.nan] * len(PERCENTILES)):
+        total[f"p{p}"] = valor
+
+    return {
+        "predios": predios,
+        "total": total,
+        "por_sector": agregar("sector"),
+        "por_vereda": agregar("vereda"),
+        "escenarios_total": escenarios_total,
+    }
@@ -0,0 +1,78 @@
+"""
+Paginación de tablas en el servidor.
+
+En lugar de enviar todas las filas (formateadas con `DataFrame.style`) al
+navegador, se ordena y se corta en el servidor y solo la página visible se
+formatea y se envía. Para las primeras páginas de un orden numérico se usa
+`argpartition`, sin ordenar toda la columna; si la columna tiene un ranking
+precalculado (`predial.rankings`), la página sale de él sin ordenar.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+TAMANOS_PAGINA = [25, 50, 100, 250]
+
+
+def total_paginas(n, tamano):
+    """
+    Número de páginas para `n` filas (al menos una).
+    """
+    return max(1, math.ceil(n / tamano))
+
+
+def _orden_texto(serie, ascendente):
+    # Orden estable de una columna no numérica; los nulos quedan al final
+    codigos, _ = pd.factorize(serie, sort=True)
+    clave = np.where(codigos < 0, np.iinfo(np.int64).max, codigos if ascendente else -codigos)
+    return np.argsort(clave, kind="stable")
+
+
+def posiciones_pagina(df, orden=None, ascendente=True, numero=1, tamano=50, ranking=None):
+    """
+    Posiciones de fila de la página `numero` (desde 1) de `df` ordenado por la
+    columna `orden` (o en su orden actual si es `None`).
+
+    `ranking` es un `IndiceRankings` del dataset del que se extrajo `df`; se
+    usa si tiene la columna `orden`.
+    """
+    n = len(df)
+    inicio = min((numero - 1) * tamano, n)
+    fin = min(inicio + tamano, n)
+
+    if orden is None:
+        return np.arange(inicio, fin)
+
+    if ranking is not None and orden in ranking:
+        ordenadas = ranking.orden(orden, ranking.mascara_de(df), ascendente)
+        return df.index.get_indexer(ranking.etiquetas(ordenadas[inicio:fin]))
+
+    serie = df[orden]
+    if not pd.api.types.is_numeric_dtype(serie) or pd.api.types.is_bool_dtype(serie):
+        return _orden_texto(serie, ascendente)[inicio:fin]
+
+    valores = serie.to_numpy(dtype=float)
+    # Los nulos quedan al final en ambos sentidos
+    clave = np.where(np.isnan(valores), np.inf, valores if ascendente else -valores)
+    if 0 < fin < n:
+        # Solo las primeras `fin` filas del orden, sin ordenar el resto. En el
+        # valor de corte se toman las primeras posiciones, como un orden estable.
+        corte = np.partition(clave, fin - 1)[fin - 1]
+        menores = np.flatnonzero(clave < corte)
+        iguales = np.flatnonzero(clave == corte)[:fin - len(menores)]
+        candidatas = np.sort(np.concatenate([menores, iguales]))
+        primeras = candidatas[np.argsort(clave[candidatas], kind="stable")]
+    else:
+        primeras = np.argsort(clave, kind="stable")
+    return primeras[inicio:fin]
+
+
+def pagina(df, columnas, orden=None, ascendente=True, numero=1, tamano=50, ranking=None):
+    """
+    Página de `df` (solo `columnas`) con índice reiniciado.
+    """
+    posiciones = posiciones_pagina(df, orden, ascendente, numero, tamano, ranking)
+    # Se corta antes de elegir las columnas: solo se copian las filas de la página
+    return df.iloc[posiciones][columnas].reset_index(drop=True)
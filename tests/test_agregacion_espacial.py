@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from predial.agregacion_espacial import IndiceEspacial, tamano_celda
+
+
+def _dataset(n=300, semilla=0):
+    rng = np.random.default_rng(semilla)
+    lat = 4.85 + rng.random(n) * 0.1
+    lon = -74.15 + rng.random(n) * 0.1
+    lat[:5] = np.nan
+    return pd.DataFrame({"latitud": lat, "longitud": lon, "saldo": rng.random(n) * 100})
+
+
+def test_agregar_igual_que_agrupar_por_celda():
+    df = _dataset()
+    indice = IndiceEspacial(df)
+    posiciones = np.flatnonzero(df["saldo"].to_numpy() > 30)
+    nivel = 4
+
+    celdas = indice.agregar(posiciones, nivel, sumas={"saldo": df["saldo"].to_numpy()[posiciones]})
+
+    sub = df.iloc[posiciones].dropna(subset=["latitud", "longitud"])
+    tamano = tamano_celda(nivel)
+    celda = [np.floor(sub["longitud"] / tamano).rename("x"), np.floor(sub["latitud"] / tamano).rename("y")]
+    esperado = sub.groupby(celda).agg(
+        latitud=("latitud", "mean"), longitud=("longitud", "mean"), predios=("saldo", "size"), saldo=("saldo", "sum"),
+    )
+    obtenido = celdas.sort_values(["latitud", "longitud"]).reset_index(drop=True)
+    esperado = esperado.sort_values(["latitud", "longitud"]).reset_index(drop=True)
+    pd.testing.assert_frame_equal(obtenido, esperado, check_dtype=False)
+
+
+def test_posiciones_de_subconjunto_con_etiquetas_no_contiguas():
+    df = _dataset().set_axis(np.arange(300) * 7 + 3)
+    indice = IndiceEspacial(df)
+    subconjunto = df[df["saldo"] > 50].iloc[::-1]
+
+    posiciones = indice.posiciones_de(subconjunto)
+
+    np.testing.assert_array_equal(df.index[posiciones], subconjunto.index)
+
+
+def test_dentro_de_limites():
+    df = _dataset()
+    indice = IndiceEspacial(df)
+    limites = ((4.87, -74.13), (4.9, -74.1))
+    posiciones = np.arange(len(df))
+
+    mascara = indice.dentro_de(posiciones, limites)
+
+    esperado = df["latitud"].between(4.87, 4.9) & df["longitud"].between(-74.13, -74.1)
+    np.testing.assert_array_equal(mascara, esperado.to_numpy())
@@ -0,0 +1,42 @@
+import sqlite3
+
+from benchmarks.generador import generar
+from predial.almacen import Almacen
+from predial.ingesta import preprocesar
+
+
+def _dataset(filas=300, semilla=0, huella="archivo"):
+    df = preprocesar(generar(filas, semilla))
+    df.attrs["huella"] = huella
+    return df
+
+
+def test_filtro_sin_mayusculas_con_tildes_coincide_con_pandas(tmp_path):
+    almacen = Almacen(tmp_path / "almacen.sqlite")
+    df = _dataset()
+    almacen.integrar(df, 2024)
+
+    esperados = (df["propiedad_horizontal"].astype(str).str.lower() == "sí").sum()
+    for valor in ["Sí", "SÍ", "sí"]:
+        assert len(almacen.consultar(2024, {"propiedad_horizontal": valor})) == esperados
+    assert almacen.mora_por_vigencia({"propiedad_horizontal": "SÍ"})["predios"].tolist() == [esperados]
+
+
+def test_migracion_normaliza_y_conserva_las_huellas(tmp_path):
+    ruta = tmp_path / "almacen.sqlite"
+    df = _dataset()
+    Almacen(ruta).integrar(df, 2024)
+
+    # Almacén de la versión anterior: valores con mayúsculas, huellas de otro cálculo y sin versión de esquema
+    with sqlite3.connect(ruta) as conexion:
+        conexion.execute("UPDATE predios SET propiedad_horizontal = 'Sí', huella_fila = 0 WHERE propiedad_horizontal = 'sí'")
+        conexion.execute("PRAGMA user_version = 0")
+
+    almacen = Almacen(ruta)
+    assert almacen.opciones(2024)["propiedad_horizontal"] == ["no", "sí"]
+
+    # El mismo contenido con otra huella de archivo no marca predios como modificados
+    df.attrs["huella"] = "otro archivo"
+    resultado = almacen.integrar(df, 2024)
+    assert resultado["modificados"] == 0
+    assert resultado["nuevos"] == 0
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from predial.cubo import CuboAgregado
+from predial.filtros import MotorFiltros
+
+
+def _dataset():
+    return pd.DataFrame({
+        "sector": ["Urbano", "Urbano", "Rural", "Rural"],
+        "sector_urbano": ["Centro", "Nogales", None, None],
+        "vereda": [None, None, "El Salitre", "La Balsa"],
+        "destino_economico_predio": ["Habitacional", "Comercial", "Agropecuario", "Lote"],
+        "propiedad_horizontal": ["Sí", "No", "No", "No"],
+        "cumplimiento": [True, False, False, True],
+        "avaluo_catastral": [100.0, 200.0, 300.0, 400.0],
+        "valor_impuesto_a_pagar": [10.0, 20.0, 30.0, 40.0],
+        "recaudo_predial": [10.0, 0.0, 0.0, 40.0],
+        "descuentos_impuesto_predial": [0.0, 0.0, 0.0, 0.0],
+        "saldo": [0.0, 20.0, 30.0, 0.0],
+    })
+
+
+def test_kpis_coinciden_con_los_datos_filtrados():
+    cubo = CuboAgregado(MotorFiltros(_dataset()))
+
+    kpis = cubo.kpis({"sector": "Rural"})
+
+    assert kpis["predios"] == 2
+    assert kpis["morosos"] == 1
+    assert kpis["valor_mora"] == 30.0
+
+
+def test_valor_inexistente_no_selecciona_las_celdas_nulas():
+    cubo = CuboAgregado(MotorFiltros(_dataset()))
+
+    # Los predios urbanos no tienen vereda: sus celdas tienen el código de los nulos (-1)
+    mascara = cubo.mascara({"vereda": "Vereda que no existe"})
+    kpis = cubo.kpis({"vereda": "Vereda que no existe"})
+
+    assert not mascara.any()
+    assert kpis["predios"] == 0
+    assert kpis["valor_mora"] == 0
+    assert kpis["tasa_cumplimiento"] is None
+    assert np.all(cubo.resumen({"sector_urbano": "Otro"}).loc["Número de predios"] == 0)
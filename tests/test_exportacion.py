@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from predial.exportacion import MAXIMO_FILAS_XLSX, Exportador, exportar
+
+
+def _dataset(n=130):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "codigo_igac": pd.array([f"2578500{i:06d}" for i in range(n)], dtype="string[pyarrow]"),
+        "vereda": pd.Categorical(rng.choice(["El Salitre", "Río Frío", None], n)),
+        "saldo": rng.integers(0, 10**6, n).astype(float),
+        "cumplimiento": rng.random(n) < 0.5,
+    })
+    df.loc[3, "saldo"] = np.nan
+    return df
+
+
+def _leer(formato, ruta):
+    if formato == "CSV":
+        return pd.read_csv(ruta, encoding="utf-8-sig", dtype={"codigo_igac": str})
+    if formato == "XLSX":
+        return pd.read_excel(ruta, dtype={"codigo_igac": str})
+    return pd.read_parquet(ruta)
+
+
+def _comparable(df):
+    # Tipos que sobreviven a cualquiera de los tres formatos
+    df = df.astype({"codigo_igac": str, "vereda": object, "saldo": float, "cumplimiento": bool}).reset_index(drop=True)
+    df["vereda"] = df["vereda"].where(df["vereda"].notna(), None)
+    return df
+
+
+@pytest.mark.parametrize("formato, extension", [("CSV", ".csv"), ("XLSX", ".xlsx"), ("Parquet", ".parquet")])
+def test_exportar_ida_y_vuelta_en_bloques_y_en_orden(tmp_path, formato, extension):
+    df = _dataset()
+    posiciones = np.argsort(-df["saldo"].fillna(-1).to_numpy(), kind="stable")
+    columnas = ["codigo_igac", "vereda", "saldo", "cumplimiento"]
+    ruta = tmp_path / f"tabla{extension}"
+
+    exportar(df, formato, ruta, columnas, posiciones, filas=40)
+
+    leido = _leer(formato, ruta)
+    pd.testing.assert_frame_equal(_comparable(leido), _comparable(df.iloc[posiciones][columnas]))
+
+
+@pytest.mark.parametrize("formato, extension", [("CSV", ".csv"), ("XLSX", ".xlsx"), ("Parquet", ".parquet")])
+def test_exportar_tabla_vacia_conserva_el_encabezado(tmp_path, formato, extension):
+    df = _dataset().iloc[:0]
+    ruta = tmp_path / f"vacia{extension}"
+
+    exportar(df, formato, ruta, ["codigo_igac", "saldo"])
+
+    leido = _leer(formato, ruta)
+    assert list(leido.columns) == ["codigo_igac", "saldo"]
+    assert len(leido) == 0
+
+
+def test_xlsx_rechaza_mas_filas_que_una_hoja(tmp_path):
+    df = _dataset(3)
+
+    with pytest.raises(ValueError):
+        exportar(df, "XLSX", tmp_path / "grande.xlsx", posiciones=np.zeros(MAXIMO_FILAS_XLSX + 1, dtype=int))
+
+
+def test_exportador_conserva_los_ultimos_archivos(tmp_path):
+    exportador = Exportador(directorio=tmp_path, maximo=2)
+    df = _dataset()
+
+    rutas = []
+    for _ in range(4):
+        rutas.append(exportador.iniciar(df, "CSV", ["codigo_igac"], posiciones=lambda: np.arange(10)).result())
+
+    assert len(pd.read_csv(rutas[-1], encoding="utf-8-sig")) == 10
+    # Al lanzar cada exportación se borran los terminados más antiguos por encima del máximo
+    assert not rutas[0].exists()
+    assert rutas[-1].exists() and rutas[-2].exists()
+    assert not list(tmp_path.glob("*.tmp"))
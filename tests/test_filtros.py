@@ -0,0 +1,75 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from predial.filtros import MotorFiltros
+
+
+def _dataset(n=400, semilla=0):
+    rng = np.random.default_rng(semilla)
+    df = pd.DataFrame({
+        "sector": rng.choice(["Urbano", "Rural"], n),
+        "sector_urbano": rng.choice(["Centro", "Nogales", None], n),
+        "vereda": rng.choice(["El Salitre", "La Balsa", None], n),
+        "destino_economico_predio": rng.choice(["Habitacional", "Comercial", "Lote"], n),
+        "propiedad_horizontal": rng.choice(["Sí", "SÍ", "No", None], n),
+        "saldo": rng.random(n),
+    })
+    df["vereda"] = df["vereda"].astype("category")
+    return df
+
+
+def _aplicar_filtros(data, sector, sector_urbano, vereda, uso, ph):
+    # Filtro original de la aplicación, con comparaciones de texto fila a fila
+    dff = data.copy()
+    if sector != "Todos":
+        dff = dff[dff["sector"].astype(str) == sector]
+    if sector_urbano != "Todos":
+        dff = dff[dff["sector_urbano"].astype(str) == sector_urbano]
+    if vereda != "Todas":
+        dff = dff[dff["vereda"].astype(str) == vereda]
+    if uso != "Todos":
+        dff = dff[dff["destino_economico_predio"].astype(str) == uso]
+    if ph != "Todos":
+        dff = dff[dff["propiedad_horizontal"].astype(str).str.lower() == ph.lower()]
+    return dff
+
+
+COMBINACIONES = list(itertools.product(
+    ["Todos", "Urbano", "Rural"], ["Todos", "Centro"], ["Todas", "La Balsa", "Inexistente"],
+    ["Todos", "Lote"], ["Todos", "sí", "No"],
+))
+
+
+@pytest.mark.parametrize("sector, sector_urbano, vereda, uso, ph", COMBINACIONES)
+def test_filtrar_igual_que_aplicar_filtros(sector, sector_urbano, vereda, uso, ph):
+    df = _dataset()
+    motor = MotorFiltros(df)
+    seleccion = {
+        "sector": None if sector == "Todos" else sector,
+        "sector_urbano": None if sector_urbano == "Todos" else sector_urbano,
+        "vereda": None if vereda == "Todas" else vereda,
+        "destino_economico_predio": None if uso == "Todos" else uso,
+        "propiedad_horizontal": None if ph == "Todos" else ph,
+    }
+
+    esperado = _aplicar_filtros(df, sector, sector_urbano, vereda, uso, ph)
+
+    pd.testing.assert_frame_equal(motor.filtrar(seleccion), esperado)
+    np.testing.assert_array_equal(motor.mascara(seleccion), df.index.isin(esperado.index))
+
+
+def test_selecciones_repetidas_reutilizan_el_subconjunto():
+    df = _dataset()
+    motor = MotorFiltros(df, maximo_filtrados=2)
+
+    assert motor.filtrar({}) is df
+    rural = motor.filtrar({"sector": "Rural"})
+    assert motor.filtrar({"sector": "Rural", "vereda": None}) is rural
+    assert motor.filtrar({"propiedad_horizontal": "sí"}) is motor.filtrar({"propiedad_horizontal": "SÍ"})
+
+    # Al superar el máximo se descarta la selección usada hace más tiempo
+    motor.filtrar({"sector": "Urbano"})
+    assert motor.filtrar({"sector": "Rural"}) is not rural
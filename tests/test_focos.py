@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from predial.focos import RADIO_TIERRA_M, IndiceFocos
+
+
+def _dataset(semilla=0):
+    rng = np.random.default_rng(semilla)
+    # Dos concentraciones densas (una de ellas repartida en celdas vecinas) y predios dispersos
+    centros = [(4.880, -74.080, 60, 0.0004), (4.900, -74.050, 80, 0.0006)]
+    lat, lon = [], []
+    for c_lat, c_lon, n, dispersion in centros:
+        lat.append(c_lat + rng.normal(0, dispersion, n))
+        lon.append(c_lon + rng.normal(0, dispersion, n))
+    lat.append(4.85 + rng.random(200) * 0.1)
+    lon.append(-74.15 + rng.random(200) * 0.15)
+    lat, lon = np.concatenate(lat), np.concatenate(lon)
+    n = len(lat)
+    df = pd.DataFrame({
+        "latitud": lat, "longitud": lon,
+        "saldo": np.where(np.arange(n) < 140, 1000.0, 10.0),
+        "sector": rng.choice(["Urbano", "Rural"], n),
+        "vereda": rng.choice(["El Salitre", "La Balsa"], n),
+        "sector_urbano": rng.choice(["Centro", None], n),
+    })
+    # Un predio sin coordenadas (quedan en 0 tras el preprocesamiento)
+    df.loc[n - 1, ["latitud", "longitud"]] = 0.0
+    return df
+
+
+def _distancias(df, origen):
+    # Distancia equirectangular alrededor del centro de los predios con coordenadas
+    validas = ~((df["latitud"] == 0) & (df["longitud"] == 0))
+    lat0, lon0 = df.loc[validas, "latitud"].mean(), df.loc[validas, "longitud"].mean()
+    x = np.radians(df["longitud"] - lon0) * RADIO_TIERRA_M * np.cos(np.radians(lat0))
+    y = np.radians(df["latitud"] - lat0) * RADIO_TIERRA_M
+    distancia = np.hypot(x - x[origen], y - y[origen]).to_numpy()
+    distancia[~validas.to_numpy()] = np.inf
+    return distancia
+
+
+def test_focos_agrupan_las_concentraciones_de_saldo():
+    df = _dataset()
+    indice = IndiceFocos(df, tamano_celda=100)
+    posiciones = np.arange(len(df))
+
+    tabla, foco = indice.focos(posiciones, df["saldo"].to_numpy(), percentil=90, minimo_predios=3)
+
+    assert list(tabla["foco"]) == list(range(1, len(tabla) + 1))
+    assert tabla["saldo"].is_monotonic_decreasing
+    # Cada concentración queda en un solo foco, que contiene a casi todos sus predios
+    principal_a = np.bincount(foco[:60]).argmax()
+    principal_b = np.bincount(foco[60:140]).argmax()
+    assert principal_a > 0 and principal_b > 0 and principal_a != principal_b
+    assert (foco[:60] == principal_a).mean() > 0.9
+    # Totales de la tabla coherentes con la asignación de cada predio
+    for _, fila in tabla.iterrows():
+        en_foco = foco == fila["foco"]
+        assert fila["predios"] == en_foco.sum()
+        assert fila["saldo"] == pytest.approx(df["saldo"].to_numpy()[en_foco].sum())
+    assert foco[len(df) - 1] == 0
+
+
+def test_sin_celdas_densas_no_hay_focos():
+    df = _dataset()
+    indice = IndiceFocos(df)
+
+    tabla, foco = indice.focos(np.arange(len(df)), np.zeros(len(df)))
+
+    assert tabla.empty
+    assert not foco.any()
+
+
+@pytest.mark.parametrize("radio", [50, 300, 1500])
+def test_vecinos_igual_que_fuerza_bruta(radio):
+    df = _dataset()
+    indice = IndiceFocos(df, tamano_celda=250)
+    permitidas = np.arange(0, len(df), 2)
+
+    for origen in (0, 70, 200):
+        cercanos, distancias = indice.vecinos(origen, radio)
+        distancia = _distancias(df, origen)
+        esperados = np.flatnonzero(distancia <= radio)
+        assert set(cercanos) == set(esperados)
+        np.testing.assert_allclose(distancias, np.sort(distancia[esperados]))
+        assert cercanos[0] == origen
+
+        solo, _ = indice.vecinos(origen, radio, permitidas)
+        assert set(solo) == set(esperados) & set(permitidas)
+
+
+def test_vecinos_de_un_predio_sin_coordenadas():
+    df = _dataset()
+    indice = IndiceFocos(df)
+
+    cercanos, distancias = indice.vecinos(len(df) - 1, 500)
+
+    assert len(cercanos) == 0 and len(distancias) == 0
+
+
+def test_ruta_visita_el_mas_cercano_no_visitado():
+    df = _dataset()
+    indice = IndiceFocos(df)
+    posiciones = np.arange(140)
+
+    ruta, distancias = indice.ruta(posiciones, df["saldo"].to_numpy()[:140], maximo=20)
+
+    assert len(ruta) == 20 and len(set(ruta)) == 20
+    assert ruta[0] == 0 and distancias[0] == 0
+    for anterior, actual, distancia in zip(ruta[:-1], ruta[1:], distancias[1:]):
+        pendientes = [p for p in ruta if p not in ruta[:list(ruta).index(actual)]]
+        assert distancia == pytest.approx(min(_distancias(df, anterior)[pendientes]))
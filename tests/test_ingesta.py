@@ -0,0 +1,30 @@
+import io
+
+import pandas as pd
+
+from benchmarks.generador import generar
+from predial.ingesta import cargar_dataset
+
+
+def _excel(filas=200):
+    contenido = io.BytesIO()
+    generar(filas).to_excel(contenido, index=False)
+    return contenido.getvalue()
+
+
+def test_modelo_compacto_en_la_primera_carga_y_desde_la_copia_columnar(tmp_path):
+    contenido = _excel()
+
+    primera = cargar_dataset(contenido, tmp_path)
+    assert len(list(tmp_path.glob("*.parquet"))) == 1
+    repetida = cargar_dataset(contenido, tmp_path)
+
+    for df in (primera, repetida):
+        assert df["codigo_igac"].dtype == pd.StringDtype("pyarrow")
+        assert isinstance(df["vereda"].dtype, pd.CategoricalDtype)
+        assert df["cumplimiento"].dtype == bool
+        assert df["area_construida"].dtype == "float32"
+        assert df["valor_impuesto_a_pagar"].dtype == "float64"
+        assert df["longitud"].dtype == "float64"
+    assert primera.dtypes.equals(repetida.dtypes)
+    pd.testing.assert_frame_equal(primera, repetida)
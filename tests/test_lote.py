@@ -0,0 +1,42 @@
+import pandas as pd
+
+from benchmarks.generador import generar
+from predial.lote import ejecutar_lote
+
+
+def test_lote_escribe_un_directorio_por_municipio(tmp_path):
+    entrada = tmp_path / "entrada"
+    entrada.mkdir()
+    generar(200, semilla=1).to_parquet(entrada / "tabio.parquet", index=False)
+    generar(200, semilla=2).to_parquet(entrada / "cajica.parquet", index=False)
+
+    resumen = ejecutar_lote(entrada, tmp_path / "salida", procesos=1, directorio_cache=tmp_path / "cache")
+
+    assert resumen["error"].isna().all()
+    assert sorted(p.name for p in (tmp_path / "salida").iterdir() if p.is_dir()) == ["cajica", "tabio"]
+    assert (tmp_path / "salida" / "tabio" / "kpis.json").exists()
+
+
+def test_archivo_invalido_no_deja_directorio(tmp_path):
+    entrada = tmp_path / "entrada"
+    entrada.mkdir()
+    pd.DataFrame({"otra_columna": [1, 2]}).to_parquet(entrada / "invalido.parquet", index=False)
+
+    resumen = ejecutar_lote(entrada, tmp_path / "salida", procesos=1, directorio_cache=tmp_path / "cache")
+
+    assert "Faltan columnas requeridas" in resumen.loc[0, "error"]
+    assert not (tmp_path / "salida" / "invalido").exists()
+
+
+def test_mismo_municipio_con_dos_extensiones_no_se_analiza(tmp_path):
+    entrada = tmp_path / "entrada"
+    entrada.mkdir()
+    crudo = generar(100)
+    crudo.to_parquet(entrada / "tabio.parquet", index=False)
+    crudo.to_excel(entrada / "tabio.xlsx", index=False)
+
+    resumen = ejecutar_lote(entrada, tmp_path / "salida", procesos=1, directorio_cache=tmp_path / "cache")
+
+    assert len(resumen) == 2
+    assert resumen["error"].str.contains("Varios archivos para el mismo municipio").all()
+    assert not (tmp_path / "salida" / "tabio").exists()
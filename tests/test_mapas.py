@@ -0,0 +1,42 @@
+import folium
+import numpy as np
+import pandas as pd
+
+from predial.mapas import capa_celdas, capa_puntos
+
+
+def _features(capa):
+    return capa.data["features"]
+
+
+def test_capa_puntos_un_punto_por_fila_con_coordenadas():
+    df = pd.DataFrame({
+        "latitud": [4.8, np.nan, 4.9, 4.85],
+        "longitud": [-74.1, -74.0, np.nan, -74.05],
+    }, index=[10, 20, 30, 40])
+    popups = pd.Series(["a", "b", "c", "d"], index=df.index)
+
+    capa = capa_puntos(df, popups, color="blue", nombre="morosos")
+
+    features = _features(capa)
+    assert [f["properties"]["popup"] for f in features] == ["a", "d"]
+    assert [f["geometry"]["coordinates"] for f in features] == [[-74.1, 4.8], [-74.05, 4.85]]
+    # Un solo objeto Folium por capa, sin importar el número de predios
+    mapa = folium.Map()
+    capa.add_to(mapa)
+    assert len(mapa._children) == 2
+
+
+def test_capa_celdas_un_geojson_por_tamano():
+    celdas = pd.DataFrame({
+        "latitud": [4.8, 4.81, 4.82],
+        "longitud": [-74.1, -74.11, -74.12],
+        "predios": [3, 5, 250],
+    })
+    popups = pd.Series(["x", "y", "z"])
+
+    grupo = capa_celdas(celdas, popups)
+
+    capas = list(grupo._children.values())
+    assert [len(_features(c)) for c in capas] == [2, 1]
+    assert sorted(f["properties"]["popup"] for c in capas for f in _features(c)) == ["x", "y", "z"]
@@ -0,0 +1,48 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from predial.perfilado import Perfilador
+
+
+def _medir(perfilador, nombre):
+    with perfilador.etapa(nombre):
+        np.ones(500_000)
+
+
+def test_memoria_activada_solo_en_el_hilo_de_la_sesion():
+    perfilador = Perfilador(memoria=False)
+
+    def sesion_con_memoria():
+        perfilador.contexto(memoria=True, sesion="a")
+        _medir(perfilador, "con_memoria")
+
+    def otra_sesion():
+        perfilador.contexto(sesion="b")
+        _medir(perfilador, "sin_memoria")
+
+    for objetivo in (sesion_con_memoria, otra_sesion):
+        hilo = threading.Thread(target=objetivo)
+        hilo.start()
+        hilo.join()
+
+    registros = perfilador.registros().set_index("etapa")
+    assert registros.loc["con_memoria", "memoria_pico_mb"] > 3
+    assert pd.isna(registros.loc["sin_memoria", "memoria_pico_mb"])
+    assert not perfilador.memoria
+
+
+def test_etapas_anidadas_y_contexto():
+    perfilador = Perfilador()
+    perfilador.contexto(sesion="s", ejecucion="s-1")
+
+    with perfilador.etapa("externa") as medicion:
+        with perfilador.etapa("interna", filas=3):
+            pass
+        medicion.filas = 10
+
+    registros = perfilador.registros(ejecucion="s-1").set_index("etapa")
+    assert list(registros.index) == ["interna", "externa"]
+    assert registros.loc["externa", "filas"] == 10
+    assert registros.loc["interna", "sesion"] == "s"
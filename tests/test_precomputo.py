@@ -0,0 +1,73 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from predial.precomputo import Precomputo
+from predial.registro import RegistroDatasets
+
+
+def _reservar(registro, huella):
+    def cargar():
+        df = pd.DataFrame({"saldo": [1.0, 2.0, 3.0]})
+        df.attrs["huella"] = huella
+        return df
+
+    return registro.reservar(huella, cargar)
+
+
+def _referencias(registro, huella):
+    return registro._datasets[huella]["referencias"]
+
+
+def test_artefacto_con_error_se_informa_sin_resultado(tmp_path):
+    registro = RegistroDatasets(directorio=tmp_path)
+    reserva = _reservar(registro, "a")
+
+    def fallar(a):
+        raise ValueError("sin coordenadas")
+
+    artefactos = Precomputo(hilos=1).artefactos(reserva, {"total": lambda a: a.df["saldo"].sum(), "rankings": fallar})
+
+    assert artefactos.resultado("total") == 6.0
+    with pytest.raises(ValueError):
+        artefactos.resultado("rankings")
+    assert isinstance(artefactos.error("rankings"), ValueError)
+    assert artefactos.error("total") is None
+    assert artefactos.estado().set_index("artefacto").loc["rankings", "estado"] == "error"
+
+
+def test_cancelados_al_expulsar_se_relanzan(tmp_path):
+    registro = RegistroDatasets(directorio=tmp_path)
+    precomputo = Precomputo(hilos=1, maximo=1)
+    # El único hilo queda ocupado hasta que se abra la barrera: las demás tareas esperan en la cola
+    barrera = threading.Event()
+    tareas = {
+        "bloqueo": lambda a: barrera.wait(5),
+        "total": lambda a: a.df["saldo"].sum(),
+        "doble": lambda a: a.resultado("total") * 2,
+    }
+    artefactos = precomputo.artefactos(_reservar(registro, "a"), tareas)
+
+    precomputo.artefactos(_reservar(registro, "b"), {"bloqueo": lambda a: None})
+    assert (artefactos.estado().set_index("artefacto").loc[["total", "doble"], "estado"] == "cancelado").all()
+
+    barrera.set()
+    assert artefactos.resultado("doble") == 12.0
+    assert artefactos.terminado()
+    assert (artefactos.estado()["estado"] == "listo").all()
+
+
+def test_artefactos_reservan_el_dataset_hasta_su_expulsion(tmp_path):
+    registro = RegistroDatasets(directorio=tmp_path)
+    precomputo = Precomputo(hilos=1, maximo=1)
+    reserva = _reservar(registro, "a")
+
+    precomputo.artefactos(reserva, {"total": lambda a: a.df["saldo"].sum()}).resultado("total")
+    assert _referencias(registro, "a") == 2
+
+    reserva.liberar()
+    assert _referencias(registro, "a") == 1
+
+    precomputo.artefactos(_reservar(registro, "b"), {"total": lambda a: a.df["saldo"].sum()})
+    assert _referencias(registro, "a") == 0
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from predial.rankings import IndiceRankings
+
+
+def _dataset(n=1000, semilla=0):
+    rng = np.random.default_rng(semilla)
+    saldo = rng.integers(0, 50, n).astype(float)
+    saldo[rng.random(n) < 0.05] = np.nan
+    return pd.DataFrame({"saldo": saldo, "grupo": rng.integers(0, 3, n)})
+
+
+def _mascara(df):
+    return (df["grupo"] == 1).to_numpy()
+
+
+@pytest.mark.parametrize("ascendente", [True, False])
+@pytest.mark.parametrize("con_mascara", [True, False])
+def test_orden_igual_que_sort_values_estable(ascendente, con_mascara):
+    df = _dataset()
+    ranking = IndiceRankings(df, ["saldo"])
+    mascara = _mascara(df) if con_mascara else None
+
+    orden = ranking.orden("saldo", mascara, ascendente)
+
+    base = df[mascara] if con_mascara else df
+    esperado = base.reset_index().sort_values("saldo", ascending=ascendente, kind="stable", na_position="last")
+    np.testing.assert_array_equal(orden, esperado["index"].to_numpy())
+
+
+@pytest.mark.parametrize("n", [0, 1, 10, 5000])
+def test_top_igual_que_las_primeras_del_orden(n):
+    df = _dataset()
+    ranking = IndiceRankings(df, ["saldo"])
+    mascara = _mascara(df)
+
+    esperado = df[mascara].reset_index().sort_values("saldo", ascending=False, kind="stable")["index"].to_numpy()[:n]
+    np.testing.assert_array_equal(ranking.top("saldo", n, mascara), esperado)
+    np.testing.assert_array_equal(ranking.top("saldo", n), ranking.orden("saldo")[:n])
+
+
+@pytest.mark.parametrize("q", [0, 0.1, 0.5, 0.9, 0.95, 1])
+def test_cuantil_igual_que_np_quantile(q):
+    df = _dataset()
+    ranking = IndiceRankings(df, ["saldo"])
+    mascara = _mascara(df)
+    valores = df.loc[mascara, "saldo"].dropna().to_numpy()
+
+    assert ranking.cuantil("saldo", q, mascara) == pytest.approx(np.quantile(valores, q))
+
+    sobre = ranking.sobre_cuantil("saldo", q, mascara)
+    assert set(sobre) == set(np.flatnonzero(mascara & (df["saldo"].to_numpy() >= np.quantile(valores, q))))
+
+
+def test_cuantil_sin_valores_es_nan():
+    df = _dataset()
+    ranking = IndiceRankings(df, ["saldo"])
+
+    assert np.isnan(ranking.cuantil("saldo", 0.5, np.zeros(len(df), dtype=bool)))
+
+
+def test_mascara_de_subconjunto_con_etiquetas():
+    df = _dataset().set_axis(np.arange(1000) * 3 + 1)
+    ranking = IndiceRankings(df, ["saldo"])
+    subconjunto = df[df["grupo"] == 2]
+
+    assert ranking.mascara_de(df) is None
+    np.testing.assert_array_equal(ranking.mascara_de(subconjunto), (df["grupo"] == 2).to_numpy())
+    np.testing.assert_array_equal(ranking.etiquetas(ranking.top("saldo", 5)), df.index[ranking.orden("saldo")[:5]])
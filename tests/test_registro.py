@@ -0,0 +1,112 @@
+import gc
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from predial.registro import RegistroDatasets
+
+
+def _cargador(filas, huella, llamadas=None):
+    def cargar():
+        if llamadas is not None:
+            llamadas.append(huella)
+            time.sleep(0.05)
+        df = pd.DataFrame({
+            "saldo": np.arange(filas, dtype=float),
+            "vereda": pd.Categorical(np.where(np.arange(filas) % 2, "El Salitre", "La Balsa")),
+            "codigo_igac": pd.array([f"{i:08d}" for i in range(filas)], dtype="string[pyarrow]"),
+        })
+        df.attrs["huella"] = huella
+        return df
+    return cargar
+
+
+def _referencias(registro):
+    return dict(zip(registro.residentes()["dataset"], registro.residentes()["referencias"]))
+
+
+def test_sesiones_comparten_el_dataset_mapeado(tmp_path):
+    registro = RegistroDatasets(directorio=tmp_path)
+
+    a = registro.reservar("x", _cargador(100, "x"), "x")
+    b = registro.reservar("x", _cargador(100, "x"), "x")
+
+    assert a.df is b.df
+    assert a.df.attrs["huella"] == "x"
+    assert a.df["codigo_igac"].dtype == pd.StringDtype("pyarrow")
+    assert isinstance(a.df["vereda"].dtype, pd.CategoricalDtype)
+    assert registro.ruta_mapa("x").exists()
+    assert _referencias(registro) == {"x": 2}
+
+
+def test_referencias_se_descuentan_al_liberar_o_descartar(tmp_path):
+    registro = RegistroDatasets(directorio=tmp_path)
+    a = registro.reservar("x", _cargador(100, "x"), "x")
+    b = registro.reservar("x", _cargador(100, "x"), "x")
+    copia = a.copia()
+    assert _referencias(registro) == {"x": 3}
+
+    a.liberar()
+    a.liberar()  # Liberar dos veces no descuenta dos referencias
+    del b
+    gc.collect()
+    assert _referencias(registro) == {"x": 1}
+
+    copia.liberar()
+    assert _referencias(registro) == {"x": 0}
+    assert registro.expulsar_sin_uso() == 1
+    assert registro.residentes().empty
+
+
+def test_expulsion_lru_solo_de_datasets_sin_referencias(tmp_path):
+    registro = RegistroDatasets(directorio=tmp_path)
+    reservas = {h: registro.reservar(h, _cargador(20_000, h), h) for h in "abc"}
+    megas = registro.memoria_mb() / 3
+    registro.presupuesto_mb = megas * 2.5
+
+    # Con referencias nada se expulsa aunque se supere el presupuesto
+    registro.reservar("d", _cargador(20_000, "d"), "d").liberar()
+    assert set(registro.residentes()["dataset"]) == {"a", "b", "c"}
+
+    # Sin referencias se expulsa el menos usado recientemente
+    registro.presupuesto_mb = megas * 10
+    for h in "abc":
+        reservas.pop(h).liberar()
+    registro.reservar("a", _cargador(20_000, "a"), "a").liberar()
+    registro.presupuesto_mb = megas * 2.5
+    registro.reservar("b", _cargador(20_000, "b"), "b").liberar()
+    assert list(registro.residentes()["dataset"]) == ["b", "a"]
+    assert registro.memoria_mb() <= registro.presupuesto_mb
+
+
+def test_carga_concurrente_una_sola_vez_y_sin_candados_residuales(tmp_path):
+    registro = RegistroDatasets(directorio=tmp_path)
+    llamadas, reservas = [], []
+
+    def pedir():
+        reservas.append(registro.reservar("x", _cargador(100, "x", llamadas), "x"))
+
+    hilos = [threading.Thread(target=pedir) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert llamadas == ["x"]
+    assert len({id(r.df) for r in reservas}) == 1
+    assert registro._cargando == {}
+
+
+def test_error_al_cargar_no_deja_candado(tmp_path):
+    registro = RegistroDatasets(directorio=tmp_path)
+
+    def fallar():
+        raise ValueError("archivo dañado")
+
+    with pytest.raises(ValueError):
+        registro.reservar("x", fallar)
+    assert registro._cargando == {}
+    assert registro.residentes().empty
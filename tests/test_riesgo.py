@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from predial.riesgo import ConfigRiesgo, MotorRiesgo, puntuar
+
+
+def _dataset(n, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return pd.DataFrame({
+        # Pocos valores distintos: muchos empates en el impuesto
+        "valor_impuesto_a_pagar": rng.integers(0, 8, n) * 1000.0,
+        "avaluo_catastral": rng.integers(1, 50, n) * 1e6,
+        "area_construida": np.where(rng.random(n) < 0.3, 0.0, rng.random(n) * 200),
+        "cumplimiento": rng.random(n) < 0.5,
+        "financiacion_impuesto_predial": rng.choice(["Si", "NO", "no", None], n),
+    })
+
+
+def _riesgo_original(df):
+    # Cálculo anterior con qcut sobre rangos y máscaras de pandas
+    df_riesgo = df.copy()
+    df_riesgo['financiacion_impuesto_predial'] = df_riesgo['financiacion_impuesto_predial'].astype(str).str.lower()
+    if df_riesgo['valor_impuesto_a_pagar'].nunique() > 1:
+        df_riesgo['riesgo_fiscal'] = pd.qcut(df_riesgo['valor_impuesto_a_pagar'].rank(method='first'), 5, labels=[1, 2, 3, 4, 5])
+    else:
+        df_riesgo['riesgo_fiscal'] = 1
+    df_riesgo['riesgo_catastral'] = 1
+    sin_construccion = (df_riesgo['area_construida'] == 0) & (df_riesgo['avaluo_catastral'] > df_riesgo['avaluo_catastral'].median())
+    bajo_construccion = (df_riesgo['area_construida'] < df_riesgo['area_construida'].quantile(0.2)) & (df_riesgo['avaluo_catastral'] > df_riesgo['avaluo_catastral'].quantile(0.6))
+    df_riesgo.loc[sin_construccion, 'riesgo_catastral'] = 5
+    df_riesgo.loc[bajo_construccion, 'riesgo_catastral'] = 3
+    df_riesgo['riesgo_comportamental'] = 1
+    df_riesgo.loc[~df_riesgo['cumplimiento'] & (df_riesgo['financiacion_impuesto_predial'] == 'no'), 'riesgo_comportamental'] = 5
+    df_riesgo.loc[~df_riesgo['cumplimiento'] & (df_riesgo['financiacion_impuesto_predial'] == 'si'), 'riesgo_comportamental'] = 3
+    df_riesgo['riesgo_total'] = (
+        0.5 * df_riesgo['riesgo_fiscal'].astype(float) +
+        0.3 * df_riesgo['riesgo_catastral'].astype(float) +
+        0.2 * df_riesgo['riesgo_comportamental'].astype(float)
+    )
+    return df_riesgo
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 7, 500])
+def test_puntuar_igual_que_el_calculo_original(n):
+    df = _dataset(n)
+
+    puntajes = puntuar(df)
+    esperado = _riesgo_original(df)
+
+    for col in ["riesgo_fiscal", "riesgo_catastral", "riesgo_comportamental", "riesgo_total"]:
+        np.testing.assert_array_equal(puntajes[col].to_numpy(dtype=float), esperado[col].to_numpy(dtype=float), err_msg=col)
+
+
+def test_impuesto_constante_tiene_riesgo_fiscal_bajo():
+    df = _dataset(10).assign(valor_impuesto_a_pagar=500.0)
+
+    assert (puntuar(df)["riesgo_fiscal"] == 1).all()
+
+
+def test_motor_recombina_pesos_sin_recalcular_componentes():
+    df = _dataset(200)
+    motor = MotorRiesgo(df)
+    componentes = motor.componentes()
+    config = ConfigRiesgo(peso_fiscal=0.2, peso_catastral=0.2, peso_comportamental=0.6)
+
+    puntajes = motor.puntuar(config)
+
+    assert motor.componentes(config) is componentes
+    pd.testing.assert_frame_equal(puntajes, puntuar(df, config))
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from predial.riesgo import componentes_riesgo
+from predial.simulacion import ConfigSimulacion, probabilidades_pago, simular_recaudo
+
+
+def _dataset(n=600, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return pd.DataFrame({
+        "valor_impuesto_a_pagar": rng.lognormal(12, 1, n).round(),
+        "avaluo_catastral": rng.integers(1, 50, n) * 1e6,
+        "area_construida": np.where(rng.random(n) < 0.3, 0.0, rng.random(n) * 200),
+        "cumplimiento": rng.random(n) < 0.4,
+        "financiacion_impuesto_predial": rng.choice(["Si", "No"], n),
+        "sector": rng.choice(["Urbano", "Rural"], n),
+        "vereda": rng.choice(["El Salitre", "La Balsa", None], n),
+    })
+
+
+def test_esperado_y_totales_coinciden_con_las_probabilidades():
+    df = _dataset()
+    morosos = df[~df["cumplimiento"]]
+
+    resultado = simular_recaudo(df, ConfigSimulacion(simulaciones=500))
+
+    # Los componentes de riesgo se calculan sobre todos los predios
+    p = probabilidades_pago(morosos, componentes=componentes_riesgo(df)[~df["cumplimiento"]])
+    esperado = (p * morosos["valor_impuesto_a_pagar"]).sum()
+    assert resultado["total"]["predios"] == len(morosos)
+    assert resultado["total"]["esperado"] == pytest.approx(esperado)
+    np.testing.assert_allclose(resultado["predios"]["aporte_esperado"].sum(), esperado)
+    for tabla in (resultado["por_sector"], resultado["por_vereda"]):
+        assert tabla["predios"].sum() == len(morosos)
+        assert tabla["esperado"].sum() == pytest.approx(esperado)
+    assert "(sin dato)" in resultado["por_vereda"].index
+    assert len(resultado["escenarios_total"]) == 500
+
+
+def test_aproximacion_normal_cerca_de_la_simulacion_exacta():
+    df = _dataset(3000)
+    config = ConfigSimulacion(simulaciones=4000)
+
+    exacta = simular_recaudo(df, config, exactos=10**6)["total"]
+    aproximada = simular_recaudo(df, config, exactos=8)["total"]
+
+    for p in ("p10", "p50", "p90"):
+        assert aproximada[p] == pytest.approx(exacta[p], rel=0.02)
+    # La media de los escenarios converge al recaudo esperado
+    assert exacta["p50"] == pytest.approx(exacta["esperado"], rel=0.02)
+
+
+def test_resultado_no_depende_de_los_procesos():
+    df = _dataset()
+    config = ConfigSimulacion(simulaciones=3000, semilla=7)
+
+    en_proceso = simular_recaudo(df, config, procesos=0, lote=1000)
+    repartido = simular_recaudo(df, config, procesos=2, lote=1000)
+
+    np.testing.assert_array_equal(en_proceso["escenarios_total"], repartido["escenarios_total"])
+    pd.testing.assert_frame_equal(en_proceso["por_sector"], repartido["por_sector"])
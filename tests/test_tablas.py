@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from predial.rankings import IndiceRankings
+from predial.tablas import pagina, posiciones_pagina
+
+
+def _dataset(n=500, semilla=0):
+    rng = np.random.default_rng(semilla)
+    saldo = rng.integers(0, 20, n).astype(float)
+    saldo[rng.random(n) < 0.1] = np.nan
+    return pd.DataFrame({
+        "codigo_igac": [f"{i:05d}" for i in range(n)],
+        "vereda": rng.choice(["El Salitre", "La Balsa", None], n),
+        "saldo": saldo,
+    })
+
+
+def _esperadas(df, orden, ascendente):
+    # Orden estable con los nulos al final en ambos sentidos
+    return df.reset_index(drop=True).sort_values(
+        orden, ascending=ascendente, kind="stable", na_position="last"
+    ).index.to_numpy()
+
+
+@pytest.mark.parametrize("orden", ["saldo", "vereda"])
+@pytest.mark.parametrize("ascendente", [True, False])
+@pytest.mark.parametrize("numero", [1, 3, 10])
+def test_posiciones_sin_ranking_igual_a_sort_values(orden, ascendente, numero):
+    df = _dataset()
+
+    posiciones = posiciones_pagina(df, orden, ascendente, numero, 50)
+
+    np.testing.assert_array_equal(posiciones, _esperadas(df, orden, ascendente)[(numero - 1) * 50:numero * 50])
+
+
+@pytest.mark.parametrize("ascendente", [True, False])
+def test_posiciones_con_ranking_de_un_subconjunto(ascendente):
+    df = _dataset()
+    ranking = IndiceRankings(df, ["saldo"])
+    subconjunto = df[df["vereda"] == "La Balsa"]
+
+    for numero in (1, 2, 4):
+        posiciones = posiciones_pagina(subconjunto, "saldo", ascendente, numero, 25, ranking)
+        esperadas = _esperadas(subconjunto, "saldo", ascendente)[(numero - 1) * 25:numero * 25]
+        np.testing.assert_array_equal(posiciones, esperadas)
+
+
+def test_pagina_solo_columnas_pedidas_con_indice_reiniciado():
+    df = _dataset()
+
+    tabla = pagina(df, ["codigo_igac", "saldo"], "saldo", False, 2, 10)
+
+    assert list(tabla.columns) == ["codigo_igac", "saldo"]
+    assert list(tabla.index) == list(range(10))
+    assert list(tabla["codigo_igac"]) == list(df["codigo_igac"].iloc[_esperadas(df, "saldo", False)[10:20]])